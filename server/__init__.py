@@ -20,11 +20,15 @@ def create_app():
         from . import server
         from . import auth
         from . import models
+        from .racelogic import raceday as rd, leaderboard
 
         # Register Blueprints
         app.register_blueprint(server.main_bp)
         app.register_blueprint(auth.auth_bp)
 
+        # the racedays saved by the app keep the leaderboard up to date
+        rd.add_save_listener(leaderboard.update_raceday)
+
         # Create db Models
         db.create_all()
 
@@ -1,19 +1,29 @@
 """Database models."""
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from pathlib import Path
 
 from . import db
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from .racelogic.constants import RESULT_FOLDER_PATH
 from .racelogic.names import NAMES
 
 import os
 import datetime
+import itertools
+import threading
 
 PEPPER = os.environ.get("DB_PEPPER", None)
 
+# In-process registry of driver numbers mapped to names, loaded from the
+# drivers table on first use. None means it has to be (re)loaded.
+_driver_registry: Optional[Dict[int, str]] = None
+# incremented on every invalidation, so that a registry loaded before it isn't kept
+_driver_registry_generation = 0
+_driver_registry_lock = threading.Lock()
+
 ADMIN_NAME = "Admin"
 RACER_NAME = "Racer"
 
@@ -101,6 +111,21 @@ class DBDriver(db.Model):
     )
 
 
+@event.listens_for(Session, "before_flush")
+def _on_flush(session, flush_context, instances):
+    if any(isinstance(obj, DBDriver) for obj in itertools.chain(session.new, session.dirty, session.deleted)):
+        session.info["drivers_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _on_transaction_end(session):
+    # only once the changes are committed or rolled back, as the registry may be
+    # loaded with flushed changes which are then rolled back
+    if session.info.pop("drivers_changed", False):
+        invalidate_driver_registry()
+
+
 class Role(db.Model):
     __tablename__ = "roles"
 
@@ -175,14 +200,22 @@ def get_latest_date(season: int) -> str:
 
 
 def get_race_dates_filenames_and_locations(season: int) -> Tuple[List[str], List[Path], List[str]]:
+    # imported when needed, as raceday imports this module
+    from .racelogic import raceday as rd
     races = db.session.query(Race).filter_by(year=season).order_by(Race.date.desc())
     # this is the correct type no matter what they say
     return zip(*[
-        (race.date.strftime("%Y-%m-%d"), RESULT_FOLDER_PATH / (race.filename + ".json"), race.location)
+        (race.date.strftime("%Y-%m-%d"), rd.get_raceday_path(race.filename), race.location)
         for race in races
     ])
 
 
+def get_season_races(season: int) -> List[Tuple[str, str, str]]:
+    """Returns the date (YYYY-MM-DD), filename and location of each race of a season, oldest first."""
+    races = db.session.query(Race).filter_by(year=season).order_by(Race.date)
+    return [(race.date.strftime("%Y-%m-%d"), race.filename, race.location) for race in races]
+
+
 def create_past_seasons_if_necessary():
     seasons = [
         (2022, [("220430", "Sandhem"),
@@ -214,9 +247,28 @@ def does_season_exist(year: int) -> bool:
     return year in get_all_season_years()
 
 
+def invalidate_driver_registry() -> None:
+    """Makes the next driver name lookup reload all drivers from the database."""
+    global _driver_registry, _driver_registry_generation
+    with _driver_registry_lock:
+        _driver_registry = None
+        _driver_registry_generation += 1
+
+
+def _get_driver_registry(reload: bool = False) -> Dict[int, str]:
+    global _driver_registry
+    with _driver_registry_lock:
+        registry, generation = _driver_registry, _driver_registry_generation
+    if registry is None or reload:
+        registry = {number: name for number, name in db.session.query(DBDriver.number, DBDriver.name)}
+        with _driver_registry_lock:
+            if generation == _driver_registry_generation:
+                _driver_registry = registry
+    return registry
+
+
 def get_driver_names() -> Dict[int, str]:
-    db_drivers = db.session.query(DBDriver)
-    return {db_driver.number: db_driver.name for db_driver in db_drivers}
+    return dict(_get_driver_registry())
 
 
 def get_all_driver_numbers_and_names() -> List[Tuple[int, str]]:
@@ -225,8 +277,17 @@ def get_all_driver_numbers_and_names() -> List[Tuple[int, str]]:
 
 
 def get_driver_name(number: int) -> str:
-    name, = db.session.query(DBDriver.name).filter_by(number=number).first()
-    return name
+    """
+    Returns the name of the driver with the number. Raises a TypeError if there is
+    no such driver, as the lookup in the database always has.
+    """
+    registry = _get_driver_registry()
+    if number not in registry:
+        # the driver may have been added by another process
+        registry = _get_driver_registry(reload=True)
+    if number not in registry:
+        raise TypeError(f"There is no driver with the number {number}")
+    return registry[number]
 
 
 def create_drivers_if_necessary() -> None:
@@ -0,0 +1,43 @@
+"""
+Compares decoding the raceday test databases with the old approach
+(json.load, then _replace_with_durations, then Raceday) against decode_raceday.
+
+Run from the repository root with:
+    python -m server.racelogic.benchmarks.decoding
+"""
+from pathlib import Path
+
+import io
+import json
+import timeit
+
+import server.racelogic.raceday as rd
+
+TEST_DATABASE_PATH = Path(__file__).parent.parent / "tests" / "testdata" / "testdatabases"
+NUM_REPETITIONS = 200
+
+
+def _decode_old(contents: str) -> rd.Raceday:
+    return rd.Raceday(rd._replace_with_durations(json.loads(contents)))
+
+
+def _decode_new(contents: str) -> rd.Raceday:
+    return rd.decode_raceday(io.StringIO(contents))
+
+
+def main():
+    print(f"{'raceday':<60} {'old (ms)':>10} {'new (ms)':>10} {'speedup':>8}")
+    total_old = 0.
+    total_new = 0.
+    for path in sorted(TEST_DATABASE_PATH.glob("*.json")):
+        contents = path.read_text()
+        old = timeit.timeit(lambda: _decode_old(contents), number=NUM_REPETITIONS) / NUM_REPETITIONS
+        new = timeit.timeit(lambda: _decode_new(contents), number=NUM_REPETITIONS) / NUM_REPETITIONS
+        total_old += old
+        total_new += new
+        print(f"{path.stem:<60} {old * 1000:>10.3f} {new * 1000:>10.3f} {old / new:>7.2f}x")
+    print(f"{'total':<60} {total_old * 1000:>10.3f} {total_new * 1000:>10.3f} {total_old / total_new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Compares parsing RCM reports with RCMHtmlParser against RCMReportTokenizer, on
+synthetic reports of 5 to 50 drivers and 10 to 500 laps laid out like the
+reports RCM writes, with the lap times in tables of ten drivers each.
+
+Run from the repository root with:
+    python -m server.racelogic.benchmarks.reportparsing
+"""
+from typing import List
+
+import random
+import timeit
+
+import server.racelogic.htmlparsing as htmlparsing
+
+NUM_DRIVERS = (5, 10, 20, 50)
+NUM_LAPS = (10, 50, 100, 500)
+# the number of drivers in each lap time table
+DRIVERS_PER_TABLE = 10
+# the total time each size is timed for, roughly
+SECONDS_PER_SIZE = 0.5
+
+_HEAD = """<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+<html>
+\t<head>
+\t\t<meta name="generator" content="RCM [Race Controll Management]">
+\t\t<title>Online - Online Report</title>
+\t</head>
+\t<body bgcolor="#ffffff">
+<table class="tabledata" width="100%" border="0" cellspacing="0" cellpadding="0">
+<tr>
+<td class="tableinfo" width="100%">Online Report</td>
+</tr>
+</table>
+"""
+_TABLE_START = """<table width="100%" border="0" cellspacing="0" cellpadding="0">
+<tr>
+<td class="tableborder" width="100%">
+<table width="100%" border="0" cellspacing="0" cellpadding="0">
+<tr valign="top">
+"""
+_TABLE_END = """</table>
+
+</td>
+</tr>
+</table>
+<br>
+"""
+_TAIL = """
+\t</body>
+</html>
+"""
+
+
+def create_report(num_drivers: int, num_laps: int, seed: int = 0) -> str:
+    """
+    Creates a report of a race with num_drivers drivers, where the winner drives
+    num_laps laps and the others up to a few laps less. Each driver's best lap
+    is in bold, as in the reports of RCM.
+    """
+    random_generator = random.Random(seed)
+    drivers = [(number, f"Förare{number}") for number in random_generator.sample(range(1, 100), num_drivers)]
+    laptimes = []
+    for i in range(num_drivers):
+        driver_num_laps = max(num_laps - random_generator.randint(0, 3) * (i > 0), 1)
+        laptimes.append([random_generator.randint(5000, 10000)] +
+                        [random_generator.randint(30000, 45000) for _ in range(driver_num_laps)])
+
+    parts = [_HEAD, _TABLE_START]
+    parts.extend(f'<td class="tableheader">{name}</td>\n' for name in ("Pos&nbsp;", "Nr&nbsp;", "Förare"))
+    parts.append("<tr>\n\n")
+    for position, (number, name) in enumerate(drivers, start=1):
+        parts.append(f'<tr>\n<td class="tabledata1" align="right">{position}&nbsp;</td>\n'
+                     f'<td class="tabledata1">{number} {name}</td>\n</tr>\n\n')
+    parts.append(_TABLE_END)
+
+    for start in range(0, num_drivers, DRIVERS_PER_TABLE):
+        table_drivers = range(start, min(start + DRIVERS_PER_TABLE, num_drivers))
+        parts.append(_TABLE_START)
+        parts.append('<td class="tableheader" style="width:47px" align="right"># Nr.&nbsp;</td>\n')
+        parts.extend(f'<td class="tableheader" style="width:9%" align="right">{number} {name}&nbsp;</td>\n'
+                     for number, name in (drivers[i] for i in table_drivers))
+        parts.extend(['<td class="tableheader" style="width:9%" align="right">&nbsp;&nbsp;</td>\n'] *
+                     (DRIVERS_PER_TABLE - len(table_drivers)))
+        parts.append("<tr>\n\n")
+        for lap in range(num_laps + 1):
+            cell_class = f"tabledata{lap % 2 + 1}"
+            parts.append(f'<tr>\n<td class="{cell_class}" align="right">{lap}&nbsp;</td>\n')
+            for i in table_drivers:
+                parts.append(f'<td class="{cell_class}" align="right">{_format_laptime(laptimes[i], lap)}</td>\n')
+            parts.extend([f'<td class="{cell_class}" align="right">&nbsp;&nbsp;</td>\n'] *
+                         (DRIVERS_PER_TABLE - len(table_drivers)))
+            parts.append("</tr>\n\n")
+        parts.append(_TABLE_END)
+    parts.append(_TAIL)
+    return "".join(parts)
+
+
+def _format_laptime(laptimes: List[int], lap: int) -> str:
+    if lap >= len(laptimes):
+        return "&nbsp;&nbsp;"
+    minutes, milliseconds = divmod(laptimes[lap], 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    time_string = f"{minutes}:{seconds:02d}.{milliseconds:03d}" if minutes else f"{seconds:02d}.{milliseconds:03d}"
+    if lap > 0 and laptimes[lap] == min(laptimes[1:]):
+        return f"(0) <b>{time_string}</b>&nbsp;"
+    return f"(0) {time_string}&nbsp;"
+
+
+def _parse(parser_class, contents: str):
+    parser = parser_class()
+    parser.parse_data(contents)
+    return parser
+
+
+def _time(parser_class, contents: str) -> float:
+    timer = timeit.Timer(lambda: _parse(parser_class, contents))
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * SECONDS_PER_SIZE / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main():
+    print(f"{'drivers':>7} {'laps':>5} {'size (kB)':>10} {'HTMLParser (ms)':>16} {'tokenizer (ms)':>15} {'speedup':>8}")
+    for num_drivers in NUM_DRIVERS:
+        for num_laps in NUM_LAPS:
+            contents = create_report(num_drivers, num_laps)
+            expected = _parse(htmlparsing.RCMHtmlParser, contents)
+            actual = _parse(htmlparsing.RCMReportTokenizer, contents)
+            if expected.result_header != actual.result_header or expected.result != actual.result:
+                raise AssertionError(f"The parsers differ on {num_drivers} drivers and {num_laps} laps!")
+
+            old = _time(htmlparsing.RCMHtmlParser, contents)
+            new = _time(htmlparsing.RCMReportTokenizer, contents)
+            print(f"{num_drivers:>7} {num_laps:>5} {len(contents) / 1000:>10.1f} "
+                  f"{old * 1000:>16.3f} {new * 1000:>15.3f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compares creating the start lists of the next round on a synthetic raceday of
+100 drivers, with the old approach (deep copying the results of each class and
+moving drivers with pop and insert) against the current one.
+
+Run from the repository root with:
+    python -m server.racelogic.benchmarks.roundtransitions
+"""
+from typing import Dict, List
+
+import copy
+import random
+import timeit
+
+import server.racelogic.raceday as rd
+import server.racelogic.resultcalculation as rc
+from server.racelogic.duration import Duration
+
+NUM_DRIVERS = 100
+NUM_GROUPS = 5
+NUM_REPETITIONS = 1000
+
+
+def create_raceday(num_drivers: int = NUM_DRIVERS, num_groups: int = NUM_GROUPS, seed: int = 0) -> rd.Raceday:
+    """
+    Creates a raceday with the drivers split evenly between the classes and into
+    num_groups groups per class, with results for the qualifiers and eighth finals.
+    """
+    random_generator = random.Random(seed)
+    numbers = list(range(1, num_drivers + 1))
+    num_classes = len(rd.cuppoints.RCCLASSES)
+    participants = {
+        rcclass: {
+            group: start_list
+            for group, start_list in zip(
+                rd.get_group_names(num_groups),
+                rc._create_almost_equal_partitions(numbers[class_index::num_classes], num_groups))
+        }
+        for class_index, rcclass in enumerate(rd.cuppoints.RCCLASSES)
+    }
+
+    raceday = rd.Raceday()
+    raceday.set_all_participants(numbers)
+    raceday.set_first_qualifiers(participants)
+    for heat_name in (rd.QUALIFIERS_NAME, rd.EIGHTH_FINAL_NAME):
+        if heat_name != rd.QUALIFIERS_NAME:
+            new_start_lists, _ = rc._create_start_list_from_qualifiers(raceday.get_current_groups(), raceday)
+            raceday.increment_current_heat()
+            raceday.set_new_start_lists(heat_name, new_start_lists)
+        for rcclass, class_start_lists in raceday.get_start_lists_for_heat(heat_name).items():
+            for group, start_list in class_start_lists.get_start_lists():
+                _add_random_result(raceday, random_generator, heat_name, rcclass, group, start_list)
+    return raceday
+
+
+def _add_random_result(raceday: rd.Raceday, random_generator: random.Random,
+                       heat_name: str, rcclass: str, group: str, start_list: List[rd.Driver]) -> None:
+    numbers = [driver.number for driver in start_list]
+    total_times = {number: Duration(random_generator.randint(240000, 300000)) for number in numbers}
+    positions = sorted(numbers, key=lambda number: total_times[number])
+    num_laps_driven = {number: 20 for number in numbers}
+    best_laptimes = sorted(((number, Duration(random_generator.randint(11000, 14000))) for number in numbers),
+                           key=lambda item: item[1])
+    average_laptimes = [(number, total_times[number] * (1 / 20)) for number in positions]
+    raceday.add_result(heat_name, rcclass, group, positions, num_laps_driven, total_times,
+                       best_laptimes, average_laptimes, False, list(start_list))
+
+
+def _create_start_list_intermediate_races_old(raceday: rd.Raceday, heat_name: str) \
+        -> Dict[str, Dict[str, List[rd.Driver]]]:
+    start_lists = {}
+    results = raceday.get_heat_results(heat_name)
+
+    for rcclass in results:
+        group_results = sorted(copy.deepcopy(results[rcclass]).items(), key=lambda k: k[0])
+        new_start_lists = {}
+        for i in range(len(group_results) - 1):
+            higher_group, higher_results = group_results[i]
+            lower_group, lower_results = group_results[i + 1]
+
+            higher_positions = higher_results.positions
+            lower_positions = lower_results.positions
+
+            higher_slowest = higher_positions.pop()
+            higher_second_slowest = higher_positions.pop()
+
+            lower_fastest = lower_positions.pop(0)
+            lower_second_fastest = lower_positions.pop(0)
+
+            higher_positions.append(lower_fastest)
+            higher_positions.append(lower_second_fastest)
+
+            lower_positions.insert(0, higher_slowest)
+            lower_positions.insert(0, higher_second_slowest)
+
+            new_start_lists[higher_group] = higher_positions
+            new_start_lists[lower_group] = lower_positions
+        start_lists[rcclass] = new_start_lists
+    return start_lists
+
+
+def _create_start_list_intermediate_races_new(raceday: rd.Raceday, heat_name: str) \
+        -> Dict[str, Dict[str, List[rd.Driver]]]:
+    return rc._create_start_list_intermediate_races(raceday, heat_name)[0]
+
+
+def main():
+    raceday = create_raceday()
+    heat_name = rd.EIGHTH_FINAL_NAME
+    if _create_start_list_intermediate_races_old(raceday, heat_name) != \
+            _create_start_list_intermediate_races_new(raceday, heat_name):
+        raise AssertionError("The start lists differ between the old and the new approach!")
+
+    old = timeit.timeit(lambda: _create_start_list_intermediate_races_old(raceday, heat_name),
+                        number=NUM_REPETITIONS) / NUM_REPETITIONS
+    new = timeit.timeit(lambda: _create_start_list_intermediate_races_new(raceday, heat_name),
+                        number=NUM_REPETITIONS) / NUM_REPETITIONS
+    print(f"{NUM_DRIVERS} drivers in {NUM_GROUPS} groups per class")
+    print(f"{'transition':<30} {'old (ms)':>10} {'new (ms)':>10} {'speedup':>8}")
+    print(f"{'intermediate races':<30} {old * 1000:>10.3f} {new * 1000:>10.3f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Compact binary storage format for racedays.
+
+The format holds exactly the same data as the json racedays, but stores driver
+numbers and durations as plain integers, and every list or dictionary as a
+length-prefixed array. All integers are little endian.
+
+    file        := MAGIC all_participants current_heat start_lists results
+    start_lists := u16 count, { str heat, u16 count, { str class, u16 count, { str group, numbers } } }
+    results     := u16 count, { str heat, u16 count, { str class, u16 count, { str group, result } } }
+    result      := u8 flags, numbers (positions), pairs (num_laps_driven), timed pairs (total_times,
+                   best_laptimes, average_laptimes), [numbers (dns) if flags has FLAG_DNS],
+                   [laptimes if flags has FLAG_LAPTIMES]
+    laptimes    := u16 count, { u16 number, u16 count, i32 delta encoded lap time... }
+    numbers     := u16 count, u16 number...
+    str         := u8 length, utf-8 bytes
+
+Use convert_json_file_to_compact and convert_compact_file_to_json (or run this
+module as a script) to convert existing raceday files back and forth.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+from pathlib import Path
+
+try:
+    from server.racelogic.duration import Duration
+    from server.racelogic import laptimes
+except ImportError:
+    from duration import Duration
+    import laptimes
+
+import argparse
+import json
+import struct
+
+COMPACT_EXTENSION = ".rcb"
+JSON_EXTENSION = ".json"
+
+MAGIC = b"RCB\x01"
+
+FLAG_MANUAL = 1
+FLAG_DNS = 2
+FLAG_LAPTIMES = 4
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_NUMBER_AND_LAPS = struct.Struct("<HH")
+_NUMBER_AND_MILLISECONDS = struct.Struct("<Hi")
+_LAPTIME_SIZE = laptimes.DELTA_DTYPE.itemsize
+
+_RESULT_KEYS = {"positions", "num_laps_driven", "total_times",
+                "best_laptimes", "average_laptimes", "manual", "dns", "laptimes"}
+
+
+class _Writer:
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def raw(self, value: bytes) -> None:
+        self._parts.append(value)
+
+    def u8(self, value: int) -> None:
+        self._parts.append(_U8.pack(value))
+
+    def u16(self, value: int) -> None:
+        self._parts.append(_U16.pack(value))
+
+    def string(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self.u8(len(encoded))
+        self._parts.append(encoded)
+
+    def numbers(self, numbers: List[int]) -> None:
+        self.u16(len(numbers))
+        self._parts.append(struct.pack(f"<{len(numbers)}H", *numbers))
+
+    def pairs(self, pairs: List[Tuple[int, int]], pair_struct: struct.Struct) -> None:
+        self.u16(len(pairs))
+        self._parts.extend(pair_struct.pack(a, b) for a, b in pairs)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class _Reader:
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._offset = 0
+
+    def u8(self) -> int:
+        value, = _U8.unpack_from(self._data, self._offset)
+        self._offset += _U8.size
+        return value
+
+    def u16(self) -> int:
+        value, = _U16.unpack_from(self._data, self._offset)
+        self._offset += _U16.size
+        return value
+
+    def string(self) -> str:
+        length = self.u8()
+        value = self._data[self._offset:self._offset + length].decode("utf-8")
+        self._offset += length
+        return value
+
+    def numbers(self) -> List[int]:
+        count = self.u16()
+        numbers = list(struct.unpack_from(f"<{count}H", self._data, self._offset))
+        self._offset += count * _U16.size
+        return numbers
+
+    def pairs(self, pair_struct: struct.Struct) -> List[Tuple[int, int]]:
+        count = self.u16()
+        pairs = list(pair_struct.iter_unpack(
+            self._data[self._offset:self._offset + count * pair_struct.size]))
+        self._offset += count * pair_struct.size
+        return pairs
+
+    def bytes(self, length: int) -> bytes:
+        value = self._data[self._offset:self._offset + length]
+        self._offset += length
+        return value
+
+    def at_end(self) -> bool:
+        return self._offset == len(self._data)
+
+
+def is_compact(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def encode_raceday(json_raceday: Dict) -> bytes:
+    """
+    Encodes a raceday, given as the json dictionary (as written to the json files,
+    with durations as either Durations or {"milliseconds": ...} dictionaries).
+    Raises a ValueError if the raceday can't be represented losslessly.
+    """
+    writer = _Writer()
+    writer.raw(MAGIC)
+    try:
+        writer.numbers(json_raceday["all_participants"])
+        writer.u16(json_raceday["current_heat"])
+        _write_nested(writer, json_raceday["start_lists"], writer.numbers)
+        _write_nested(writer, json_raceday["results"], lambda result: _write_result(writer, result))
+    except struct.error as e:
+        raise ValueError(f"Raceday can't be stored in the compact format: {e}")
+    return writer.getvalue()
+
+
+def decode_raceday(data: bytes, convert_to_durations: bool = True) -> Dict:
+    """
+    Decodes a compact raceday into the same dictionary as the json files contain.
+    Durations are returned as Duration objects, or as {"milliseconds": ...}
+    dictionaries with string driver number keys (exactly as in the json) if
+    convert_to_durations is False.
+    """
+    if not is_compact(data):
+        raise ValueError("Not a compact raceday file")
+    reader = _Reader(data)
+    reader.bytes(len(MAGIC))
+    all_participants = reader.numbers()
+    current_heat = reader.u16()
+    start_lists = _read_nested(reader, reader.numbers)
+    results = _read_nested(reader, lambda: _read_result(reader, convert_to_durations))
+    if not reader.at_end():
+        raise ValueError("Trailing data in compact raceday file")
+    return {
+        "all_participants": all_participants,
+        "start_lists": start_lists,
+        "results": results,
+        "current_heat": current_heat,
+    }
+
+
+def _write_nested(writer: _Writer, heats: Dict[str, Dict[str, Dict[str, Any]]],
+                  write_value: Callable[[Any], None]) -> None:
+    writer.u16(len(heats))
+    for heat_name, classes in heats.items():
+        writer.string(heat_name)
+        writer.u16(len(classes))
+        for rcclass, groups in classes.items():
+            writer.string(rcclass)
+            writer.u16(len(groups))
+            for group, value in groups.items():
+                writer.string(group)
+                write_value(value)
+
+
+def _read_nested(reader: _Reader, read_value: Callable[[], Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    heats = {}
+    for _ in range(reader.u16()):
+        heat_name = reader.string()
+        classes = heats[heat_name] = {}
+        for _ in range(reader.u16()):
+            rcclass = reader.string()
+            groups = classes[rcclass] = {}
+            for _ in range(reader.u16()):
+                group = reader.string()
+                groups[group] = read_value()
+    return heats
+
+
+def _to_milliseconds(duration: Any) -> int:
+    milliseconds = duration["milliseconds"] if isinstance(duration, dict) else duration.milliseconds
+    if not isinstance(milliseconds, int):
+        raise ValueError(f"Duration {milliseconds} is not a whole number of milliseconds")
+    return milliseconds
+
+
+def _write_result(writer: _Writer, result: Dict) -> None:
+    unknown_keys = set(result) - _RESULT_KEYS
+    if unknown_keys:
+        raise ValueError(f"Result has keys the compact format can't store: {', '.join(sorted(unknown_keys))}")
+    has_dns = "dns" in result
+    has_laptimes = "laptimes" in result
+    writer.u8((FLAG_MANUAL if result["manual"] else 0) | (FLAG_DNS if has_dns else 0) |
+              (FLAG_LAPTIMES if has_laptimes else 0))
+    writer.numbers(result["positions"])
+    writer.pairs([(int(num), laps) for num, laps in result["num_laps_driven"].items()], _NUMBER_AND_LAPS)
+    writer.pairs([(int(num), _to_milliseconds(time)) for num, time in result["total_times"].items()],
+                 _NUMBER_AND_MILLISECONDS)
+    writer.pairs([(num, _to_milliseconds(time)) for num, time in result["best_laptimes"]],
+                 _NUMBER_AND_MILLISECONDS)
+    writer.pairs([(num, _to_milliseconds(time)) for num, time in result["average_laptimes"]],
+                 _NUMBER_AND_MILLISECONDS)
+    if has_dns:
+        writer.numbers(result["dns"])
+    if has_laptimes:
+        _write_laptimes(writer, result["laptimes"])
+
+
+def _write_laptimes(writer: _Writer, encoded_laptimes: Dict[Any, Any]) -> None:
+    writer.u16(len(encoded_laptimes))
+    for num, encoded in encoded_laptimes.items():
+        data = laptimes.to_bytes(encoded)
+        writer.u16(int(num))
+        writer.u16(len(data) // _LAPTIME_SIZE)
+        writer.raw(data)
+
+
+def _read_result(reader: _Reader, convert_to_durations: bool) -> Dict:
+    if convert_to_durations:
+        def to_duration(milliseconds): return Duration(milliseconds)
+        def to_key(num): return num
+    else:
+        def to_duration(milliseconds): return {"milliseconds": milliseconds}
+        def to_key(num): return str(num)
+
+    flags = reader.u8()
+    result = {
+        "positions": reader.numbers(),
+        "num_laps_driven": {to_key(num): laps for num, laps in reader.pairs(_NUMBER_AND_LAPS)},
+        "total_times": {to_key(num): to_duration(ms) for num, ms in reader.pairs(_NUMBER_AND_MILLISECONDS)},
+        "best_laptimes": [[num, to_duration(ms)] for num, ms in reader.pairs(_NUMBER_AND_MILLISECONDS)],
+        "average_laptimes": [[num, to_duration(ms)] for num, ms in reader.pairs(_NUMBER_AND_MILLISECONDS)],
+        "manual": bool(flags & FLAG_MANUAL),
+    }
+    if flags & FLAG_DNS:
+        result["dns"] = reader.numbers()
+    if flags & FLAG_LAPTIMES:
+        # kept encoded until they are used, as base64 text in the json
+        result["laptimes"] = {}
+        for _ in range(reader.u16()):
+            num = reader.u16()
+            encoded = reader.bytes(reader.u16() * _LAPTIME_SIZE)
+            result["laptimes"][to_key(num)] = encoded if convert_to_durations else laptimes.to_text(encoded)
+    return result
+
+
+def convert_json_file_to_compact(json_path: Path) -> Path:
+    """
+    Converts a json raceday file, and the journal of results added since it was
+    written, to the compact format next to it. The json file and the journal are
+    removed once the compact file has been verified to decode to the same raceday.
+    Returns the path of the compact file.
+    """
+    json_path = Path(json_path)
+    json_raceday = _get_raceday_module().read_raceday_file_as_json(json_path)
+    data = encode_raceday(json_raceday)
+    if decode_raceday(data, convert_to_durations=False) != json_raceday:
+        raise ValueError(f"{json_path} can't be converted to the compact format without losing data")
+    compact_path = json_path.with_suffix(COMPACT_EXTENSION)
+    # written in full before the json file is removed, so that a crash or a full disk can't lose the raceday
+    _get_raceday_module()._write_file_atomically(compact_path, data)
+    _get_raceday_module().remove_journal(json_path)
+    json_path.unlink()
+    return compact_path
+
+
+def convert_compact_file_to_json(compact_path: Path) -> Path:
+    """
+    Converts a compact raceday file, and its journal, back to a json file next to
+    it, and removes the compact file and the journal. Returns the path of the json file.
+    """
+    compact_path = Path(compact_path)
+    json_raceday = _get_raceday_module().read_raceday_file_as_json(compact_path)
+    json_path = compact_path.with_suffix(JSON_EXTENSION)
+    _get_raceday_module()._write_file_atomically(json_path, json.dumps(json_raceday, indent=2).encode("utf-8"))
+    _get_raceday_module().remove_journal(compact_path)
+    compact_path.unlink()
+    return json_path
+
+
+def _get_raceday_module():
+    # imported when needed, as raceday imports this module
+    try:
+        from server.racelogic import raceday
+    except ImportError:
+        import raceday
+    return raceday
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts raceday files between json and the compact format.")
+    parser.add_argument("direction", choices=("to-compact", "to-json"),
+                        help="Which format to convert the files to")
+    parser.add_argument("files", nargs="+", type=Path,
+                        help="The raceday files to convert")
+    args = parser.parse_args()
+
+    convert = convert_json_file_to_compact if args.direction == "to-compact" else convert_compact_file_to_json
+    for path in args.files:
+        new_path = convert(path)
+        print(f"{path} -> {new_path}")
+
+
+if __name__ == "__main__":
+    main()
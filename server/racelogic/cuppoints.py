@@ -0,0 +1,163 @@
+"""
+The cup point rules. Every heat after the qualifiers gives points, as lists of
+points per driver in each class: { rcclass: { Driver: [points] } }.
+
+How many points each place gives is set by ScoringRules, which are declared as
+a dictionary (for instance from a json file):
+{
+    "points_per_position": [40, 39, ...] or {"first": 40, "step": 1},
+    "finals_multiplier": 2,
+    "num_drop_races": 1,
+    "dns_policy": "no_points" or "position_points"
+}
+where the places in each heat are counted over all groups in the class, from the
+winner of the highest group. Missing entries are taken from the default rules.
+Points given as "first" and "step" keep stepping down after 0, so with more
+drivers than that the last places get negative points. Places after the end of
+a list of points get no points.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import server.racelogic.constants as constants
+except ImportError:
+    import constants
+
+import json
+
+RCCLASSES = ("2WD", "4WD")
+
+# drivers that did not start get no points, but still take up their place
+DNS_NO_POINTS = "no_points"
+# drivers that did not start get the points of their place
+DNS_POSITION_POINTS = "position_points"
+DNS_POLICIES = (DNS_NO_POINTS, DNS_POSITION_POINTS)
+
+DEFAULT_RULES_DEFINITION = {
+    "points_per_position": {"first": constants.MAX_POINTS_IN_NON_FINALS, "step": 1},
+    "finals_multiplier": constants.MAX_POINTS_IN_FINALS // constants.MAX_POINTS_IN_NON_FINALS,
+    "num_drop_races": 1,
+    "dns_policy": DNS_NO_POINTS,
+}
+
+
+class ScoringRules:
+    """
+    Scoring rules, compiled from their definition into the points of each place
+    in the non-finals and the finals, down to the last place with points.
+    """
+
+    def __init__(self, definition: Optional[Dict[str, Any]] = None):
+        self.definition: Dict[str, Any] = {**DEFAULT_RULES_DEFINITION, **(definition or {})}
+
+        points_per_position = self.definition["points_per_position"]
+        # the first points and the step of points given as such, None for a list
+        self._first_and_step: Optional[Tuple[int, int]] = None
+        if isinstance(points_per_position, dict):
+            self._first_and_step = points_per_position["first"], points_per_position["step"]
+            points_per_position = list(range(points_per_position["first"], 0, -points_per_position["step"]))
+        finals_multiplier = self.definition["finals_multiplier"]
+        self.non_finals_points: Tuple[int, ...] = tuple(int(points) for points in points_per_position)
+        self.finals_points: Tuple[int, ...] = tuple(int(points * finals_multiplier)
+                                                    for points in self.non_finals_points)
+        self.num_drop_races: int = self.definition["num_drop_races"]
+        self.dns_policy: str = self.definition["dns_policy"]
+        if self.dns_policy not in DNS_POLICIES:
+            raise ValueError(f"Unknown DNS policy {self.dns_policy}, expected one of {', '.join(DNS_POLICIES)}")
+
+    def get_points_after_table(self, position: int, is_finals: bool) -> int:
+        """Returns the points of a place after the last one in the points tables."""
+        if self._first_and_step is None:
+            return 0
+        first, step = self._first_and_step
+        points = first - step * position
+        return int(points * self.definition["finals_multiplier"]) if is_finals else points
+
+    def __eq__(self, other):
+        if not isinstance(other, ScoringRules):
+            return NotImplemented
+        return self.definition == other.definition
+
+    def __hash__(self):
+        return hash(json.dumps(self.definition, sort_keys=True))
+
+
+DEFAULT_RULES = ScoringRules()
+
+
+def should_get_points(group_results, driver, rules: ScoringRules = DEFAULT_RULES) -> bool:
+    if rules.dns_policy == DNS_POSITION_POINTS:
+        return True
+    return not (group_results.has_dns() and not group_results.did_driver_start(driver))
+
+
+def calculate_points_from_non_finals(results: Dict[str, Dict], points: Dict[str, Dict[object, List[int]]],
+                                     rules: ScoringRules = DEFAULT_RULES) -> None:
+    points_table = rules.non_finals_points
+    for rcclass in points:
+        # iterate such that we parse A group first
+        position = 0
+        for group in sorted(results[rcclass]):
+            positions = results[rcclass][group].positions
+            for driver in positions:
+                if should_get_points(results[rcclass][group], driver, rules):
+                    points[rcclass][driver].append(points_table[position] if position < len(points_table)
+                                                   else rules.get_points_after_table(position, False))
+                else:
+                    points[rcclass][driver].append(0)
+                position += 1
+
+
+def calculate_points_from_finals(results: Dict[str, Dict], points: Dict[str, Dict[object, List[int]]],
+                                 rules: ScoringRules = DEFAULT_RULES) -> None:
+    points_table = rules.finals_points
+    drivers_counted = set()
+    for rcclass in points:
+        # iterate such that we parse A group first
+        position = 0
+        for group in sorted(results[rcclass]):
+            positions = results[rcclass][group].positions
+            for driver in positions:
+                if driver not in drivers_counted:
+                    drivers_counted.add(driver)
+                    if should_get_points(results[rcclass][group], driver, rules):
+                        points[rcclass][driver].append(points_table[position] if position < len(points_table)
+                                                       else rules.get_points_after_table(position, True))
+                    position += 1
+
+
+def create_empty_points(rcclasses: Iterable[str] = RCCLASSES) -> Dict[str, Dict[object, List[int]]]:
+    return {rcclass: defaultdict(list) for rcclass in rcclasses}
+
+
+def calculate_heat_points(results: Dict[str, Dict], is_finals: bool,
+                          rules: ScoringRules = DEFAULT_RULES) -> Dict[str, Dict[object, List[int]]]:
+    """Returns the points from the results of a completed heat."""
+    points = create_empty_points(results)
+    if is_finals:
+        calculate_points_from_finals(results, points, rules)
+    else:
+        calculate_points_from_non_finals(results, points, rules)
+    return points
+
+
+def add_heat_points(points: Dict[str, Dict[object, List[int]]], heat_points: Dict[str, Dict[object, List[int]]]) -> None:
+    for rcclass, class_heat_points in heat_points.items():
+        class_points = points.setdefault(rcclass, defaultdict(list))
+        for driver, point_list in class_heat_points.items():
+            class_points[driver].extend(point_list)
+
+
+def sum_points(points: Dict[str, Dict[object, List[int]]]) -> Dict[object, int]:
+    return {driver: sum(point_list)
+            for rcclass in points
+            for driver, point_list in points[rcclass].items()}
+
+
+def get_seeding_key(point_list: List[int]) -> Tuple[int, Tuple[int, ...]]:
+    """
+    Returns the key drivers are seeded by in the finals: the total points, and on
+    equal totals the best heat results, compared from the best one down.
+    """
+    return sum(point_list), tuple(sorted((points for points in point_list if points), reverse=True))
@@ -1,7 +1,30 @@
 class Duration:
+    """
+    An immutable length of time, stored as whole milliseconds. Durations are
+    created for every lap and result time, so they are slotted and their
+    formatting is computed once.
+    """
+
+    __slots__ = ("milliseconds", "_formatted")
 
     def __init__(self, milliseconds=0, seconds=0, minutes=0):
-        self.milliseconds = milliseconds + seconds * 1000 + minutes * 60 * 1000
+        object.__setattr__(self, "milliseconds", milliseconds + seconds * 1000 + minutes * 60 * 1000)
+        object.__setattr__(self, "_formatted", None)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Duration is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("Duration is immutable")
+
+    def __reduce__(self):
+        return Duration, (self.milliseconds,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def minutes_seconds_milliseconds(self):
         minutes = (self.milliseconds / 1000) // 60
@@ -16,6 +39,8 @@ class Duration:
         return Duration(int(self.milliseconds * num))
 
     def __eq__(self, other):
+        if not isinstance(other, Duration):
+            return NotImplemented
         return self.milliseconds == other.milliseconds
 
     def __ge__(self, other):
@@ -35,8 +60,10 @@ class Duration:
         return f"Duration(minutes={minutes}, seconds={seconds}, milliseconds={milliseconds})"
 
     def __str__(self):
-        minutes, seconds, milliseconds = self.minutes_seconds_milliseconds()
-        return f"{minutes}:{seconds:02d}:{milliseconds:03d}"
+        if self._formatted is None:
+            minutes, seconds, milliseconds = self.minutes_seconds_milliseconds()
+            object.__setattr__(self, "_formatted", f"{minutes}:{seconds:02d}:{milliseconds:03d}")
+        return self._formatted
 
     def __hash__(self):
         return self.milliseconds
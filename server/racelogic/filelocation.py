@@ -1,4 +1,15 @@
+"""
+Finds the RCM result files on the USB drive. Besides reading the latest result
+once, the drive can be watched for new or modified result files, which uses
+inotify on Linux and falls back to polling the drive elsewhere.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import ctypes
+import ctypes.util
 import os
+import select
+import struct
 import time
 import json
 import sys
@@ -13,26 +24,229 @@ if os.path.isfile("settings.json"):
 
 DRIVE_MOUNT_LOCATION = SETTINGS["drive"]
 
+# how often the drive is checked when it isn't mounted, or can't be watched with inotify
+POLL_INTERVAL = 0.25
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_UNMOUNT = 0x2000
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+# struct inotify_event without its name: wd, mask, cookie, len
+_INOTIFY_EVENT = struct.Struct("iIII")
+# the watched folder is gone, or events were lost, so the folder has to be scanned again
+_INOTIFY_RESCAN_MASK = _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_UNMOUNT | _IN_Q_OVERFLOW | _IN_IGNORED
+
+
+def get_race_number(filename: str) -> Optional[int]:
+    """Returns the number of the race of an RCM result file, or None if it isn't one."""
+    number = filename.replace('_', '').replace('.html', '')
+    return int(number) if number.isnumeric() else None
+
+
+def read_html_file(path: str) -> str:
+    with open(path, encoding="utf-16-le") as f:
+        return f.read()
+
+
 def find_and_read_latest_html_file():
-    while not (os.path.isdir(DRIVE_MOUNT_LOCATION) and os.listdir(DRIVE_MOUNT_LOCATION)):
-        print("Hittade inte USB-minnet, försöker igen om 3 sekunder...")
-        time.sleep(3)
+    return read_html_file(find_latest_html_file())
+
 
-    folder_path = os.path.join(DRIVE_MOUNT_LOCATION)
-    files = os.listdir(folder_path)
+def find_latest_html_file(folder: str = DRIVE_MOUNT_LOCATION) -> str:
+    """
+    Returns the path of the result file of the latest race on the USB drive, once
+    it has stopped changing for a poll interval, as RCM may still be writing it.
+    """
+    if not os.path.isdir(folder):
+        print(f"Hittade inte USB-minnet {folder}!")
+        sys.exit(-1)
 
-    numeric_files = [f for f in files if f.replace('_', '').replace('.html', '').isnumeric()]
-    if not numeric_files:
+    index = ResultFileIndex(folder)
+    index.update(require_settled=True)
+    filenames = index.get_unsettled()
+    if not filenames:
         print("Det finns inga resultat på USB-minnet!")
         sys.exit(-1)
 
-    latest = max(numeric_files, key=lambda f: int(f.replace('_', '').replace('.html', '')))
+    latest = max(filenames, key=get_race_number)
+    while not index.update([latest], require_settled=True):
+        time.sleep(POLL_INTERVAL)
+    return os.path.join(folder, latest)
+
+
+class ResultFileIndex:
+    """
+    The result files seen in a folder, with the modification time and size they
+    had when they were last reported. Updating the index only stats the files
+    that are asked about, and reports the files that are new or have changed.
+    If modified_after_ns is given, the files last modified before that time (in
+    nanoseconds since the epoch) count as seen whenever the folder appears, so
+    that they are not reported at all.
+    """
+
+    def __init__(self, folder: str, modified_after_ns: Optional[int] = None):
+        self.folder: str = folder
+        self.modified_after_ns: Optional[int] = modified_after_ns
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        # the files which have changed, but hadn't settled when they were last seen
+        self._unsettled: Dict[str, Tuple[int, int]] = {}
+        # whether the folder was there when it was last scanned
+        self._is_present: bool = False
+
+    def update(self, filenames: Optional[List[str]] = None, require_settled: bool = False) -> List[str]:
+        """
+        Updates the index with the given files of the folder, or every result file
+        in it if None, and returns the paths of the ones which are new or modified,
+        in race order. If require_settled, a changed file is only reported once it
+        is unchanged since the last update, so that files still being written are not.
+        """
+        if filenames is None:
+            try:
+                with os.scandir(self.folder) as entries:
+                    stats = {entry.name: entry.stat() for entry in entries
+                             if get_race_number(entry.name) is not None and entry.is_file()}
+            except OSError:
+                self._is_present = False
+                return []
+            if not self._is_present:
+                self._is_present = True
+                self._add_files_modified_before(stats)
+        else:
+            stats = {}
+            for filename in filenames:
+                if get_race_number(filename) is None:
+                    continue
+                try:
+                    stats[filename] = os.stat(os.path.join(self.folder, filename))
+                except OSError:
+                    self._unsettled.pop(filename, None)
+                    continue
+
+        changed = []
+        for filename, stat in stats.items():
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self._seen.get(filename) == key:
+                continue
+            if require_settled and self._unsettled.get(filename) != key:
+                self._unsettled[filename] = key
+                continue
+            self._unsettled.pop(filename, None)
+            self._seen[filename] = key
+            changed.append(filename)
+        changed.sort(key=get_race_number)
+        return [os.path.join(self.folder, filename) for filename in changed]
+
+    def _add_files_modified_before(self, stats: Dict[str, os.stat_result]) -> None:
+        if self.modified_after_ns is None:
+            return
+        for filename, stat in stats.items():
+            if stat.st_mtime_ns < self.modified_after_ns:
+                self._seen[filename] = (stat.st_mtime_ns, stat.st_size)
+
+    def get_unsettled(self) -> List[str]:
+        """Returns the names of the files which have changed, but hadn't settled when they were last seen."""
+        return list(self._unsettled)
+
+
+class _Inotify:
+    """A minimal inotify watch on a single folder through libc, for the events of finished files."""
+
+    def __init__(self, libc: ctypes.CDLL):
+        self._libc = libc
+        self._fd: int = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watch_descriptor: Optional[int] = None
+
+    @staticmethod
+    def create() -> Optional["_Inotify"]:
+        """Returns an inotify instance, or None if inotify isn't available on this system."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            return _Inotify(libc)
+        except (OSError, AttributeError):
+            return None
+
+    def is_watching(self) -> bool:
+        return self._watch_descriptor is not None
+
+    def watch(self, folder: str) -> bool:
+        watch_descriptor = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF)
+        self._watch_descriptor = watch_descriptor if watch_descriptor >= 0 else None
+        return self.is_watching()
+
+    def read_filenames(self, timeout: float) -> Optional[List[str]]:
+        """
+        Waits up to timeout seconds for files to be written, and returns their names.
+        Returns None if the folder has to be scanned again, as it or the watch is gone.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        filenames = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if mask & _INOTIFY_RESCAN_MASK:
+                self._watch_descriptor = None
+                return None
+            filenames.append(os.fsdecode(name))
+        return filenames
+
+    def close(self) -> None:
+        os.close(self._fd)
 
-    contents = None
-    with open(os.path.join(DRIVE_MOUNT_LOCATION, latest), encoding="utf-16-le") as f:
-        contents = f.read()
 
-    return contents
+def watch_result_files(folder: str = DRIVE_MOUNT_LOCATION, poll_interval: float = POLL_INTERVAL,
+                       use_inotify: bool = True) -> Iterator[str]:
+    """
+    Yields the path of every result file which is added to or modified in the
+    folder from now on, for as long as the generator is used, once the file has
+    stopped changing for a poll interval. The folder may come and go, as when the
+    USB drive is removed, and is scanned for new files whenever it appears. The
+    files that were last modified before the watching started count as seen, also
+    when the folder appears later, as when the drive is inserted with the reports
+    of earlier racedays on it.
+    """
+    index = ResultFileIndex(folder, modified_after_ns=time.time_ns())
+    inotify = _Inotify.create() if use_inotify else None
+    try:
+        while True:
+            if inotify is not None and inotify.is_watching():
+                filenames = inotify.read_filenames(poll_interval)
+                # lost events are made up for by scanning the whole folder
+                if filenames is not None:
+                    # RCM writes a report in several passes, so a written file is checked
+                    # again until it hasn't changed for a poll interval
+                    filenames += index.get_unsettled()
+                changed = index.update(filenames, require_settled=True)
+            else:
+                time.sleep(poll_interval)
+                if inotify is not None and os.path.isdir(folder) and inotify.watch(folder):
+                    # the files that appeared while the folder wasn't watched are finished
+                    changed = index.update()
+                else:
+                    changed = index.update(require_settled=True)
+            yield from changed
+    finally:
+        if inotify is not None:
+            inotify.close()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 from html.parser import HTMLParser
-from functools import reduce
 from collections import defaultdict
-from typing import List, Tuple, Dict
+from typing import Callable, List, Optional, Tuple, Dict
+
+import codecs
+import html
+import os
+import re
 
 try:
     from server.racelogic.duration import Duration
@@ -24,10 +28,18 @@ class HeaderRow:
 
 class RCMHtmlParser(HTMLParser):
 
-    def __init__(self):
+    def __init__(self, lap_callback: Optional[Callable[[int, str, int, int], None]] = None):
+        """
+        lap_callback is called with (number, name, lap, milliseconds) for every lap
+        time as it is parsed, where lap 0 is the time to the first passing.
+        """
         super().__init__()
+        self.lap_callback = lap_callback
+        # the end of the data fed with feed_chunk, which is held back until its tag is complete
+        self._unfed_data = ""
         self.header = defaultdict(HeaderRow)
         self.result_header = []
+        # (number, name) mapped to the lap times in milliseconds
         self.result = defaultdict(list)
         self._parsing_header = True
         self._parsing_table = False
@@ -40,6 +52,27 @@ class RCMHtmlParser(HTMLParser):
 
     def parse_data(self, contents):
         self.feed(contents)
+        self._add_drivers_without_laps()
+
+    def feed_chunk(self, contents):
+        """
+        Parses the next part of a report that is still being written. Everything
+        up to the last complete tag is parsed, and the rest is kept for the next
+        chunk, so that no text is parsed before the whole of it has arrived.
+        """
+        self._unfed_data += contents
+        end = self._unfed_data.rfind('>') + 1
+        if end > 0:
+            self.feed(self._unfed_data[:end])
+            self._unfed_data = self._unfed_data[end:]
+
+    def finish(self):
+        """Parses what is left of a report fed with feed_chunk, once the report is complete."""
+        self.feed(self._unfed_data)
+        self._unfed_data = ""
+        self._add_drivers_without_laps()
+
+    def _add_drivers_without_laps(self):
         for number_name in self.result_header:
             if number_name not in self.result:
                 self.result[number_name] = []
@@ -116,9 +149,10 @@ class RCMHtmlParser(HTMLParser):
             seconds = int(seconds_string)
             milliseconds = int(milliseconds_string)
 
-            duration = Duration(milliseconds=milliseconds, seconds=seconds, minutes=minutes)
-
-            self.result[(number, name)].append(duration)
+            laptimes = self.result[(number, name)]
+            laptimes.append(milliseconds + seconds * 1000 + minutes * 60 * 1000)
+            if self.lap_callback is not None:
+                self.lap_callback(number, name, len(laptimes) - 1, laptimes[-1])
 
             self._driver_index += 1
 
@@ -159,8 +193,149 @@ class RCMHtmlParser(HTMLParser):
                 self.result_header.append((int(number), name))
 
 
+class RCMReportTokenizer:
+    """
+    A faster parser of complete RCM reports, which gives the same result_header
+    and result as RCMHtmlParser. Instead of parsing every tag, it finds the lap
+    time tables with precompiled regular expressions over the layout of the
+    report: the first table with a <tr valign="top"> header row is the standings,
+    and every one after it is a table of the lap times of up to ten drivers.
+    Each cell is then handled like the data RCMHtmlParser gets for it.
+    """
+
+    _TABLE_START = re.compile(r'<tr\s+valign\s*=\s*"?top"?\s*>', re.I)
+    _HEADER_END = re.compile(r'<tr\s*>', re.I)
+    # the contents of a cell, matched without backtracking over every character of it
+    _CELL = re.compile(r'<td\b[^>]*>([^<]*(?:<(?!/td\s*>)[^<]*)*)</td\s*>', re.I)
+    _TAG = re.compile(r'<[^>]*>')
+    _LAPTIME = re.compile(r'(?:(\d+):)?(\d+)\.(\d+)')
+
+    def __init__(self, lap_callback: Optional[Callable[[int, str, int, int], None]] = None):
+        self.lap_callback = lap_callback
+        self.result_header = []
+        # (number, name) mapped to the lap times in milliseconds
+        self.result = defaultdict(list)
+
+    def parse_data(self, contents):
+        table_starts = self._TABLE_START.finditer(contents)
+        # the standings
+        next(table_starts, None)
+        for table_start in table_starts:
+            table_end = contents.find("</table", table_start.end())
+            table_html = contents[table_start.end():table_end if table_end >= 0 else len(contents)]
+            header_end = self._HEADER_END.search(table_html)
+            if header_end is None:
+                continue
+            result_header_index_start = len(self.result_header)
+            for cell in self._CELL.findall(table_html, 0, header_end.start()):
+                self._handle_header_cell(cell)
+            self._handle_laptime_cells(self._CELL.findall(table_html, header_end.end()),
+                                       result_header_index_start)
+
+        for number_name in self.result_header:
+            if number_name not in self.result:
+                self.result[number_name] = []
+
+    @staticmethod
+    def _get_texts(cell):
+        """Returns the texts of a cell, the way RCMHtmlParser gets them as data."""
+        # every cell has non-breaking spaces, which are much faster to replace than to unescape
+        cell = cell.replace("&nbsp;", "\xa0")
+        if '<' not in cell and '&' not in cell:
+            return (cell,) if cell else ()
+        texts = RCMReportTokenizer._TAG.split(cell)
+        if '&' in cell:
+            texts = [html.unescape(text) for text in texts]
+        return [text for text in texts if text]
+
+    def _handle_header_cell(self, cell):
+        for text in self._get_texts(cell):
+            text = text.strip()
+            if text != "" and "# nr" not in text.lower():
+                number, _, name = text.partition(" ")
+                self.result_header.append((int(number), name))
+
+    def _handle_laptime_cells(self, cells, result_header_index_start):
+        result_header = self.result_header
+        num_drivers = len(result_header)
+        driver_index = result_header_index_start
+        parsing_bold_time = False
+        for cell in cells:
+            for text in self._get_texts(cell):
+                text = text.strip()
+                if text == "":
+                    if driver_index >= num_drivers:
+                        # we have a bunch of empty cells we need to skip
+                        continue
+                    if parsing_bold_time:
+                        parsing_bold_time = False
+                    else:
+                        driver_index += 1
+                    continue
+                if text.isdigit():
+                    # the lap number, which starts a row
+                    driver_index = result_header_index_start
+                    continue
+
+                number_name = result_header[driver_index]
+                time_string = text.rpartition(' ')[2]
+                if not time_string.replace('.', '').replace(':', '').isnumeric():
+                    # the best lap time is in <b>-tags, so the time comes in the next text
+                    parsing_bold_time = True
+                    continue
+                minutes, seconds, milliseconds = self._LAPTIME.fullmatch(time_string).groups()
+                laptimes = self.result[number_name]
+                laptimes.append(int(milliseconds) + int(seconds) * 1000 + int(minutes or 0) * 60 * 1000)
+                if self.lap_callback is not None:
+                    self.lap_callback(number_name[0], number_name[1], len(laptimes) - 1, laptimes[-1])
+                driver_index += 1
+
+
+class ReportTail:
+    """
+    Follows an RCM report that is being written, and feeds what has been added to
+    it since the last read to a parser. The report is decoded incrementally, so a
+    character split between two reads is decoded once the rest of it has arrived.
+    If the report is rewritten from the start, it is parsed again with a new parser.
+    """
+
+    def __init__(self, path: str, lap_callback: Optional[Callable[[int, str, int, int], None]] = None):
+        self.path: str = path
+        self.lap_callback = lap_callback
+        self.parser: RCMHtmlParser = RCMHtmlParser(lap_callback)
+        self._offset: int = 0
+        self._decoder = codecs.getincrementaldecoder("utf-16-le")()
+
+    def read(self) -> bool:
+        """Parses what has been added to the report. Returns whether anything was added."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        if size < self._offset:
+            self.parser = RCMHtmlParser(self.lap_callback)
+            self._offset = 0
+            self._decoder.reset()
+        if size == self._offset:
+            return False
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        self._offset += len(data)
+        self.parser.feed_chunk(self._decoder.decode(data))
+        return True
+
+    def finish(self) -> RCMHtmlParser:
+        """Parses the rest of the report, once it is complete, and returns the parser."""
+        self.read()
+        self.parser.feed_chunk(self._decoder.decode(b"", final=True))
+        self.parser.finish()
+        return self.parser
+
+
 def get_total_times(parser) -> Dict[int, Duration]:
-    return {int(number): reduce(lambda a, b: a + b, laptimes, Duration(0))
+    return {int(number): Duration(sum(laptimes))
             for (number, _), laptimes in parser.result.items()}
 
 
@@ -173,20 +348,26 @@ def get_num_laps_driven(parser) -> Dict[int, int]:
             for (number, _), laptimes in parser.result.items()}
 
 
+def get_laptimes(parser) -> Dict[int, List[int]]:
+    """Returns every lap time of each driver in milliseconds, including the time to the first passing."""
+    return {int(number): list(laptimes) for (number, _), laptimes in parser.result.items()}
+
+
 def get_positions(total_times, num_laps_driven) -> List[int]:
     orderings = []
     for number, num_laps_driven in num_laps_driven.items():
-        orderings.append((int(number), num_laps_driven, total_times[number]))
+        orderings.append((num_laps_driven, -total_times[number].milliseconds, int(number)))
 
-    orderings_sorted = sorted(orderings, key=lambda k: (k[1], -k[2].milliseconds), reverse=True)
+    orderings_sorted = sorted(orderings, key=lambda k: k[:2], reverse=True)
 
-    return [number for number, _, _ in orderings_sorted]
+    return [number for _, _, number in orderings_sorted]
 
 
 def get_best_laptimes(parser) -> List[Tuple[int, Duration]]:
-    best_times = [(int(number), min(laptimes[1:], key=lambda lt: lt.milliseconds))
+    best_times = [(min(laptimes[1:]), int(number))
                   for (number, _), laptimes in parser.result.items() if len(laptimes) > 1]
-    return sorted(best_times, key=lambda k: k[1])
+    best_times.sort(key=lambda k: k[0])
+    return [(number, Duration(milliseconds)) for milliseconds, number in best_times]
 
 
 def get_average_laptimes(total_times, num_laps_driven) -> List[Tuple[int, Duration]]:
@@ -0,0 +1,74 @@
+"""
+The lap times of every driver in a race. Each driver's lap times are stored
+delta encoded, as the first lap time followed by the difference of each lap to
+the lap before it, packed as little endian int32. In the json files the packed
+bytes are base64 encoded, while the compact format and the store keep them as
+they are. The lap times are only decoded when a driver's laps are asked for, so
+results that are only used for their totals never decode them.
+"""
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
+
+import base64
+
+import numpy as np
+
+DELTA_DTYPE = np.dtype("<i4")
+
+
+def encode(laptimes: Sequence[int]) -> bytes:
+    """Delta encodes lap times in milliseconds."""
+    milliseconds = np.asarray(laptimes, dtype=np.int64)
+    deltas = np.diff(milliseconds, prepend=0)
+    if len(deltas) and (deltas.min() < np.iinfo(DELTA_DTYPE).min or deltas.max() > np.iinfo(DELTA_DTYPE).max):
+        raise ValueError("Lap times differ too much to be delta encoded as int32")
+    return deltas.astype(DELTA_DTYPE).tobytes()
+
+
+def decode(data: bytes) -> np.ndarray:
+    """Decodes delta encoded lap times into an int32 array of milliseconds."""
+    return np.cumsum(np.frombuffer(data, dtype=DELTA_DTYPE), dtype=np.int32)
+
+
+def to_bytes(encoded: Union[bytes, str]) -> bytes:
+    """Returns the packed bytes of encoded lap times, which may be given as base64 text (as in the json files)."""
+    return base64.b64decode(encoded) if isinstance(encoded, str) else bytes(encoded)
+
+
+def to_text(encoded: Union[bytes, str]) -> str:
+    return encoded if isinstance(encoded, str) else base64.b64encode(encoded).decode("ascii")
+
+
+class LapTimes:
+    """The lap times of the drivers of a race, by driver number, decoded on first use."""
+
+    def __init__(self, encoded: Dict[Any, Union[bytes, str]]):
+        self._encoded: Dict[int, Union[bytes, str]] = {int(number): data for number, data in encoded.items()}
+        self._decoded: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_milliseconds(cls, laptimes: Dict[Any, Sequence[int]]) -> "LapTimes":
+        return cls({number: encode(driver_laptimes) for number, driver_laptimes in laptimes.items()})
+
+    def __contains__(self, number: int) -> bool:
+        return number in self._encoded
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def numbers(self) -> Iterable[int]:
+        return self._encoded.keys()
+
+    def get(self, number: int) -> Optional[np.ndarray]:
+        """Returns the lap times of a driver in milliseconds, or None if the driver has none."""
+        if number not in self._encoded:
+            return None
+        if number not in self._decoded:
+            self._decoded[number] = decode(to_bytes(self._encoded[number]))
+        return self._decoded[number]
+
+    def is_decoded(self, number: int) -> bool:
+        return number in self._decoded
+
+    def get_serializable(self) -> Dict[int, str]:
+        """Returns the encoded lap times as base64 text, as they are written to the json files."""
+        return {number: to_text(data) for number, data in self._encoded.items()}
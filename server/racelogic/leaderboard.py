@@ -0,0 +1,250 @@
+"""
+All-time and per-season leaderboards. The statistics each raceday gives every
+driver (points, raceday wins and podiums, starts, DNS and best lap) are kept in
+one small json file per raceday in the leaderboard folder of the result folder,
+and only the file of a raceday is rewritten when it is saved. The totals and
+rankings per season and class are summed up from those files once, and then
+kept up to date by replacing the statistics of a saved raceday in them, so that
+looking up a leaderboard is a dictionary lookup.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pathlib import Path
+
+try:
+    from server.racelogic import raceday as rd
+except ImportError:
+    import raceday as rd
+
+import datetime
+import json
+import os
+import shutil
+import threading
+
+LEADERBOARD_FOLDER_NAME = "leaderboard"
+
+# the season key of the leaderboards over all seasons
+ALL_TIME = "all"
+
+SUMMED_STATS = ("points", "racedays", "wins", "podiums", "starts", "dns")
+
+_lock = threading.Lock()
+# the leaderboard as last read or updated by this process
+_loaded: Optional["_Leaderboard"] = None
+
+
+class _Leaderboard:
+    """The raceday entries of the leaderboard folder, and the totals and rankings summed up from them."""
+
+    def __init__(self, folder: Path, key: Tuple, entries: Dict[str, Dict]):
+        self.folder: Path = folder
+        # the modification time of the folder, which changes whenever an entry is written
+        self.key: Tuple = key
+        # by raceday filename, with the car numbers as strings as in the files
+        self.entries: Dict[str, Dict] = entries
+        self.totals: Dict[Any, Dict[str, Dict[int, Dict]]] = {}
+        self.rankings: Dict[Any, Dict[str, List[Dict]]] = {}
+        for entry in entries.values():
+            self._add(entry)
+        for season, season_totals in self.totals.items():
+            for rcclass in season_totals:
+                self._rank(season, rcclass)
+
+    def replace_entry(self, filename_no_ext: str, entry: Dict) -> None:
+        """Replaces the statistics of a raceday, and ranks again only the seasons and classes it is in."""
+        old_entry = self.entries.get(filename_no_ext)
+        changed = set()
+        if old_entry is not None:
+            changed |= self._subtract(old_entry)
+        self.entries[filename_no_ext] = entry
+        changed |= self._add(entry)
+        if old_entry is not None:
+            self._update_best_laptimes(old_entry)
+        for season, rcclass in changed:
+            self._rank(season, rcclass)
+
+    def _add(self, entry: Dict) -> Set[Tuple[Any, str]]:
+        changed = set()
+        for season, rcclass, number, stats in _get_entry_stats(entry):
+            class_totals = self.totals.setdefault(season, {}).setdefault(rcclass, {})
+            if number not in class_totals:
+                class_totals[number] = dict(number=number, best_laptime=None, **dict.fromkeys(SUMMED_STATS, 0))
+            driver_totals = class_totals[number]
+            for stat_name in SUMMED_STATS:
+                driver_totals[stat_name] += stats[stat_name]
+            if stats["best_laptime"] is not None and (driver_totals["best_laptime"] is None or
+                                                      stats["best_laptime"] < driver_totals["best_laptime"]):
+                driver_totals["best_laptime"] = stats["best_laptime"]
+            changed.add((season, rcclass))
+        return changed
+
+    def _subtract(self, entry: Dict) -> Set[Tuple[Any, str]]:
+        changed = set()
+        for season, rcclass, number, stats in _get_entry_stats(entry):
+            class_totals = self.totals[season][rcclass]
+            driver_totals = class_totals[number]
+            for stat_name in SUMMED_STATS:
+                driver_totals[stat_name] -= stats[stat_name]
+            if not driver_totals["racedays"]:
+                del class_totals[number]
+            changed.add((season, rcclass))
+        return changed
+
+    def _update_best_laptimes(self, old_entry: Dict) -> None:
+        # a best lap can't be subtracted, so the best laps that came from the old entry are found again
+        for season, rcclass, number, stats in _get_entry_stats(old_entry):
+            driver_totals = self.totals[season][rcclass].get(number)
+            if driver_totals is None or stats["best_laptime"] != driver_totals["best_laptime"]:
+                continue
+            driver_stats = (entry["classes"].get(rcclass, {}).get(str(number)) for entry in self.entries.values()
+                            if season in (entry["season"], ALL_TIME))
+            driver_totals["best_laptime"] = min((stats["best_laptime"] for stats in driver_stats
+                                                 if stats is not None and stats["best_laptime"] is not None),
+                                                default=None)
+
+    def _rank(self, season: Any, rcclass: str) -> None:
+        # copies, so that the rows already handed out don't change with the totals
+        self.rankings.setdefault(season, {})[rcclass] = sorted(
+            (dict(driver_totals) for driver_totals in self.totals[season][rcclass].values()),
+            key=lambda s: (-s["points"], -s["wins"], -s["podiums"], s["number"]))
+
+
+def get_leaderboard_folder() -> Path:
+    return rd.RESULT_FOLDER_PATH / LEADERBOARD_FOLDER_NAME
+
+
+def get_leaderboard(rcclass: str, season: Any = ALL_TIME) -> List[Dict]:
+    """
+    Returns the leaderboard of a class, either over all seasons or for a single
+    season (year), as a list of the statistics of each driver, best first:
+    { number, points, racedays, wins, podiums, starts, dns, best_laptime (milliseconds) }.
+    The leaderboard folder is built from all raceday files the first time it's needed.
+    """
+    return _get_rankings().get(season, {}).get(rcclass, [])
+
+
+def get_seasons() -> List[int]:
+    return sorted((season for season in _get_rankings() if season != ALL_TIME), reverse=True)
+
+
+def build_leaderboard() -> int:
+    """Builds the leaderboard folder from all raceday files. Returns the number of racedays."""
+    with _lock:
+        return _build_leaderboard(get_leaderboard_folder())
+
+
+def _build_leaderboard(folder: Path) -> int:
+    # called with the lock held, so that no raceday is saved between reading the racedays and writing the folder
+    racedays = {}
+    for date in rd.get_all_dates():
+        filename = rd.get_raceday_filename_date(datetime.datetime.strptime(date, "%Y-%m-%d"))
+        racedays[filename] = _get_raceday_entry(filename, rd.get_raceday_with_filename(filename))
+    shutil.rmtree(folder, ignore_errors=True)
+    folder.mkdir()
+    for filename, entry in racedays.items():
+        _write_entry(folder, filename, entry)
+    return len(racedays)
+
+
+def update_raceday(filename_no_ext: str, raceday: rd.Raceday) -> None:
+    """
+    Updates the statistics of a saved raceday in the leaderboard, if it has been
+    built. Only the raceday's own file is written, and the loaded totals of this
+    process are updated with the difference. This is the save listener of the
+    leaderboard, which the app and the command line add with rd.add_save_listener.
+    """
+    folder = get_leaderboard_folder()
+    with _lock:
+        if not folder.is_dir():
+            return
+        entry = _get_raceday_entry(filename_no_ext, raceday)
+        is_up_to_date = _loaded is not None and _loaded.folder == folder and _loaded.key == _get_folder_key(folder)
+        _write_entry(folder, filename_no_ext, entry)
+        if is_up_to_date:
+            # as it is read from its file, with the car numbers as strings
+            _loaded.replace_entry(filename_no_ext, json.loads(json.dumps(entry)))
+            _loaded.key = _get_folder_key(folder)
+
+
+def get_raceday_stats(raceday: rd.Raceday) -> Dict[str, Dict[int, Dict]]:
+    """Returns the statistics a raceday gives each driver, { rcclass: { number: stats } }."""
+    _, points_per_race = raceday.get_cup_points()
+    stats_per_class: Dict[str, Dict[int, Dict]] = {}
+
+    def stats(rcclass: str, driver: rd.Driver) -> Dict:
+        class_stats = stats_per_class.setdefault(rcclass, {})
+        if driver.number not in class_stats:
+            class_stats[driver.number] = dict.fromkeys(SUMMED_STATS, 0)
+            class_stats[driver.number].update(racedays=1, best_laptime=None)
+        return class_stats[driver.number]
+
+    for rcclass, class_points in points_per_race.items():
+        for driver, points in class_points.items():
+            stats(rcclass, driver)["points"] += sum(points)
+
+    finals_completed = raceday.are_all_races_in_round_completed(rd.FINALS_NAME)
+    for heat_name in raceday.get_heats_with_results():
+        for rcclass, class_results in raceday.get_heat_results(heat_name).items():
+            highest_group = min(class_results, default=None)
+            for group, result in class_results.items():
+                best_laptimes = result.best_laptimes_dict()
+                for position, driver in enumerate(result.positions):
+                    driver_stats = stats(rcclass, driver)
+                    if not result.did_driver_start(driver):
+                        driver_stats["dns"] += 1
+                        continue
+                    driver_stats["starts"] += 1
+                    if driver in best_laptimes:
+                        laptime = best_laptimes[driver].milliseconds
+                        if driver_stats["best_laptime"] is None or laptime < driver_stats["best_laptime"]:
+                            driver_stats["best_laptime"] = laptime
+                    if heat_name == rd.FINALS_NAME and group == highest_group and finals_completed:
+                        if position == 0:
+                            driver_stats["wins"] += 1
+                        if position < 3:
+                            driver_stats["podiums"] += 1
+    return stats_per_class
+
+
+def _get_raceday_entry(filename_no_ext: str, raceday: rd.Raceday) -> Dict:
+    return {"season": rd.get_season_from_filename(filename_no_ext), "classes": get_raceday_stats(raceday)}
+
+
+def _get_entry_stats(entry: Dict):
+    """Yields the season (and ALL_TIME), class, car number and statistics of each driver of a raceday entry."""
+    for season in (entry["season"], ALL_TIME):
+        for rcclass, class_stats in entry["classes"].items():
+            for number, stats in class_stats.items():
+                yield season, rcclass, int(number), stats
+
+
+def _get_rankings() -> Dict[Any, Dict[str, List[Dict]]]:
+    global _loaded
+    folder = get_leaderboard_folder()
+    with _lock:
+        if not folder.is_dir():
+            _build_leaderboard(folder)
+        key = _get_folder_key(folder)
+        if _loaded is None or _loaded.folder != folder or _loaded.key != key:
+            _loaded = _Leaderboard(folder, key, _read_entries(folder))
+        return _loaded.rankings
+
+
+def _get_folder_key(folder: Path) -> Tuple:
+    return os.stat(folder).st_mtime_ns,
+
+
+def _read_entries(folder: Path) -> Dict[str, Dict]:
+    entries = {}
+    for path in folder.glob("*.json"):
+        with open(path) as f:
+            entries[path.stem] = json.load(f)
+    return entries
+
+
+def _write_entry(folder: Path, filename_no_ext: str, entry: Dict) -> None:
+    path = folder / (filename_no_ext + ".json")
+    temporary_path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, "w") as f:
+        json.dump(entry, f)
+    os.replace(temporary_path, path)
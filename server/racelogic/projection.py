@@ -0,0 +1,180 @@
+"""
+Championship projections. The remaining racedays of a season are simulated many
+times, where each driver finishes a raceday at a place drawn from where they have
+finished the racedays of the season so far, and gets the points that place has
+given on average. A driver shows up to a simulated raceday as often as they have
+shown up so far. The season totals, less the drop races of the season's scoring
+rules, then give each driver's chance to win the cup or finish on the podium.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from server.racelogic import raceday as rd, cuppoints
+except ImportError:
+    import raceday as rd
+    import cuppoints
+
+import numpy as np
+
+import os
+
+NUM_SIMULATIONS = 20000
+# the number of simulations each worker process runs at a time
+SIMULATIONS_PER_CHUNK = 2500
+NUM_PODIUM_PLACES = 3
+# used to break ties randomly, small enough to never change a difference in points or places
+TIE_BREAK_NOISE = 1e-3
+
+
+class ClassProjection:
+
+    def __init__(self):
+        self.num_simulations: int = 0
+        self.num_remaining_racedays: int = 0
+        self.current_points: Dict[rd.Driver, int] = {}
+        self.title_probabilities: Dict[rd.Driver, float] = {}
+        self.podium_probabilities: Dict[rd.Driver, float] = {}
+
+    def drivers_ranked_by_title_probability(self) -> List[rd.Driver]:
+        return sorted(self.current_points,
+                      key=lambda driver: (self.title_probabilities[driver],
+                                          self.podium_probabilities[driver],
+                                          self.current_points[driver]),
+                      reverse=True)
+
+
+class _ClassModel:
+    """The arrays a class is simulated from, with the drivers along the first axis."""
+
+    def __init__(self, points: np.ndarray, participation: np.ndarray):
+        num_drivers, num_racedays = points.shape
+        self.points_per_race: np.ndarray = points
+        self.attendance: np.ndarray = participation.mean(axis=1)
+
+        # each driver's finishing places at the racedays they took part in, as a fraction
+        # of the field (0 is the winner), padded with their first place to equal length
+        places = np.zeros(points.shape)
+        field_sizes = participation.sum(axis=0)
+        position_points = np.zeros((num_racedays, num_drivers))
+        for raceday_index in range(num_racedays):
+            participants = np.flatnonzero(participation[:, raceday_index])
+            if not len(participants):
+                continue
+            # stable, so that drivers on equal points keep their order
+            order = participants[np.argsort(-points[participants, raceday_index], kind="stable")]
+            places[order, raceday_index] = np.arange(len(order)) / max(len(order) - 1, 1)
+            position_points[raceday_index, :len(order)] = points[order, raceday_index]
+
+        self.num_history: np.ndarray = np.maximum(participation.sum(axis=1), 1)
+        self.history: np.ndarray = np.zeros(points.shape)
+        for driver_index in range(num_drivers):
+            driver_places = places[driver_index, participation[driver_index]]
+            if len(driver_places):
+                self.history[driver_index] = driver_places[0]
+                self.history[driver_index, :len(driver_places)] = driver_places
+
+        # the average points of each place, over the racedays that had that many drivers
+        num_racedays_with_place = (field_sizes[:, np.newaxis] > np.arange(num_drivers)).sum(axis=0)
+        self.position_points: np.ndarray = np.divide(
+            position_points.sum(axis=0), num_racedays_with_place,
+            out=np.zeros(num_drivers), where=num_racedays_with_place > 0)
+
+
+def project_season(season_points_per_class: Dict[str, Any], num_remaining_racedays: int,
+                   num_simulations: int = NUM_SIMULATIONS, max_workers: Optional[int] = None,
+                   seed: Optional[int] = None,
+                   num_drop_races: int = cuppoints.DEFAULT_RULES.num_drop_races) -> Dict[str, ClassProjection]:
+    """
+    Projects the outcome of a season from its points so far, the SeasonPoints of
+    each class as calculated by resultcalculation.calculate_season_points with the
+    same number of drop races. The simulations are split between max_workers
+    processes (one per CPU by default, none if 1).
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    models = {}
+    drivers_per_class = {}
+    for rcclass, season_points in season_points_per_class.items():
+        drivers = list(season_points.points_per_race)
+        drivers_per_class[rcclass] = drivers
+        if drivers and season_points.num_races():
+            models[rcclass] = _ClassModel(
+                np.array([season_points.points_per_race[driver] for driver in drivers], dtype=np.int64),
+                np.array([season_points.race_participation[driver] for driver in drivers], dtype=bool))
+
+    chunks = []
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(models) * (num_simulations // SIMULATIONS_PER_CHUNK + 1)))
+    for rcclass in models:
+        for start in range(0, num_simulations, SIMULATIONS_PER_CHUNK):
+            chunks.append((rcclass, min(SIMULATIONS_PER_CHUNK, num_simulations - start), next(seeds)))
+
+    counts = {rcclass: (np.zeros(len(drivers_per_class[rcclass]), dtype=np.int64),
+                        np.zeros(len(drivers_per_class[rcclass]), dtype=np.int64))
+              for rcclass in models}
+    if max_workers == 1 or len(chunks) == 1:
+        chunk_counts = [_simulate(models[rcclass], num_remaining_racedays, n, chunk_seed, num_drop_races)
+                        for rcclass, n, chunk_seed in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers) as executor:
+            chunk_counts = list(executor.map(
+                _simulate,
+                [models[rcclass] for rcclass, _, _ in chunks],
+                [num_remaining_racedays] * len(chunks),
+                [n for _, n, _ in chunks],
+                [chunk_seed for _, _, chunk_seed in chunks],
+                [num_drop_races] * len(chunks)))
+    for (rcclass, _, _), (titles, podiums) in zip(chunks, chunk_counts):
+        counts[rcclass][0][:] += titles
+        counts[rcclass][1][:] += podiums
+
+    projections = {}
+    for rcclass, season_points in season_points_per_class.items():
+        projection = ClassProjection()
+        projection.num_simulations = num_simulations if rcclass in models else 0
+        projection.num_remaining_racedays = num_remaining_racedays
+        for i, driver in enumerate(drivers_per_class[rcclass]):
+            projection.current_points[driver] = season_points.total_points_with_drop_race[driver]
+            if rcclass in models:
+                titles, podiums = counts[rcclass]
+                projection.title_probabilities[driver] = float(titles[i] / num_simulations)
+                projection.podium_probabilities[driver] = float(podiums[i] / num_simulations)
+            else:
+                projection.title_probabilities[driver] = 0.
+                projection.podium_probabilities[driver] = 0.
+        projections[rcclass] = projection
+    return projections
+
+
+def _simulate(model: _ClassModel, num_remaining_racedays: int, num_simulations: int,
+              seed: np.random.SeedSequence, num_drop_races: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulates the rest of the season, and returns how many times each driver won and made the podium."""
+    rng = np.random.default_rng(seed)
+    num_drivers = len(model.attendance)
+    shape = (num_simulations, num_remaining_racedays, num_drivers)
+
+    attends = rng.random(shape) < model.attendance
+    history_indices = (rng.random(shape) * model.num_history).astype(np.int64)
+    places = model.history[np.arange(num_drivers), history_indices]
+    places += rng.random(shape) * TIE_BREAK_NOISE
+    places[~attends] = np.inf
+    positions = places.argsort(axis=2).argsort(axis=2)
+    simulated_points = np.where(attends, model.position_points[positions], 0.)
+
+    # the points of every raceday of the season, with the racedays along the last axis
+    current_points = model.points_per_race
+    season_points = np.concatenate(
+        [np.broadcast_to(current_points, (num_simulations,) + current_points.shape),
+         simulated_points.transpose(0, 2, 1)], axis=2)
+    totals = season_points.sum(axis=2)
+    # the racedays with the least points are dropped, as in resultcalculation.calculate_season_points
+    num_drop_races = min(num_drop_races, season_points.shape[2])
+    if num_drop_races:
+        totals -= np.partition(season_points, num_drop_races - 1, axis=2)[:, :, :num_drop_races].sum(axis=2)
+    totals_with_drop_race = totals + rng.random(totals.shape) * TIE_BREAK_NOISE
+
+    ranking = np.argsort(-totals_with_drop_race, axis=1)
+    titles = np.bincount(ranking[:, 0], minlength=num_drivers)
+    podiums = np.bincount(ranking[:, :NUM_PODIUM_PLACES].ravel(), minlength=num_drivers)
+    return titles, podiums
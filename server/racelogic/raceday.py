@@ -1,24 +1,55 @@
-from typing import List, Dict, Tuple, Iterable, Any, Optional
+from typing import List, Dict, Tuple, Iterable, Any, Optional, Callable
 
 try:
     from .constants import RESULT_FOLDER_PATH
     from server.racelogic.duration import Duration
+    from server.racelogic.laptimes import LapTimes
+    from server.racelogic import compactformat, cuppoints, sqlitestore
     from ..models import get_driver_name
 except ImportError:
     from constants import RESULT_FOLDER_PATH
     from duration import Duration
+    from laptimes import LapTimes
+    import compactformat
+    import cuppoints
+    import sqlitestore
     from names import NAMES
     def get_driver_name(d): return NAMES[d]
 
+from collections import OrderedDict
+from pathlib import Path
+
+import copy
 import datetime
+import hashlib
 import json
+import os
+import string
+import threading
 
 DB_DATE_FORMAT = "%y%m%d"
 
+JOURNAL_EXTENSION = ".journal"
+# the journal is folded into a new snapshot of the raceday once it has this many records
+JOURNAL_COMPACTION_LIMIT = 50
+
+# the number of racedays the web views keep loaded in memory
+RACEDAY_CACHE_SIZE = 16
+
+# the scoring rules of the seasons that don't use the default rules, { "<year>": { <rules definition> } }
+SCORING_RULES_FILENAME = "scoringrules.json"
+
+JOURNAL_OP_PARTICIPANTS = "participants"
+JOURNAL_OP_FIRST_QUALIFIERS = "first_qualifiers"
+JOURNAL_OP_START_LISTS = "start_lists"
+JOURNAL_OP_RESULT = "result"
+JOURNAL_OP_NEXT_HEAT = "next_heat"
+
 ALL_PARTICIPANTS_KEY = "all_participants"
 START_LISTS_KEY = "start_lists"
 RESULTS_KEY = "results"
 CURRENT_HEAT_KEY = "current_heat"
+_RACEDAY_KEYS = {ALL_PARTICIPANTS_KEY, START_LISTS_KEY, RESULTS_KEY, CURRENT_HEAT_KEY}
 
 QUALIFIERS_NAME = "Kval"
 EIGHTH_FINAL_NAME = "Åttondelsfinal"
@@ -39,43 +70,77 @@ NON_QUALIFIER_RACE_ORDER = [
     SEMI_FINAL_NAME,
     FINALS_NAME,
 ]
-CLASS_ORDER_DEFAULT = [
-    ("2WD", "C"),
-    ("2WD", "B"),
-    ("2WD", "A"),
-    ("4WD", "C"),
-    ("4WD", "B"),
-    ("4WD", "A")
-]
-CLASS_ORDER_FINALS = [
-    ("2WD", "C"),
-    ("4WD", "C"),
-    ("2WD", "B"),
-    ("4WD", "B"),
-    ("2WD", "A"),
-    ("4WD", "A")
-]
-CLASS_ORDER = {
-    QUALIFIERS_NAME: CLASS_ORDER_DEFAULT,
-    EIGHTH_FINAL_NAME: CLASS_ORDER_DEFAULT,
-    QUARTER_FINAL_NAME: CLASS_ORDER_DEFAULT,
-    SEMI_FINAL_NAME: CLASS_ORDER_DEFAULT,
-    FINALS_NAME: CLASS_ORDER_FINALS,
-}
+# groups are named with letters, where A is the highest (fastest) group
+GROUP_NAMES = string.ascii_uppercase
+_GROUP_NAME_SET = frozenset(GROUP_NAMES)
+
+
+def get_group_names(num_groups: int) -> List[str]:
+    """Returns the names of the num_groups highest groups, highest group first."""
+    return list(GROUP_NAMES[:num_groups])
+
+
+def get_class_order(heat_name: str, heat_start_lists: Dict[str, "HeatStartLists"]) -> List[Tuple[str, str]]:
+    """
+    Returns the (rcclass, group) of the races of a heat in the order they are driven.
+    Each class drives its groups from the lowest to the highest, except in the
+    finals, where the classes take turns for each group.
+    """
+    groups_per_class = {rcclass: sorted(class_start_lists.get_groups(), reverse=True)
+                        for rcclass, class_start_lists in heat_start_lists.items()}
+    if heat_name != FINALS_NAME:
+        return [(rcclass, group) for rcclass, groups in groups_per_class.items() for group in groups]
+
+    all_groups = sorted({group for groups in groups_per_class.values() for group in groups}, reverse=True)
+    return [(rcclass, group)
+            for group in all_groups
+            for rcclass, groups in groups_per_class.items()
+            if group in groups]
 
 
 class Driver:
+    """
+    An immutable driver, identified by its car number. There is only ever one
+    instance per car number, so drivers are shared between all racedays and
+    results. Use get_driver (or Driver(number)) to get the canonical instance.
+    """
+
+    __slots__ = ("number",)
 
-    def __init__(self, number: int):
-        self.number: int = number
-        # TODO is this inefficient?
-        self.name: str = get_driver_name(number)
+    _instances: Dict[int, "Driver"] = {}
+
+    def __new__(cls, number: int):
+        driver = cls._instances.get(number)
+        if driver is None:
+            driver = super().__new__(cls)
+            object.__setattr__(driver, "number", number)
+            cls._instances[number] = driver
+        return driver
+
+    @property
+    def name(self) -> str:
+        return get_driver_name(self.number)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Driver objects are immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("Driver objects are immutable")
+
+    def __reduce__(self):
+        return get_driver, (self.number,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __hash__(self):
         return hash(self.number)
 
     def __eq__(self, other) -> bool:
-        return self.number == other.number
+        return self is other or self.number == other.number
 
     def __repr__(self):
         return str(self)
@@ -91,10 +156,28 @@ class HeatStartLists:
         self.rcclass: str = rcclass
         self._start_lists: Dict[str, List[Driver]] = \
             self._parse_json_dict(json_dict)
+        # the groups each driver is in, in start list order
+        self._groups_by_driver: Dict[Driver, List[str]] = {}
+        for group, start_list in self._start_lists.items():
+            for driver in start_list:
+                self._add_to_index(driver, group)
 
     def get_start_list(self, group: str) -> List[Driver]:
+        """Returns the start list of the group. Use add_driver to add drivers to it."""
         return self._start_lists[group]
 
+    def add_driver(self, group: str, driver: Driver) -> None:
+        self._start_lists[group].append(driver)
+        self._add_to_index(driver, group)
+
+    def get_groups_of_driver(self, driver: Driver) -> List[str]:
+        return self._groups_by_driver.get(driver, [])
+
+    def _add_to_index(self, driver: Driver, group: str) -> None:
+        groups = self._groups_by_driver.setdefault(driver, [])
+        if group not in groups:
+            groups.append(group)
+
     def get_groups(self) -> List[str]:
         return list(self._start_lists.keys())
 
@@ -129,6 +212,7 @@ class RaceResult:
                  average_laptimes: List[Tuple[int, Duration]],
                  manual: bool,
                  dns: List[int] = None,
+                 laptimes: Dict[int, Any] = None,
                  **kwargs):
         self.heat_name: str = heat_name
         self.rcclass: str = rcclass
@@ -142,6 +226,10 @@ class RaceResult:
         self.dns: List[Driver] = []
         if dns is not None:
             self.dns = number_list_to_driver_list(dns)
+        # every lap time of each driver, if the result was read from a race report
+        self.laptimes: Optional[LapTimes] = None
+        if laptimes is not None:
+            self.laptimes = LapTimes(laptimes)
         self.very_best_laptime: Duration = best_laptimes[0][1] if best_laptimes else None
 
     @staticmethod
@@ -150,11 +238,11 @@ class RaceResult:
 
     @staticmethod
     def _parse_dict(collection: Dict[int, Any]) -> Dict[Driver, Any]:
-        return {Driver(int(num)): val for num, val in collection.items()}
+        return {get_driver(int(num)): val for num, val in collection.items()}
 
     @staticmethod
     def _parse_time_list(collection: List[Tuple[int, Duration]]) -> List[Tuple[Driver, Duration]]:
-        return [(Driver(num), duration) for num, duration in collection]
+        return [(get_driver(num), duration) for num, duration in collection]
 
     def best_laptimes_dict(self):
         return {num: time for num, time in self.best_laptimes}
@@ -162,6 +250,15 @@ class RaceResult:
     def has_dns(self) -> bool:
         return len(self.dns) > 0
 
+    def has_laptimes(self) -> bool:
+        return self.laptimes is not None
+
+    def get_laptimes(self, driver: Driver) -> Optional[Any]:
+        """Returns every lap time of the driver in milliseconds as an int32 array, if the result has them."""
+        if self.laptimes is None:
+            return None
+        return self.laptimes.get(driver.number)
+
     def average_laptimes_dict(self):
         return {num: time for num, time in self.average_laptimes}
 
@@ -192,6 +289,8 @@ class RaceResult:
         }
         if self.dns:
             results_json["dns"] = [d.number for d in self.dns]
+        if self.laptimes is not None:
+            results_json["laptimes"] = self.laptimes.get_serializable()
         return results_json
 
     def add_dns(self, driver: Driver) -> None:
@@ -207,6 +306,65 @@ class RaceResult:
         return self.num_laps_driven.get(driver, 0) > 0
 
 
+class LazyGroupResults(dict):
+    """
+    The results of the groups in a class in a heat, { group: RaceResult }. The
+    results are kept as the decoded json dictionaries until they are first
+    accessed, so that only the results which are actually used are parsed.
+    """
+
+    def __init__(self, heat_name: str, rcclass: str, json_results: Dict[str, Dict]):
+        super().__init__(json_results)
+        self.heat_name: str = heat_name
+        self.rcclass: str = rcclass
+
+    def _hydrate(self, group: str, value: Any) -> RaceResult:
+        if isinstance(value, dict):
+            value = RaceResult(self.heat_name, self.rcclass, group, **value)
+            super().__setitem__(group, value)
+        return value
+
+    def __getitem__(self, group: str) -> RaceResult:
+        return self._hydrate(group, super().__getitem__(group))
+
+    def get(self, group: str, default: Any = None) -> Any:
+        if group not in self:
+            return default
+        return self[group]
+
+    def values(self):
+        return [self[group] for group in self]
+
+    def items(self):
+        return [(group, self[group]) for group in self]
+
+    def copy(self) -> Dict[str, RaceResult]:
+        return dict(self.items())
+
+    def is_hydrated(self, group: str) -> bool:
+        return isinstance(super().__getitem__(group), RaceResult)
+
+
+class RaceMatch:
+    """The race which a result was matched with, see Raceday.match_race."""
+
+    def __init__(self, heat_name: Optional[str], rcclass: Optional[str], group: Optional[str],
+                 start_list: Optional[List[Driver]], num_votes: int,
+                 tied_races: List[Tuple[str, str]], unknown_drivers: List[Driver]):
+        self.heat_name: Optional[str] = heat_name
+        self.rcclass: Optional[str] = rcclass
+        self.group: Optional[str] = group
+        self.start_list: Optional[List[Driver]] = start_list
+        self.num_votes: int = num_votes
+        # the (class, group) of the other races which matched equally well
+        self.tied_races: List[Tuple[str, str]] = tied_races
+        # the participants which aren't in any start list of the heat
+        self.unknown_drivers: List[Driver] = unknown_drivers
+
+    def is_ambiguous(self) -> bool:
+        return len(self.tied_races) > 0
+
+
 class Raceday:
 
     def __init__(self, json_raceday: Dict = None):
@@ -222,27 +380,61 @@ class Raceday:
         self.current_heat: int = json_raceday[CURRENT_HEAT_KEY] \
             if json_raceday is not None else 0
 
+        # the snapshot file this raceday was read from, and the journal state on top of it
+        self._snapshot_path: Optional[Path] = None
+        self._snapshot_hash: Optional[str] = None
+        # the inode, modification time and size of the snapshot file when it was read or written
+        self._snapshot_stat: Optional[Tuple[int, int, int]] = None
+        self._num_journal_records: int = 0
+        self._unsaved_journal_records: List[Dict] = []
+        self._replaying_journal: bool = False
+        # set for the racedays shared by the raceday cache, which must be copied to be changed
+        self._read_only: bool = False
+
+        # the cup points of each completed heat, calculated on first use
+        self._heat_points: Optional[Dict[str, Dict[str, Dict[Driver, List[int]]]]] = None
+        self.scoring_rules: cuppoints.ScoringRules = cuppoints.DEFAULT_RULES
+        # the finals seeding key of each driver by class, made from the cup points on first use
+        self._seeding_keys: Optional[Dict[str, Dict[Driver, Tuple[int, Tuple[int, ...]]]]] = None
+
+    def copy(self) -> "Raceday":
+        """Returns a copy of the raceday which can be changed, even if the raceday itself is read only."""
+        raceday = copy.deepcopy(self)
+        raceday._read_only = False
+        return raceday
+
+    def _check_can_change(self) -> None:
+        if self._read_only:
+            raise AttributeError("The raceday is shared by the raceday cache and can't be changed, change a copy of it")
+
     def set_all_participants(self, number_list: List[int]) -> None:
+        self._check_can_change()
         self.all_participants = number_list_to_driver_list(number_list)
+        self._record(JOURNAL_OP_PARTICIPANTS, numbers=[d.number for d in self.all_participants])
 
     def set_first_qualifiers(self, participants: Dict[str, Dict[str, List]]) -> None:
         """
         Sets the start lists of the first qualifiers. The participants are given as
         { rcclass: { group: [<driver number or Driver object>] } }
         """
+        self._check_can_change()
         self.start_lists[QUALIFIERS_NAME] = {
             rcclass: HeatStartLists(participants[rcclass], QUALIFIERS_NAME, rcclass)
             for rcclass in participants
         }
+        self._record(JOURNAL_OP_FIRST_QUALIFIERS, start_lists=_to_number_start_lists(participants))
 
     def save(self) -> None:
         """Saves the race day with today's filename."""
         filename = get_todays_filename()
-        self._write_raceday(filename)
+        self._save(Path(filename).stem)
 
     def save_as_date(self, filename_no_ext: str) -> None:
-        """Saves the race day as with the date filename YYMMDD (no json extension)"""
-        self._write_raceday(filename_no_ext + ".json")
+        """
+        Saves the race day as with the date filename YYMMDD (no extension).
+        The raceday is written in the format of the existing file, json by default.
+        """
+        self._save(filename_no_ext)
 
     def get_current_heat(self) -> str:
         return RACE_ORDER[self.current_heat]
@@ -251,27 +443,57 @@ class Raceday:
         return RACE_ORDER[self.current_heat - 1]
 
     def find_relevant_race(self, race_participants: List[Driver]) -> Tuple[str, str, str, List[Driver]]:
-        race = self.get_current_heat()
-        largest_match_size = 0
-        largest_match_group = (None, None, None, None)
-        for rcclass in self.start_lists[race]:
-            for group, start_list in self.start_lists[race][rcclass].get_start_lists():
-                intersection_size = len(set(race_participants).intersection(set(start_list)))
-                if intersection_size > largest_match_size:
-                    largest_match_size = intersection_size
-                    largest_match_group = (race, rcclass, group, start_list)
-        return largest_match_group
+        """
+        Returns the heat name, class, group and start list of the race in the current
+        heat which most of the participants are in, or Nones if none of them are.
+        """
+        match = self.match_race(race_participants)
+        return match.heat_name, match.rcclass, match.group, match.start_list
+
+    def match_race(self, race_participants: List[Driver], heat_name: Optional[str] = None) -> "RaceMatch":
+        """
+        Matches the participants of a race against the start lists of a heat, the
+        current heat by default. Each participant votes for the groups they are in, and
+        the group with the most votes wins. Ties go to the group which comes first in
+        the start lists.
+        """
+        if heat_name is None:
+            heat_name = self.get_current_heat()
+        heat_start_lists = self.start_lists[heat_name]
+        votes: Dict[Tuple[str, str], int] = {
+            (rcclass, group): 0
+            for rcclass, class_start_lists in heat_start_lists.items()
+            for group in class_start_lists.get_groups()
+        }
+        unknown_drivers = []
+        for driver in dict.fromkeys(race_participants):
+            known = False
+            for rcclass, class_start_lists in heat_start_lists.items():
+                for group in class_start_lists.get_groups_of_driver(driver):
+                    votes[(rcclass, group)] += 1
+                    known = True
+            if not known:
+                unknown_drivers.append(driver)
+
+        num_votes = max(votes.values(), default=0)
+        if num_votes == 0:
+            return RaceMatch(None, None, None, None, 0, [], unknown_drivers)
+        candidates = [race for race, race_votes in votes.items() if race_votes == num_votes]
+        rcclass, group = candidates[0]
+        return RaceMatch(heat_name, rcclass, group, heat_start_lists[rcclass].get_start_list(group),
+                         num_votes, candidates[1:], unknown_drivers)
 
     def has_heat(self, heat_name: str) -> bool:
         return heat_name in self.results
 
     def add_empty_heat(self, heat_name: str) -> None:
-        self.results[heat_name] = {"2WD": {}, "4WD": {}}
+        self._check_can_change()
+        self.results[heat_name] = {rcclass: {} for rcclass in self.start_lists.get(heat_name, cuppoints.RCCLASSES)}
 
     def result_exists(self, heat_name: str, rcclass: str, group: str) -> bool:
         if not self.has_heat(heat_name):
             return False
-        return group in self.results[heat_name][rcclass]
+        return group in self.results[heat_name].get(rcclass, {})
 
     def add_result(self, heat_name: str, rcclass: str, group: str,
                    positions: List[int], num_laps_driven: Dict[int, int],
@@ -279,7 +501,22 @@ class Raceday:
                    best_laptimes: List[Tuple[int, Duration]],
                    average_laptimes: List[Tuple[int, Duration]],
                    manual: bool,
-                   start_list: List[Driver]) -> None:
+                   start_list: List[Driver],
+                   laptimes: Optional[LapTimes] = None) -> None:
+        self._check_can_change()
+        optional_fields = {}
+        if laptimes is not None:
+            optional_fields["laptimes"] = laptimes.get_serializable()
+        self._record(JOURNAL_OP_RESULT,
+                     heat_name=heat_name, rcclass=rcclass, group=group,
+                     positions=[_to_number(d) for d in positions],
+                     num_laps_driven={_to_number(d): laps for d, laps in num_laps_driven.items()},
+                     total_times={_to_number(d): t.milliseconds for d, t in total_times.items()},
+                     best_laptimes=[[_to_number(d), t.milliseconds] for d, t in best_laptimes],
+                     average_laptimes=[[_to_number(d), t.milliseconds] for d, t in average_laptimes],
+                     manual=manual,
+                     start_list=[_to_number(d) for d in start_list],
+                     **optional_fields)
         race_results = RaceResult(
             heat_name,
             rcclass,
@@ -291,12 +528,15 @@ class Raceday:
             average_laptimes=average_laptimes,
             manual=manual
         )
+        race_results.laptimes = laptimes
         if not self.has_heat(heat_name):
             self.add_empty_heat(heat_name)
         self.results[heat_name][rcclass][group] = race_results
         self._add_dns_participants(heat_name, rcclass, group, start_list)
         if self.get_current_heat() == FINALS_NAME:
             self._update_start_lists_for_finals()
+            self._update_heat_points(FINALS_NAME)
+        self._update_heat_points(heat_name)
 
     def get_result(self, heat_name: str, rcclass: str, group: str) -> RaceResult:
         return self.results[heat_name][rcclass][group]
@@ -317,10 +557,12 @@ class Raceday:
         Returns a dictionary where each class is mapped to a list of the groups.
         """
         current_heat = self.get_current_heat()
-        return {
-            "2WD": self.start_lists[current_heat]["2WD"].get_groups(),
-            "4WD": self.start_lists[current_heat]["4WD"].get_groups(),
-        }
+        return {rcclass: class_start_lists.get_groups()
+                for rcclass, class_start_lists in self.start_lists[current_heat].items()}
+
+    def get_class_order(self, heat_name: str) -> List[Tuple[str, str]]:
+        """Returns the (rcclass, group) of the races of a heat in the order they are driven."""
+        return get_class_order(heat_name, self.start_lists.get(heat_name, {}))
 
     def get_start_lists_for_heat(self, heat_name: str) -> Dict[str, HeatStartLists]:
         """
@@ -389,7 +631,7 @@ class Raceday:
         """
         results = {(heat_name, rcclass, group): self.get_result(heat_name, rcclass, group)
                    for heat_name in self.results
-                   for rcclass in ("2WD", "4WD")
+                   for rcclass in self.results[heat_name]
                    for group in self.get_groups_in_race(heat_name, rcclass)}
         return results
 
@@ -397,18 +639,81 @@ class Raceday:
         return list(self.results.keys())
 
     def increment_current_heat(self) -> None:
+        self._check_can_change()
         self.current_heat += 1
+        self._record(JOURNAL_OP_NEXT_HEAT)
 
     def set_new_start_lists(self, heat_name: str, raw_start_lists: Dict[str, Dict[str, List[Driver]]]) -> None:
         """Sets the start lists from a dictionary with classes mapped to groups and lists of drivers."""
+        self._check_can_change()
         if heat_name not in self.start_lists:
             self.start_lists[heat_name] = {}
         for rcclass in raw_start_lists:
             self.start_lists[heat_name][rcclass] = HeatStartLists(raw_start_lists[rcclass], heat_name, rcclass)
+        self._update_heat_points(heat_name)
+        self._record(JOURNAL_OP_START_LISTS, heat_name=heat_name,
+                     start_lists=_to_number_start_lists(raw_start_lists))
+
+    def get_cup_points(self) -> Tuple[Dict[Driver, int], Dict[str, Dict[Driver, List[int]]]]:
+        """
+        Returns the cup points so far, as the total points of each driver, and
+        { rcclass: { Driver: [points of each heat] } }. The points of a heat are
+        kept once it is completed, and only recalculated when its results or
+        start lists change.
+        """
+        if self._heat_points is None:
+            heat_points = {}
+            for heat_name in RACE_ORDER:
+                points = self._calculate_heat_points(heat_name)
+                if points is not None:
+                    heat_points[heat_name] = points
+            self._heat_points = heat_points
+
+        points_per_race = cuppoints.create_empty_points()
+        for heat_name in RACE_ORDER:
+            if heat_name in self._heat_points:
+                cuppoints.add_heat_points(points_per_race, self._heat_points[heat_name])
+        return cuppoints.sum_points(points_per_race), points_per_race
+
+    def set_scoring_rules(self, rules: cuppoints.ScoringRules) -> None:
+        """Sets the rules the cup points are calculated with, which recalculates them on next use."""
+        self._check_can_change()
+        self.scoring_rules = rules
+        self._heat_points = None
+        self._seeding_keys = None
+
+    def get_seeding_keys(self) -> Dict[str, Dict[Driver, Tuple[int, Tuple[int, ...]]]]:
+        """
+        Returns the key each driver is seeded by in the finals, { rcclass: { Driver: key } },
+        in the same order as the cup points. See cuppoints.get_seeding_key.
+        """
+        if self._seeding_keys is None:
+            _, points_per_race = self.get_cup_points()
+            self._seeding_keys = {
+                rcclass: {driver: cuppoints.get_seeding_key(points) for driver, points in class_points.items()}
+                for rcclass, class_points in points_per_race.items()
+            }
+        return self._seeding_keys
+
+    def _calculate_heat_points(self, heat_name: str) -> Optional[Dict[str, Dict[Driver, List[int]]]]:
+        if heat_name == QUALIFIERS_NAME or not self.are_all_races_in_round_completed(heat_name):
+            return None
+        return cuppoints.calculate_heat_points(self.get_heat_results(heat_name), heat_name == FINALS_NAME,
+                                               self.scoring_rules)
+
+    def _update_heat_points(self, heat_name: str) -> None:
+        self._seeding_keys = None
+        if self._heat_points is None:
+            return
+        points = self._calculate_heat_points(heat_name)
+        if points is not None:
+            self._heat_points[heat_name] = points
+        else:
+            self._heat_points.pop(heat_name, None)
 
     def get_latest_race_class_group(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         heat_name = self.get_current_heat()
-        class_order = CLASS_ORDER[heat_name]
+        class_order = self.get_class_order(heat_name)
         heat_results = self.get_heat_results(heat_name)
         if heat_results is None:
             previous_heat = self.get_previous_heat()
@@ -417,24 +722,25 @@ class Raceday:
                 return None, None, None
 
         for rcclass, group in reversed(class_order):
-            class_results = heat_results[rcclass]
+            class_results = heat_results.get(rcclass, {})
             if group in class_results:
                 return heat_name, rcclass, group
 
         return None, None, None
 
     def _update_start_lists_for_finals(self):
-        for rcclass in ("2WD", "4WD"):
-            class_results = self.results[FINALS_NAME][rcclass]
-            groups = ("C", "B", "A")
+        for rcclass, finals_start_lists in self.start_lists[FINALS_NAME].items():
+            # a result can be added to an earlier heat before the finals have any results
+            class_results = self.results.get(FINALS_NAME, {}).get(rcclass, {})
+            # the winner of each group moves up to the next higher group
+            groups = sorted(finals_start_lists.get_groups(), reverse=True)
             for i in range(len(groups) - 1):
                 group = groups[i]
                 if group in class_results:
                     group_winner = class_results[group].positions[0]
                     higher_group = groups[i + 1]
-                    higher_group_start_list = self.start_lists[FINALS_NAME][rcclass].get_start_list(higher_group)
-                    if group_winner not in higher_group_start_list:
-                        higher_group_start_list.append(group_winner)
+                    if higher_group not in finals_start_lists.get_groups_of_driver(group_winner):
+                        finals_start_lists.add_driver(higher_group, group_winner)
 
     def _add_dns_participants(self, heat_name: str, rcclass: str,
                               group: str, start_list: List[Driver]) -> None:
@@ -446,10 +752,110 @@ class Raceday:
                 race_entry.positions.append(driver)
                 race_entry.add_dns(driver)
 
+    def _save(self, filename_no_ext: str) -> None:
+        """
+        Saves the raceday. If the raceday was read from this file, only the changes
+        since then are appended to its journal, unless the journal has grown long
+        enough to be folded into a new snapshot, or the file or its journal have
+        changed since they were read.
+
+        The save listeners are called when a snapshot is written, and when the
+        changes complete or change a round. A result in a round which is still
+        being driven doesn't change the cup points, so the listeners catch up
+        with it once the round is completed.
+        """
+        self._check_can_change()
+        path = get_raceday_path(filename_no_ext)
+        records = self._unsaved_journal_records
+        num_records = self._num_journal_records + len(records)
+        if num_records < JOURNAL_COMPACTION_LIMIT and self._can_append_to_journal(path):
+            if records:
+                _append_to_journal(path, self._snapshot_hash, records)
+                _raceday_cache.invalidate(path)
+            self._num_journal_records = num_records
+            self._unsaved_journal_records = []
+            notify_listeners = any(self._completes_round(record) for record in records)
+        else:
+            self._write_raceday(path.name)
+            notify_listeners = True
+        _raceday_date_index.add(filename_no_ext)
+        if notify_listeners:
+            for listener in _save_listeners:
+                listener(filename_no_ext, self)
+
+    def _completes_round(self, record: Dict) -> bool:
+        if record["op"] != JOURNAL_OP_RESULT:
+            return True
+        return self.are_all_races_in_round_completed(record["heat_name"])
+
     def _write_raceday(self, filename: str) -> None:
+        """Writes a full snapshot of the raceday, which replaces any journal of the file."""
+        self._check_can_change()
         json_raceday = self._get_serializeable_raceday()
-        with open(RESULT_FOLDER_PATH / filename, "w") as f:
-            json.dump(json_raceday, f, indent=2, default=lambda d: d.__dict__)
+        path = get_raceday_path(Path(filename).stem)
+        if path.suffix == compactformat.COMPACT_EXTENSION:
+            data = compactformat.encode_raceday(json_raceday)
+        else:
+            data = json.dumps(json_raceday, indent=2, default=lambda d: d.__dict__).encode("utf-8")
+        _write_file_atomically(path, data)
+        _raceday_cache.invalidate(path)
+        # the old journal no longer matches the snapshot, so it won't be replayed even if this fails
+        _get_journal_path(path).unlink(missing_ok=True)
+        self._snapshot_path = path
+        self._snapshot_hash = _get_snapshot_hash(data)
+        self._snapshot_stat = _get_snapshot_stat(os.stat(path))
+        self._num_journal_records = 0
+        self._unsaved_journal_records = []
+
+    def _can_append_to_journal(self, path: Path) -> bool:
+        """
+        Whether the snapshot and journal at the path are still the ones this raceday
+        was read from. Otherwise records appended to the journal would be lost, as
+        after a crash between writing a snapshot and removing its old journal, or
+        after the snapshot has been edited by hand.
+        """
+        if path != self._snapshot_path:
+            return False
+        try:
+            if _get_snapshot_stat(os.stat(path)) != self._snapshot_stat:
+                return False
+        except FileNotFoundError:
+            return False
+        if not _get_journal_path(path).exists():
+            return self._num_journal_records == 0
+        return _read_journal_snapshot_hash(path) == self._snapshot_hash
+
+    def _record(self, op: str, **record) -> None:
+        if not self._replaying_journal:
+            self._unsaved_journal_records.append({"op": op, **record})
+
+    def _replay_journal_record(self, record: Dict) -> None:
+        self._replaying_journal = True
+        try:
+            op = record["op"]
+            if op == JOURNAL_OP_PARTICIPANTS:
+                self.set_all_participants(record["numbers"])
+            elif op == JOURNAL_OP_FIRST_QUALIFIERS:
+                self.set_first_qualifiers(record["start_lists"])
+            elif op == JOURNAL_OP_START_LISTS:
+                self.set_new_start_lists(record["heat_name"], record["start_lists"])
+            elif op == JOURNAL_OP_NEXT_HEAT:
+                self.increment_current_heat()
+            elif op == JOURNAL_OP_RESULT:
+                self.add_result(
+                    record["heat_name"], record["rcclass"], record["group"],
+                    record["positions"],
+                    {int(num): laps for num, laps in record["num_laps_driven"].items()},
+                    {int(num): Duration(ms) for num, ms in record["total_times"].items()},
+                    [(num, Duration(ms)) for num, ms in record["best_laptimes"]],
+                    [(num, Duration(ms)) for num, ms in record["average_laptimes"]],
+                    record["manual"],
+                    number_list_to_driver_list(record["start_list"]),
+                    LapTimes(record["laptimes"]) if "laptimes" in record else None)
+            else:
+                raise ValueError(f"Unknown journal record {op}")
+        finally:
+            self._replaying_journal = False
 
     def _get_serializeable_raceday(self) -> Dict[str, Dict[str, Dict[str, Dict]]]:
         raceday = {
@@ -460,33 +866,57 @@ class Raceday:
         }
         return raceday
 
-    def _parse_start_lists(self, json_dict: Dict[str, Dict[str, Dict[str, List]]]) -> \
+    def _parse_start_lists(self, json_dict: Dict[str, Dict[str, Any]]) -> \
             Dict[str, Dict[str, HeatStartLists]]:
         return {
             heat_name: {
-                rcclass: HeatStartLists(heat_start_lists[rcclass], heat_name, rcclass)
-                for rcclass in heat_start_lists
+                rcclass: _name_race_objects(start_lists, heat_name, rcclass)
+                if isinstance(start_lists, HeatStartLists) else HeatStartLists(start_lists, heat_name, rcclass)
+                for rcclass, start_lists in heat_start_lists.items()
             }
             for heat_name, heat_start_lists in json_dict.items()
         }
 
-    def _parse_results(self, json_dict: Dict[str, Dict[str, Dict[str, Dict]]])\
+    def _parse_results(self, json_dict: Dict[str, Dict[str, Any]])\
             -> Dict[str, Dict[str, Dict[str, RaceResult]]]:
         return {
             heat_name: {
-                rcclass: {
-                    group_name: RaceResult(heat_name, rcclass, group_name,
-                                           **json_dict[heat_name][rcclass][group_name])
-                    for group_name in group_results
-                }
+                rcclass: _name_race_objects(group_results, heat_name, rcclass)
+                if isinstance(group_results, LazyGroupResults) else LazyGroupResults(heat_name, rcclass, group_results)
                 for rcclass, group_results in heat_results.items()
             }
             for heat_name, heat_results in json_dict.items()
         }
 
 
+def _name_race_objects(race_objects: Any, heat_name: str, rcclass: str) -> Any:
+    """
+    Sets the heat and class of start lists or results made by the json object hook,
+    which only knows the names of the levels above an object once it reaches them.
+    """
+    race_objects.heat_name = heat_name
+    race_objects.rcclass = rcclass
+    return race_objects
+
+
+def get_driver(number: int) -> Driver:
+    """Returns the shared Driver instance for the given car number."""
+    return Driver(number)
+
+
 def number_list_to_driver_list(numbers: List[int]) -> List[Driver]:
-    return [Driver(number) for number in numbers]
+    return [get_driver(number) for number in numbers]
+
+
+def _to_number(driver_or_number: Any) -> int:
+    return driver_or_number.number if isinstance(driver_or_number, Driver) else driver_or_number
+
+
+def _to_number_start_lists(start_lists: Dict[str, Dict[str, List]]) -> Dict[str, Dict[str, List[int]]]:
+    return {
+        rcclass: {group: [_to_number(d) for d in start_list] for group, start_list in groups.items()}
+        for rcclass, groups in start_lists.items()
+    }
 
 
 def create_empty_raceday() -> Raceday:
@@ -498,20 +928,20 @@ def init_raceday_path() -> bool:
     """Creates DB directory and returns whether today's raceday already exists"""
     RESULT_FOLDER_PATH.mkdir(exist_ok=True)
     filename = get_todays_filename()
-    path = RESULT_FOLDER_PATH / filename
+    path = get_raceday_path(Path(filename).stem)
 
     path_exists = path.exists()
     return path_exists
 
 
 def get_all_dates() -> List[str]:
-    all_files = sorted(RESULT_FOLDER_PATH.glob("??????.json"), reverse=True)
-    dates = []
-    for filename in all_files:
-        raw_date = filename.stem
-        date = datetime.datetime.strptime(raw_date, DB_DATE_FORMAT).strftime("%Y-%m-%d")
-        dates.append(date)
-    return dates
+    """Returns the dates (YYYY-MM-DD) of all racedays, newest first."""
+    return _raceday_date_index.get_dates()
+
+
+def raceday_date_exists(date: str) -> bool:
+    """Returns whether there is a raceday with the date YYYY-MM-DD."""
+    return _raceday_date_index.contains(date)
 
 
 def get_todays_filename() -> str:
@@ -522,38 +952,415 @@ def get_todays_filename() -> str:
 
 def get_raceday() -> Raceday:
     filename = get_todays_filename()
-    json_raceday = _load_raceday(filename, convert_to_durations=True)
-    return Raceday(json_raceday)
+    return _read_raceday(get_raceday_path(Path(filename).stem))
 
 
 def load_and_deserialize_raceday(filepath: str) -> Raceday:
-    with open(filepath) as f:
-        json_raceday = json.load(f)
-    replaced_with_durations = _replace_with_durations(json_raceday)
-    return Raceday(replaced_with_durations)
+    return _read_raceday(filepath)
+
 
+def read_raceday_file_as_json(path) -> Dict:
+    """Reads the raceday file at the path with its journal replayed, as the json of a new snapshot of it."""
+    json_raceday = _read_raceday(path)._get_serializeable_raceday()
+    return json.loads(json.dumps(json_raceday, default=lambda d: d.__dict__))
 
-def _load_raceday(filename, convert_to_durations=False) -> Dict:
-    with open(RESULT_FOLDER_PATH / filename) as f:
-        raceday = json.load(f)
-    return _replace_with_durations(raceday) if convert_to_durations else raceday
+
+def remove_journal(snapshot_path) -> None:
+    """Removes the journal of a raceday file, once its records are part of a new snapshot."""
+    _get_journal_path(Path(snapshot_path)).unlink(missing_ok=True)
 
 
 def get_raceday_with_date(date: str) -> Raceday:
-    """Returns a raceday with the given date string (YYYY-MM-DD)"""
+    """
+    Returns a raceday with the given date string (YYYY-MM-DD). The raceday
+    comes from the raceday cache, so it is shared and read only, and has to be
+    copied to be changed.
+    """
     # yeah, this may not be the best design, to convert back and forth...
     raceday_date = get_raceday_filename_str_no_ext(date)
-    filename = f"{raceday_date}.json"
-    with open(RESULT_FOLDER_PATH / filename) as f:
-        json_raceday = json.load(f)
-    return Raceday(_replace_with_durations(json_raceday))
+    return _raceday_cache.get(get_raceday_path(raceday_date))
 
 
 def get_raceday_with_filename(filename_no_ext: str) -> Raceday:
-    filename = f"{filename_no_ext}.json"
-    with open(RESULT_FOLDER_PATH / filename) as f:
-        json_raceday = json.load(f)
-    return Raceday(_replace_with_durations(json_raceday))
+    """
+    Returns the raceday with the filename YYMMDD (no extension). The raceday
+    comes from the raceday cache, so it is shared and read only, and has to be
+    copied to be changed.
+    """
+    return _raceday_cache.get(get_raceday_path(filename_no_ext))
+
+
+class RacedayCache:
+    """
+    A least recently used cache of loaded racedays, keyed by the path of the
+    raceday file. A cached raceday is only used as long as the modification
+    time and size of both the file and its journal, and the scoring rules of its
+    season, are unchanged. The cached racedays are shared, so they are read only.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self._racedays: OrderedDict[Path, Tuple[Tuple, Raceday]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Raceday:
+        key = self._get_validation_key(path)
+        with self._lock:
+            cached = self._racedays.get(path)
+            if cached is not None and cached[0] == key:
+                self._racedays.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        raceday = _read_raceday(path)
+        raceday._read_only = True
+        with self._lock:
+            self._racedays[path] = (key, raceday)
+            self._racedays.move_to_end(path)
+            while len(self._racedays) > self.max_size:
+                self._racedays.popitem(last=False)
+        return raceday
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._racedays.pop(path, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._racedays.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._racedays)}
+
+    @staticmethod
+    def _get_validation_key(path: Path) -> Tuple:
+        stat = os.stat(path)
+        try:
+            journal_stat = os.stat(_get_journal_path(path))
+            journal_key = (journal_stat.st_mtime_ns, journal_stat.st_size)
+        except FileNotFoundError:
+            journal_key = None
+        # the same rules object is returned for as long as the rules are unchanged
+        rules = get_season_scoring_rules(get_season_from_filename(path.stem))
+        return stat.st_mtime_ns, stat.st_size, journal_key, rules
+
+
+_raceday_cache = RacedayCache(RACEDAY_CACHE_SIZE)
+
+
+class RacedayDateIndex:
+    """
+    The dates of the raceday files in the result folder. The folder is only
+    scanned again when its modification time changes, or when the result folder
+    is changed.
+    """
+
+    def __init__(self):
+        self._folder: Optional[Path] = None
+        self._folder_mtime_ns: Optional[int] = None
+        self._dates: set = set()
+        self._sorted_dates: List[str] = []
+        self._lock = threading.Lock()
+
+    def contains(self, date: str) -> bool:
+        with self._lock:
+            self._refresh_if_changed()
+            return date in self._dates
+
+    def get_dates(self) -> List[str]:
+        with self._lock:
+            self._refresh_if_changed()
+            return list(self._sorted_dates)
+
+    def add(self, filename_no_ext: str) -> None:
+        """Adds a raceday which was just saved, so it's known before the folder is scanned again."""
+        date = _get_date_from_filename(filename_no_ext)
+        with self._lock:
+            if date is not None and date not in self._dates:
+                self._dates.add(date)
+                self._sorted_dates = sorted(self._dates, reverse=True)
+
+    def _refresh_if_changed(self) -> None:
+        try:
+            mtime_ns = os.stat(RESULT_FOLDER_PATH).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if self._folder == RESULT_FOLDER_PATH and self._folder_mtime_ns == mtime_ns:
+            return
+        raw_dates = {path.stem for path in RESULT_FOLDER_PATH.glob("??????.*")
+                     if path.suffix in (compactformat.JSON_EXTENSION, compactformat.COMPACT_EXTENSION)}
+        self._dates = {date for date in map(_get_date_from_filename, raw_dates) if date is not None}
+        self._sorted_dates = sorted(self._dates, reverse=True)
+        self._folder = RESULT_FOLDER_PATH
+        self._folder_mtime_ns = mtime_ns
+
+
+_raceday_date_index = RacedayDateIndex()
+
+
+def get_raceday_cache_stats() -> Dict[str, int]:
+    """Returns the hits, misses and current size of the raceday cache."""
+    return _raceday_cache.get_stats()
+
+
+def get_raceday_content_hash(filename_no_ext: str) -> str:
+    """
+    Returns a hash of the contents of the raceday file YYMMDD and its journal,
+    which changes whenever the raceday does. Files are only hashed again when
+    their modification time or size has changed.
+    """
+    path = get_raceday_path(filename_no_ext)
+    key = RacedayCache._get_validation_key(path)
+    with _content_hashes_lock:
+        cached = _content_hashes.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    content_hash = hashlib.sha1(path.read_bytes())
+    journal_path = _get_journal_path(path)
+    if journal_path.exists():
+        content_hash.update(b"\0" + journal_path.read_bytes())
+    digest = content_hash.hexdigest()
+    with _content_hashes_lock:
+        _content_hashes[path] = (key, digest)
+    return digest
+
+
+_content_hashes: Dict[Path, Tuple[Tuple, str]] = {}
+_content_hashes_lock = threading.Lock()
+
+
+def add_save_listener(listener: Callable[[str, Raceday], None]) -> None:
+    """Adds a function which is called with the filename (YYMMDD) and raceday every time a raceday is saved."""
+    if listener not in _save_listeners:
+        _save_listeners.append(listener)
+
+
+_save_listeners: List[Callable[[str, Raceday], None]] = []
+
+
+def get_season_from_filename(filename_no_ext: str) -> Optional[int]:
+    """Returns the season (year) of a raceday filename YYMMDD, or None if it isn't a raceday filename."""
+    if len(filename_no_ext) != 6 or not filename_no_ext.isdigit():
+        return None
+    return 2000 + int(filename_no_ext[:2])
+
+
+def get_season_scoring_rules(season: Optional[int]) -> cuppoints.ScoringRules:
+    """
+    Returns the scoring rules of a season, as set in the scoring rules file in the
+    result folder, or the default rules. The same rules object is returned for a
+    season as long as the file is unchanged.
+    """
+    path = RESULT_FOLDER_PATH / SCORING_RULES_FILENAME
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return cuppoints.DEFAULT_RULES
+
+    global _loaded_scoring_rules
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _scoring_rules_lock:
+        if _loaded_scoring_rules is None or _loaded_scoring_rules[0] != key:
+            with open(path) as f:
+                _loaded_scoring_rules = (key, {int(year): cuppoints.ScoringRules(definition)
+                                               for year, definition in json.load(f).items()})
+        return _loaded_scoring_rules[1].get(season, cuppoints.DEFAULT_RULES)
+
+
+def _apply_season_scoring_rules(raceday: Raceday, path: Path) -> None:
+    rules = get_season_scoring_rules(get_season_from_filename(Path(path).stem))
+    if raceday.scoring_rules is not rules:
+        raceday.set_scoring_rules(rules)
+
+
+_loaded_scoring_rules: Optional[Tuple[Tuple, Dict[int, cuppoints.ScoringRules]]] = None
+_scoring_rules_lock = threading.Lock()
+
+
+def get_raceday_from_store(filename_no_ext: str) -> Raceday:
+    """Returns the raceday with the filename YYMMDD from the raceday database."""
+    with sqlitestore.RacedayStore(get_store_path()) as store:
+        return Raceday(store.load_json_raceday(filename_no_ext))
+
+
+def get_store_path() -> Path:
+    return RESULT_FOLDER_PATH / sqlitestore.DATABASE_FILENAME
+
+
+def import_archive_into_store() -> List[str]:
+    """
+    Creates the raceday database if necessary, and imports (or re-imports) every
+    raceday file into it. Saving a raceday doesn't update the database, so this
+    is run again to bring it up to date. Returns the filenames of the imported racedays.
+    """
+    filenames = sorted({path.stem for path in RESULT_FOLDER_PATH.glob("??????.*")
+                        if path.suffix in (compactformat.JSON_EXTENSION, compactformat.COMPACT_EXTENSION)})
+    with sqlitestore.RacedayStore(get_store_path()) as store:
+        for filename in filenames:
+            raceday = _read_raceday(get_raceday_path(filename))
+            store.save_json_raceday(filename, _get_date_from_filename(filename), raceday._get_serializeable_raceday())
+    return filenames
+
+
+def _get_date_from_filename(filename_no_ext: str) -> Optional[str]:
+    try:
+        return datetime.datetime.strptime(filename_no_ext, DB_DATE_FORMAT).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def get_raceday_path(filename_no_ext: str) -> Path:
+    """
+    Returns the path of the raceday file with the given name (YYMMDD). This is the
+    compact file if there is one, otherwise the json file (which may not exist yet).
+    """
+    compact_path = RESULT_FOLDER_PATH / (filename_no_ext + compactformat.COMPACT_EXTENSION)
+    if compact_path.exists():
+        return compact_path
+    return RESULT_FOLDER_PATH / (filename_no_ext + compactformat.JSON_EXTENSION)
+
+
+def decode_raceday(fp) -> Raceday:
+    """
+    Decodes a raceday from an open json file. The Durations, the start lists and
+    results of each class and the Raceday itself are built by the object hook
+    while the json is being parsed, see _decode_json_object.
+    """
+    return _to_raceday(json.load(fp, object_hook=_decode_json_object))
+
+
+def _to_raceday(decoded: Any) -> Raceday:
+    return decoded if isinstance(decoded, Raceday) else Raceday(decoded)
+
+
+def _read_raceday(path) -> Raceday:
+    """Reads the raceday snapshot at the path and replays its journal on top of it."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        data = f.read()
+        stat = os.fstat(f.fileno())
+    if path.suffix == compactformat.COMPACT_EXTENSION:
+        raceday = Raceday(compactformat.decode_raceday(data))
+    else:
+        raceday = _to_raceday(json.loads(data, object_hook=_decode_json_object))
+
+    records = _read_journal(path, data)
+    for record in records:
+        raceday._replay_journal_record(record)
+    raceday._snapshot_path = path
+    raceday._snapshot_hash = _get_snapshot_hash(data)
+    raceday._snapshot_stat = _get_snapshot_stat(stat)
+    raceday._num_journal_records = len(records)
+    _apply_season_scoring_rules(raceday, path)
+    return raceday
+
+
+def _get_journal_path(snapshot_path: Path) -> Path:
+    return snapshot_path.with_suffix(JOURNAL_EXTENSION)
+
+
+def _get_snapshot_hash(snapshot_data: bytes) -> str:
+    return hashlib.sha1(snapshot_data).hexdigest()
+
+
+def _get_snapshot_stat(stat: os.stat_result) -> Tuple[int, int, int]:
+    """What is compared to tell whether a snapshot is still the one a raceday was read from, without reading it."""
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _read_journal(snapshot_path: Path, snapshot_data: bytes) -> List[Dict]:
+    """
+    Returns the journal records of the snapshot. The first line of a journal names
+    the hash of the snapshot it was started on, and a journal that doesn't match
+    the snapshot has already been folded into it. A last line that can't be
+    decoded is a record cut off by a crash and is skipped, while any other line
+    that can't be decoded raises a ValueError, as the records after it would be
+    replayed without it.
+    """
+    journal_path = _get_journal_path(snapshot_path)
+    if not journal_path.exists():
+        return []
+    with open(journal_path) as f:
+        lines = f.read().splitlines()
+
+    records = []
+    for line_number, line in enumerate(lines, 1):
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            if line_number < len(lines):
+                raise ValueError(f"Line {line_number} of the journal {journal_path} is corrupt")
+    if not records or records[0].get("snapshot") != _get_snapshot_hash(snapshot_data):
+        return []
+    return records[1:]
+
+
+def _read_journal_snapshot_hash(snapshot_path: Path) -> Optional[str]:
+    """Returns the hash of the snapshot the journal was started on, or None if it can't be read."""
+    try:
+        with open(_get_journal_path(snapshot_path)) as f:
+            header = json.loads(f.readline())
+    except (FileNotFoundError, ValueError):
+        return None
+    return header.get("snapshot") if isinstance(header, dict) else None
+
+
+def _append_to_journal(snapshot_path: Path, snapshot_hash: str, records: List[Dict]) -> None:
+    journal_path = _get_journal_path(snapshot_path)
+    lines = []
+    journal_size = journal_path.stat().st_size if journal_path.exists() else 0
+    if journal_size > 0:
+        with open(journal_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # the last record was cut off by a crash, and is removed so that only the last line can be corrupt
+                f.seek(0)
+                journal_size = f.read().rfind(b"\n") + 1
+                f.truncate(journal_size)
+    if journal_size == 0:
+        lines.append(json.dumps({"snapshot": snapshot_hash}))
+    lines.extend(json.dumps(record) for record in records)
+    with open(journal_path, "a") as f:
+        f.write("\n".join(lines) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_file_atomically(path: Path, data: bytes) -> None:
+    temporary_path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+def _decode_json_object(json_object: Dict) -> Any:
+    """
+    The object hook for raceday json files. json calls it for the innermost objects
+    first, so it gets the Durations, then the start lists or results of each class
+    (kept lazily as a LazyGroupResults) and last the raceday, which is built from
+    them as is. The objects it doesn't recognise, such as groups that aren't named
+    with letters, are returned as dictionaries and parsed by Raceday instead.
+    """
+    if len(json_object) == 1 and "milliseconds" in json_object:
+        return Duration(json_object["milliseconds"])
+    if json_object.keys() >= _RACEDAY_KEYS:
+        return Raceday(json_object)
+    if json_object and all(group in _GROUP_NAME_SET for group in json_object):
+        values = json_object.values()
+        if all(isinstance(start_list, list) and start_list for start_list in values):
+            return HeatStartLists(json_object, None, None)
+        if all(isinstance(result, dict) and "positions" in result for result in values):
+            return LazyGroupResults(None, None, json_object)
+    return json_object
 
 
 def get_raceday_filename_str_no_ext(date_str: str):
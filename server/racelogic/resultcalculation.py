@@ -1,12 +1,14 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import List, Dict, Tuple, Iterable, Callable, Any, Set, Optional
 
 try:
     from server.racelogic.names import NAMES
     from server.racelogic.duration import Duration
-    from server.racelogic import htmlparsing, textmessages, raceday as rd, filelocation
+    from server.racelogic import htmlparsing, textmessages, raceday as rd, filelocation, cuppoints, leaderboard, \
+        projection
     import server.racelogic.util as util
-    import server.racelogic.constants as constants
 except ImportError:
     from names import NAMES
     from duration import Duration
@@ -14,17 +16,20 @@ except ImportError:
     import textmessages
     import raceday as rd
     import filelocation
-    import constants
+    import cuppoints
+    import leaderboard
+    import projection
     import util
 
 import numpy as np
 
-import math
 import argparse
 import clipboard
-import copy
 import os
+import datetime
+import hashlib
 import json
+import time
 
 SETTINGS = {
     "max_participants": 9
@@ -37,13 +42,20 @@ if os.path.isfile("settings.json"):
 
 MAX_NUM_PARTICIPANTS_PER_GROUP = SETTINGS["max_participants"]
 
+# a live result is considered finished when its file hasn't grown for this many seconds
+LIVE_RESULT_IDLE_TIMEOUT = 30
+
+# the date formats of the folder names which give the raceday of the reports in them when importing
+REPORT_FOLDER_DATE_FORMATS = ("%Y-%m-%d", rd.DB_DATE_FORMAT)
+
 
 class SeasonPoints:
 
     def __init__(self):
         self.total_points: Dict[rd.Driver, int] = defaultdict(int)
         self.total_points_with_drop_race: Dict[rd.Driver, int] = defaultdict(int)
-        self.drop_race_indices: Dict[rd.Driver, int] = defaultdict(int)
+        # the indices of the races that are dropped, in race order
+        self.drop_race_indices: Dict[rd.Driver, List[int]] = defaultdict(list)
         self.points_per_race: Dict[rd.Driver, List[int]] = defaultdict(list)
         self.race_participation: Dict[rd.Driver, List[bool]] = defaultdict(list)
         self.race_locations: List[str] = []
@@ -164,12 +176,10 @@ def _get_all_participants(participants):
 
 
 def add_participants() -> Dict[str, Dict[str, List[int]]]:
-    participants = {"2WD": defaultdict(list), "4WD": defaultdict(list)}
+    participants = {rcclass: defaultdict(list) for rcclass in cuppoints.RCCLASSES}
 
-    classes = ["2WD", "4WD"]
-    groups = ["A", "B", "C"]
-    for rcclass in classes:
-        for group in groups:
+    for rcclass in participants:
+        for group in rd.GROUP_NAMES:
             print(f"Nu matar du in deltagare för {rcclass}, grupp {group}")
             print("Skriv deltagarna in ordningen de ska starta i sitt kvalheat.")
             print("Tomma grupper kommer inte att användas.")
@@ -190,53 +200,35 @@ def add_participants() -> Dict[str, Dict[str, List[int]]]:
     return filtered_participants
 
 
-def _should_get_points(group_results: rd.RaceResult, driver: rd.Driver) -> bool:
-    return not (group_results.has_dns() and not group_results.did_driver_start(driver))
-
-
-def _calculate_points_from_non_finals(results: Dict[str, Dict[str, rd.RaceResult]],
-                                      points: Dict[str, Dict[rd.Driver, List[int]]]) -> None:
-    for rcclass in points:
-        # iterate such that we parse A group first
-        current_points = constants.MAX_POINTS_IN_NON_FINALS
-        for group in sorted(results[rcclass]):
-            positions = results[rcclass][group].positions
-            for driver in positions:
-                if _should_get_points(results[rcclass][group], driver):
-                    points[rcclass][driver].append(current_points)
-                else:
-                    points[rcclass][driver].append(0)
-                current_points -= 1
-
-
-def _calculate_points_from_finals(results: Dict[str, Dict[str, rd.RaceResult]],
-                                  points: Dict[str, Dict[rd.Driver, List[int]]]) -> None:
-    drivers_counted = set()
-    for rcclass in points:
-        # iterate such that we parse A group first
-        current_points = constants.MAX_POINTS_IN_FINALS
-        for group in sorted(results[rcclass]):
-            positions = results[rcclass][group].positions
-            for driver in positions:
-                if driver not in drivers_counted:
-                    drivers_counted.add(driver)
-                    if _should_get_points(results[rcclass][group], driver):
-                        points[rcclass][driver].append(current_points)
-                    current_points -= 2
+def _calculate_cup_points(raceday: rd.Raceday) -> Tuple[Dict[rd.Driver, int], Dict[str, Dict[rd.Driver, List[int]]]]:
+    return raceday.get_cup_points()
 
 
-def _calculate_cup_points(raceday: rd.Raceday) -> Tuple[Dict[rd.Driver, int], Dict[str, Dict[rd.Driver, List[int]]]]:
-    points_per_race = {"2WD": defaultdict(list), "4WD": defaultdict(list)}
+def _calculate_cup_points_from_scratch(raceday: rd.Raceday) \
+        -> Tuple[Dict[rd.Driver, int], Dict[str, Dict[rd.Driver, List[int]]]]:
+    points_per_race = cuppoints.create_empty_points()
     for heat_name in rd.RACE_ORDER:
         if raceday.are_all_races_in_round_completed(heat_name):
             if heat_name not in (rd.QUALIFIERS_NAME, rd.FINALS_NAME) and raceday.heat_has_result(heat_name):
-                _calculate_points_from_non_finals(raceday.get_heat_results(heat_name), points_per_race)
+                cuppoints.calculate_points_from_non_finals(raceday.get_heat_results(heat_name), points_per_race,
+                                                           raceday.scoring_rules)
             elif heat_name == rd.FINALS_NAME:
-                _calculate_points_from_finals(raceday.get_heat_results(heat_name), points_per_race)
+                cuppoints.calculate_points_from_finals(raceday.get_heat_results(heat_name), points_per_race,
+                                                       raceday.scoring_rules)
 
-    return {num: sum(point_list)
-            for rcclass in points_per_race
-            for num, point_list in points_per_race[rcclass].items()}, points_per_race
+    return cuppoints.sum_points(points_per_race), points_per_race
+
+
+def verify_cup_points(raceday: rd.Raceday) -> bool:
+    """
+    Checks that the cup points kept by the raceday are the same as when calculating
+    them from scratch from all results, including the order of the drivers.
+    """
+    points, points_per_race = raceday.get_cup_points()
+    expected_points, expected_points_per_race = _calculate_cup_points_from_scratch(raceday)
+    return points == expected_points and all(
+        list(points_per_race[rcclass].items()) == list(expected_points_per_race[rcclass].items())
+        for rcclass in expected_points_per_race)
 
 
 def create_qualifiers():
@@ -255,19 +247,13 @@ def create_qualifiers():
     raceday.save()
 
 
-def _enter_new_groups() -> Dict[str, List[str]]:
-    groups_to_add = {
-        "A": ["A"],
-        "B": ["A", "B"],
-        "C": ["A", "B", "C"]  # deal with it, I'm tired
-    }
-
-    groups = {"2WD": [], "4WD": []}
-    for rcclass in groups:
+def _enter_new_groups(rcclasses: Iterable[str] = cuppoints.RCCLASSES) -> Dict[str, List[str]]:
+    groups = {}
+    for rcclass in rcclasses:
         entered = ""
-        while entered not in ("A", "B", "C"):
+        while len(entered) != 1 or entered not in rd.GROUP_NAMES:
             entered = _input(f"Skriv in den lägsta gruppen för {rcclass}: ")
-        groups[rcclass] = groups_to_add[entered]
+        groups[rcclass] = rd.get_group_names(rd.GROUP_NAMES.index(entered) + 1)
     return groups
 
 
@@ -283,16 +269,18 @@ def _select_from_list(options: List[Any], message: str, element_format_fn: Calla
 
 
 def _create_almost_equal_partitions(drivers: List[rd.Driver], num_partitions: int) -> List[List[rd.Driver]]:
-    if len(drivers) % num_partitions == 0:
-        partitions = []
-        partition_size = len(drivers) // num_partitions
-        for i in range(num_partitions):
-            partitions.append(drivers[i * partition_size:(i + 1) * partition_size])
-        return partitions
-    else:
-        first_partition_size = math.ceil(len(drivers) / num_partitions)
-        return [drivers[:first_partition_size]] + \
-               _create_almost_equal_partitions(drivers[first_partition_size:], num_partitions - 1)
+    """
+    Splits the drivers in order into num_partitions partitions, whose sizes differ by
+    at most one. The first partitions get the extra drivers.
+    """
+    partition_size, num_larger_partitions = divmod(len(drivers), num_partitions)
+    partitions = []
+    start = 0
+    for i in range(num_partitions):
+        end = start + partition_size + (1 if i < num_larger_partitions else 0)
+        partitions.append(drivers[start:end])
+        start = end
+    return partitions
 
 
 def _create_start_list_from_qualifiers(groups: Dict[str, List[str]], raceday: rd.Raceday) \
@@ -304,7 +292,7 @@ def _create_start_list_from_qualifiers(groups: Dict[str, List[str]], raceday: rd
     where each group is mapped to a list of drivers (the start list),
     as well as a set of the duplicate drivers.
     """
-    start_lists = {"2WD": {}, "4WD": {}}
+    start_lists = {rcclass: {} for rcclass in groups}
 
     def _group_sort_fn(item: Tuple[str, rd.RaceResult]) -> Tuple[int, int]:
         _, results = item
@@ -323,21 +311,22 @@ def _create_start_list_from_qualifiers(groups: Dict[str, List[str]], raceday: rd
             reverse=True
         )
 
-        class_positions = [copy.deepcopy(results.positions) for _, results in class_results]
+        # take the drivers from the heats in turns, one position at a time
+        heat_queues = deque(deque(results.positions) for _, results in class_results if results.positions)
 
         all_positions: List[rd.Driver] = []
-        curr_heat = 0
-        while any(class_positions):
-            if len(class_positions[curr_heat]):
-                driver = class_positions[curr_heat].pop(0)
+        while heat_queues:
+            heat_queue = heat_queues.popleft()
+            driver = heat_queue.popleft()
 
-                if driver in added_drivers:
-                    duplicate_drivers.add(driver)
-                else:
-                    all_positions.append(driver)
-                    added_drivers.add(driver)
+            if driver in added_drivers:
+                duplicate_drivers.add(driver)
+            else:
+                all_positions.append(driver)
+                added_drivers.add(driver)
 
-            curr_heat = (curr_heat + 1) % len(class_positions)
+            if heat_queue:
+                heat_queues.append(heat_queue)
 
         groups_for_class = groups[rcclass]
         partitioned_positions = _create_almost_equal_partitions(all_positions, len(groups_for_class))
@@ -346,44 +335,36 @@ def _create_start_list_from_qualifiers(groups: Dict[str, List[str]], raceday: rd
     return start_lists, duplicate_drivers
 
 
+def _move_drivers_between_groups(group_positions: List[Tuple[rd.Driver, ...]]) -> List[Tuple[rd.Driver, ...]]:
+    """
+    Takes the positions of each group, highest group first, and returns the start
+    lists of the next round: between each pair of adjacent groups, the two slowest
+    drivers of the higher group and the two fastest of the lower group switch places.
+    """
+    new_positions = list(group_positions)
+    for i in range(len(new_positions) - 1):
+        higher_positions, lower_positions = new_positions[i], new_positions[i + 1]
+        new_positions[i] = higher_positions[:-2] + lower_positions[:2]
+        new_positions[i + 1] = higher_positions[-2:] + lower_positions[2:]
+    return new_positions
+
+
 def _create_start_list_intermediate_races(raceday: rd.Raceday, heat_name: str) \
         -> Tuple[Dict[str, Dict[str, List[rd.Driver]]], Set[rd.Driver]]:
-    start_lists = {"2WD": {}, "4WD": {}}
     results = raceday.get_heat_results(heat_name)
+    start_lists = {rcclass: {} for rcclass in results}
 
     for rcclass in start_lists:
-        # noinspection PyTypeChecker
-        group_results: List[Tuple[str, rd.RaceResult]] = \
-            sorted(copy.deepcopy(results[rcclass]).items(), key=lambda k: k[0])
-
-        if len(group_results) == 1:
-            start_lists[rcclass]["A"] = group_results[0][1].positions
+        groups = sorted(results[rcclass])
+        group_positions = [tuple(results[rcclass][group].positions) for group in groups]
 
+        if len(groups) == 1:
+            start_lists[rcclass][rd.get_group_names(1)[0]] = list(group_positions[0])
         else:
-            new_start_lists = {}
-            for i in range(len(group_results) - 1):
-                higher_group, higher_results = group_results[i]
-                lower_group, lower_results = group_results[i + 1]
-
-                higher_positions = higher_results.positions
-                lower_positions = lower_results.positions
-
-                higher_slowest = higher_positions.pop()
-                higher_second_slowest = higher_positions.pop()
-
-                lower_fastest = lower_positions.pop(0)
-                lower_second_fastest = lower_positions.pop(0)
-
-                higher_positions.append(lower_fastest)
-                higher_positions.append(lower_second_fastest)
-
-                lower_positions.insert(0, higher_slowest)
-                lower_positions.insert(0, higher_second_slowest)
-
-                new_start_lists[higher_group] = higher_positions
-                new_start_lists[lower_group] = lower_positions
-
-            start_lists[rcclass] = new_start_lists
+            start_lists[rcclass] = {
+                group: list(positions)
+                for group, positions in zip(groups, _move_drivers_between_groups(group_positions))
+            }
     return start_lists, _remove_and_return_duplicate_drivers(start_lists)
 
 
@@ -400,33 +381,24 @@ def _remove_and_return_duplicate_drivers(start_lists):
     return all_duplicate_drivers
 
 
-def _sort_by_points_and_best_heats(points):
-    def key_fn(item):
-        number, p = item
-        point_histogram = [0] * constants.MAX_POINTS_IN_NON_FINALS
-        for point in p:
-            point_histogram[point - 1] += 1
-        return tuple([sum(p)] + list(reversed(point_histogram)))
-
-    return sorted(points.items(), key=key_fn)
-
-
 def _create_start_lists_for_finals(raceday: rd.Raceday) \
         -> Tuple[Dict[str, Dict[str, List[rd.Driver]]], Set[rd.Driver]]:
-    start_lists = {"2WD": defaultdict(list), "4WD": defaultdict(list)}
-    points, points_per_race = _calculate_cup_points(raceday)
-
-    for rcclass in start_lists:
-        highest_points = _sort_by_points_and_best_heats(points_per_race[rcclass])
-        group_index = 0
-        groups = ["A", "B", "C"]
-        while highest_points:
-            curr_group = groups[group_index]
-            if ((len(start_lists[rcclass][curr_group]) == (MAX_NUM_PARTICIPANTS_PER_GROUP - 1)) and
-                    (len(highest_points) > 1)):
-                group_index += 1
-            else:
-                start_lists[rcclass][curr_group].append(highest_points.pop()[0])
+    seeding_keys = raceday.get_seeding_keys()
+    start_lists = {rcclass: defaultdict(list) for rcclass in seeding_keys}
+
+    for rcclass, class_seeding_keys in seeding_keys.items():
+        # highest first, where drivers with equal keys are taken in reverse order of when they got points
+        seeded_drivers = sorted(class_seeding_keys, key=class_seeding_keys.__getitem__)[::-1]
+        # each group gets one place less than the maximum, which is kept for the winner of the group below,
+        # except the lowest group, which takes the last driver if only one is left
+        group_size = max(MAX_NUM_PARTICIPANTS_PER_GROUP - 1, 1)
+        num_drivers = len(seeded_drivers)
+        for i, driver in enumerate(seeded_drivers):
+            remaining = num_drivers - i
+            group_index = i // group_size
+            if remaining == 1 and i % group_size == 0 and i > 0:
+                group_index -= 1
+            start_lists[rcclass][rd.GROUP_NAMES[group_index]].append(driver)
     return start_lists, _remove_and_return_duplicate_drivers(start_lists)
 
 
@@ -441,6 +413,10 @@ def _create_new_start_lists(groups: Dict[str, List[str]], raceday: rd.Raceday) \
         return _create_start_lists_for_finals(raceday)
 
 
+def _format_groups(groups: Dict[str, List[str]]) -> str:
+    return " och ".join(f"{rcclass} {', '.join(class_groups)}" for rcclass, class_groups in groups.items())
+
+
 def start_new_race_round():
     raceday = rd.get_raceday()
     current_heat = raceday.get_current_heat()
@@ -451,10 +427,10 @@ def start_new_race_round():
     groups = raceday.get_current_groups()
 
     if raceday.get_current_heat() == rd.QUALIFIERS_NAME:
-        print(f"Nuvarande grupper är 2WD {', '.join(groups['2WD'])} och 4WD {', '.join(groups['4WD'])}")
+        print(f"Nuvarande grupper är {_format_groups(groups)}")
         while not _confirm_yes_no("Vill du fortfarande använda dessa grupper?"):
-            groups = _enter_new_groups()
-            print(f"Nya grupper är 2WD {', '.join(groups['2WD'])} och 4WD {', '.join(groups['4WD'])}")
+            groups = _enter_new_groups(groups)
+            print(f"Nya grupper är {_format_groups(groups)}")
 
     new_start_lists, duplicate_drivers = _create_new_start_lists(groups, raceday)
 
@@ -474,7 +450,7 @@ def _get_next_race(raceday: rd.Raceday) -> Tuple[Optional[str], Optional[str], O
     heat_name = raceday.get_current_heat()
     heat_start_lists = raceday.get_start_lists_for_heat(heat_name)
     current_results = raceday.get_heat_results(heat_name)
-    for class_order_index, (rcclass, group) in enumerate(rd.CLASS_ORDER[heat_name]):
+    for class_order_index, (rcclass, group) in enumerate(raceday.get_class_order(heat_name)):
         if not heat_start_lists[rcclass].has_group(group):
             continue
         if current_results is None or group not in current_results[rcclass]:
@@ -482,30 +458,48 @@ def _get_next_race(raceday: rd.Raceday) -> Tuple[Optional[str], Optional[str], O
     return None, None, None, None
 
 
-def _read_results():
-    parser = htmlparsing.RCMHtmlParser()
-    html_file_contents = filelocation.find_and_read_latest_html_file()
+def _read_results(result_path=None):
+    parser = htmlparsing.RCMReportTokenizer()
+    if result_path is None:
+        html_file_contents = filelocation.find_and_read_latest_html_file()
+    else:
+        html_file_contents = filelocation.read_html_file(result_path)
     parser.parse_data(html_file_contents)
     return parser
 
 
-def add_new_result(drivers_to_exclude=None):
+def add_new_result(drivers_to_exclude=None, result_path=None, interactive=True):
+    """
+    Adds the result in the RCM file at result_path, or the latest on the USB drive if None.
+    If not interactive nothing is asked: the drivers who shouldn't have driven in the race
+    are left out, and a result which matches several races equally well, or a race which
+    already has a result, is left to be added with -r instead.
+    """
     raceday = rd.get_raceday()
-    parser = _read_results()
+    parser = _read_results(result_path)
 
     total_times = htmlparsing.get_total_times(parser)
     num_laps_driven = htmlparsing.get_num_laps_driven(parser)
     positions = htmlparsing.get_positions(total_times, num_laps_driven)
     best_laptimes = htmlparsing.get_best_laptimes(parser)
     average_laptimes = htmlparsing.get_average_laptimes(total_times, num_laps_driven)
+    laptimes = htmlparsing.get_laptimes(parser)
 
     race_participants = rd.number_list_to_driver_list(htmlparsing.get_race_participants(parser))
-    race, rcclass, group, start_list = raceday.find_relevant_race(race_participants)
+    match = raceday.match_race(race_participants)
+    race, rcclass, group, start_list = match.heat_name, match.rcclass, match.group, match.start_list
+    if match.is_ambiguous():
+        tied = ", ".join(f"{tied_rcclass} {tied_group}" for tied_rcclass, tied_group in match.tied_races)
+        print(f"Varning: resultatet matchar {tied} lika bra som {rcclass} {group}!")
+    if match.unknown_drivers:
+        print(f"Varning: förarna {match.unknown_drivers} finns inte i någon startlista i det här heatet.")
 
     extra_participants = set(race_participants) - set(start_list)
     if extra_participants:
-        if _confirm_yes_no(f"Förarna {extra_participants} skulle inte "
-                           f"ha kört i det här racet. Vill du ta bort dem?"):
+        if not interactive:
+            print(f"Förarna {extra_participants} skulle inte ha kört i det här racet och tas bort.")
+        if not interactive or _confirm_yes_no(f"Förarna {extra_participants} skulle inte "
+                                              f"ha kört i det här racet. Vill du ta bort dem?"):
             for driver in extra_participants:
                 if drivers_to_exclude is None:
                     drivers_to_exclude = []
@@ -515,6 +509,7 @@ def add_new_result(drivers_to_exclude=None):
         for driver in drivers_to_exclude:
             del total_times[driver.number]
             del num_laps_driven[driver.number]
+            del laptimes[driver.number]
             positions.remove(driver.number)
             # FIXME this doesn't work in manual mode
             best_laptimes = [(n, time) for n, time in best_laptimes if n != driver.number]
@@ -526,11 +521,17 @@ def add_new_result(drivers_to_exclude=None):
         return
 
     print(f"Det senaste resultatet matchar {rcclass} {group} {race}.")
-    if not _confirm_yes_no():
+    if not interactive and match.is_ambiguous():
+        print("Lägg till resultatet med -r istället.")
+        return
+    if interactive and not _confirm_yes_no():
         print("Mata in resultatet manuellt istället.")
         return
 
     if raceday.result_exists(race, rcclass, group):
+        if not interactive:
+            print("Det här racet har redan ett resultat. Lägg till resultatet med -r för att skriva över det.")
+            return
         print("Det här racet har redan ett resultat, som kommer att skrivas över.")
         if not _confirm_yes_no():
             return
@@ -541,7 +542,8 @@ def add_new_result(drivers_to_exclude=None):
 
     raceday.add_result(race, rcclass, group,
                        positions, num_laps_driven, total_times,
-                       best_laptimes, average_laptimes, False, start_list)
+                       best_laptimes, average_laptimes, False, start_list,
+                       rd.LapTimes.from_milliseconds(laptimes))
 
     raceday.save()
 
@@ -554,13 +556,60 @@ def add_new_result(drivers_to_exclude=None):
     print("^^ Kopierat till urklipp")
 
 
+def watch_results():
+    """
+    Adds every result file that is written to the USB drive, as soon as it is written.
+    Nothing is asked, so the results that need an answer are left to be added with -r.
+    """
+    print(f"Väntar på nya resultat på {filelocation.DRIVE_MOUNT_LOCATION}, avsluta med Ctrl+C.")
+    try:
+        for result_path in filelocation.watch_result_files():
+            print(f"Nytt resultat: {os.path.basename(result_path)}")
+            add_new_result(result_path=result_path, interactive=False)
+    except KeyboardInterrupt:
+        print("Slutade vänta på resultat.")
+
+
+def follow_live_result(show_laps=False):
+    """Follows the result file of the latest race while it is written, and shows the provisional positions."""
+    result_path = filelocation.find_latest_html_file()
+    print(f"Följer {os.path.basename(result_path)}, avsluta med Ctrl+C.")
+
+    def print_lap(number, name, lap, milliseconds):
+        if show_laps:
+            print(f"{number} {name}: varv {lap} {Duration(milliseconds)}")
+
+    tail = htmlparsing.ReportTail(result_path, print_lap)
+    last_change = time.monotonic()
+    try:
+        while time.monotonic() - last_change < LIVE_RESULT_IDLE_TIMEOUT:
+            if tail.read():
+                last_change = time.monotonic()
+                _print_provisional_positions(tail.parser)
+            time.sleep(filelocation.POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    print("Slutställning:")
+    _print_provisional_positions(tail.finish())
+
+
+def _print_provisional_positions(parser):
+    total_times = htmlparsing.get_total_times(parser)
+    num_laps_driven = htmlparsing.get_num_laps_driven(parser)
+    names = {int(number): name for number, name in parser.result}
+    for position, number in enumerate(htmlparsing.get_positions(total_times, num_laps_driven), start=1):
+        print(f"{position}. {number} {names[number]}: {num_laps_driven[number]} varv, {total_times[number]}")
+    print()
+
+
 def add_new_result_manually():
     # FIXME this need to be reworked, too much is duplicated
     raceday = rd.get_raceday()
     race = raceday.get_current_heat()
 
     race_options = [(rcclass, group)
-                    for rcclass in ("2WD", "4WD") for group in raceday.get_groups_in_race(race, rcclass)]
+                    for rcclass in raceday.get_start_lists_for_heat(race)
+                    for group in raceday.get_groups_in_race(race, rcclass)]
     rcclass, group = _select_from_list(
         race_options, "Välj vilket race att mata in manuellt.", lambda e: " ".join(e))
 
@@ -630,7 +679,7 @@ def show_latest_result(select=False):
     else:
         race_options = [(race, rcclass, group)
                         for race in raceday.get_heats_with_results()
-                        for rcclass in ("2WD", "4WD")
+                        for rcclass in raceday.get_heat_results(race)
                         for group in raceday.get_class_results(race, rcclass)]
         race, rcclass, group = _select_from_list(
             race_options, "Välj vilket race att visa resultat för.", lambda e: " ".join(e))
@@ -656,7 +705,7 @@ def show_current_heat_start_list(raceday: rd.Raceday = None) -> None:
 
     text_message = textmessages.create_heat_start_list_text_message(
         heat_start_lists,
-        rd.CLASS_ORDER[heat_name],
+        raceday.get_class_order(heat_name),
         heat_name,
         extra_text="Vinnare i lägre grupper deltar i nästa högre grupp (ex. B -> A)"
         if heat_name == rd.FINALS_NAME else "")
@@ -679,7 +728,7 @@ def get_all_start_lists(raceday) -> Tuple[Iterable[Tuple[str, List]], Dict[str,
         marshals[heat_name] = {}
 
         heat_start_lists = []
-        class_order = rd.CLASS_ORDER[heat_name]
+        class_order = raceday.get_class_order(heat_name)
 
         # we need to reverse all of them, so they are in reverse chronological order
         for race_index, (rcclass, group) in reversed(list(enumerate(class_order))):
@@ -701,7 +750,7 @@ def get_all_start_lists(raceday) -> Tuple[Iterable[Tuple[str, List]], Dict[str,
             previous_rcclass, previous_group = \
                 util.get_previous_group_wrap_around(
                     raceday.get_start_lists_for_heat(heat_name),
-                    rd.CLASS_ORDER[heat_name],
+                    raceday.get_class_order(heat_name),
                     race_index
                 )
             previous_start_list = \
@@ -720,61 +769,79 @@ def _get_all_participants_over_a_season(racedays: List[rd.Raceday]) -> Set[rd.Dr
     return all_participants
 
 
-def _delete_if_exists(key: Any, dictionary: Dict):
-    if key in dictionary:
-        del dictionary[key]
-
-
-def _remove_drivers_with_no_participation(season_points_per_class: Dict[str, SeasonPoints]):
-    drivers_to_remove = []
-    for rcclass in ("2WD", "4WD"):
-        season_points = season_points_per_class[rcclass]
-        for driver in season_points.race_participation:
-            if not any(season_points.race_participation[driver]):
-                drivers_to_remove.append((rcclass, driver))
-
-    for rcclass, driver in drivers_to_remove:
-        _delete_if_exists(driver, season_points_per_class[rcclass].total_points)
-        _delete_if_exists(driver, season_points_per_class[rcclass].total_points_with_drop_race)
-        del season_points_per_class[rcclass].drop_race_indices[driver]
-        del season_points_per_class[rcclass].points_per_race[driver]
-        del season_points_per_class[rcclass].race_participation[driver]
+def _create_season_points_matrix(
+        cup_points_per_raceday: List[Tuple[Dict[rd.Driver, int], Dict[str, Dict[rd.Driver, List[int]]]]],
+        drivers: List[rd.Driver]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Creates the (drivers x racedays x classes) matrices of the cup points each driver
+    got at each raceday in each class, and of whether they participated in that class.
+    A driver's points of a raceday are counted in 2WD if they got any 2WD points,
+    otherwise in 4WD.
+    """
+    driver_indices = {driver: i for i, driver in enumerate(drivers)}
+    points = np.zeros((len(drivers), len(cup_points_per_raceday), len(cuppoints.RCCLASSES)), dtype=np.int64)
+    participation = np.zeros(points.shape, dtype=bool)
+    for raceday_index, (race_points, points_per_heat) in enumerate(cup_points_per_raceday):
+        for driver, driver_points in race_points.items():
+            driver_index = driver_indices.get(driver)
+            if driver_index is None:
+                continue
+            class_index = 0 if driver in points_per_heat[cuppoints.RCCLASSES[0]] else 1
+            points[driver_index, raceday_index, class_index] = driver_points
+            participation[driver_index, raceday_index, class_index] = True
+    return points, participation
 
 
-def calculate_season_points(racedays: List[rd.Raceday], race_locations: List[str]) \
-        -> Dict[str, SeasonPoints]:
+def calculate_season_points(racedays: List[rd.Raceday], race_locations: List[str],
+                            rules: cuppoints.ScoringRules = cuppoints.DEFAULT_RULES) -> Dict[str, SeasonPoints]:
     """
     Calculates the cup points over a season, and returns a dictionary where
-    each rcclass is mapped to the points those drivers got.
+    each rcclass is mapped to the points those drivers got. The points of each
+    raceday are calculated with the scoring rules of the raceday, and the rules
+    given here decide the number of drop races.
     """
-    season_points_per_class = {"2WD": SeasonPoints(), "4WD": SeasonPoints()}
-    season_points_per_class["2WD"].race_locations = race_locations
-    season_points_per_class["4WD"].race_locations = race_locations
-    all_drivers = _get_all_participants_over_a_season(racedays)
-    points_for_all_races = [_calculate_cup_points(raceday) for raceday in racedays]
-    for driver in all_drivers:
-        for race_points, points_per_heat in points_for_all_races:
-            rcclass = "2WD" if driver in points_per_heat["2WD"] else "4WD"
-            driver_points = race_points.get(driver, None)
-            drove_in_neither_class = driver_points is None
-
-            race_points = driver_points if not drove_in_neither_class else 0
-            season_points_per_class[rcclass].total_points[driver] += race_points
-            season_points_per_class[rcclass].total_points_with_drop_race[driver] += race_points
-            season_points_per_class[rcclass].points_per_race[driver].append(race_points)
-            season_points_per_class[rcclass].race_participation[driver].append(not drove_in_neither_class)
-
-            not_rcclass = "4WD" if rcclass == "2WD" else "2WD"
-            season_points_per_class[not_rcclass].points_per_race[driver].append(0)
-            season_points_per_class[not_rcclass].race_participation[driver].append(False)
-
-        for rcclass in ("2WD", "4WD"):
-            drop_race_index = np.argmin(season_points_per_class[rcclass].points_per_race[driver])
-            drop_race_points = season_points_per_class[rcclass].points_per_race[driver][drop_race_index]
-            season_points_per_class[rcclass].drop_race_indices[driver] = int(drop_race_index)
-            season_points_per_class[rcclass].total_points_with_drop_race[driver] -= drop_race_points
-
-    _remove_drivers_with_no_participation(season_points_per_class)
+    return _calculate_season_points_from_cup_points([_calculate_cup_points(raceday) for raceday in racedays],
+                                                    _get_all_participants_over_a_season(racedays),
+                                                    race_locations, rules)
+
+
+def _calculate_season_points_from_cup_points(
+        cup_points_per_raceday: List[Tuple[Dict[rd.Driver, int], Dict[str, Dict[rd.Driver, List[int]]]]],
+        all_participants: Set[rd.Driver], race_locations: List[str],
+        rules: cuppoints.ScoringRules) -> Dict[str, SeasonPoints]:
+    season_points_per_class = {rcclass: SeasonPoints() for rcclass in cuppoints.RCCLASSES}
+    for season_points in season_points_per_class.values():
+        season_points.race_locations = race_locations
+
+    drivers = list(all_participants)
+    if not drivers:
+        return season_points_per_class
+
+    points, participation = _create_season_points_matrix(cup_points_per_raceday, drivers)
+    total_points = points.sum(axis=1)
+    # the races with the least points are dropped, the earliest of races on equal points
+    num_drop_races = min(rules.num_drop_races, points.shape[1])
+    drop_race_indices = np.sort(np.argsort(points, axis=1, kind="stable")[:, :num_drop_races, :], axis=1)
+    drop_race_points = np.take_along_axis(points, drop_race_indices, axis=1).sum(axis=1)
+    total_points_with_drop_race = total_points - drop_race_points
+    participated_in_class = participation.any(axis=1)
+
+    for class_index, rcclass in enumerate(cuppoints.RCCLASSES):
+        season_points = season_points_per_class[rcclass]
+        class_driver_indices = np.flatnonzero(participated_in_class[:, class_index])
+        class_points = points[class_driver_indices, :, class_index].tolist()
+        class_participation = participation[class_driver_indices, :, class_index].tolist()
+        class_totals = total_points[class_driver_indices, class_index].tolist()
+        class_totals_with_drop_race = total_points_with_drop_race[class_driver_indices, class_index].tolist()
+        class_drop_race_indices = drop_race_indices[class_driver_indices, :, class_index].tolist()
+        for i, driver_index in enumerate(class_driver_indices):
+            driver = drivers[driver_index]
+            season_points.total_points[driver] = class_totals[i]
+            season_points.total_points_with_drop_race[driver] = class_totals_with_drop_race[i]
+            season_points.drop_race_indices[driver] = class_drop_race_indices[i]
+            season_points.points_per_race[driver] = class_points[i]
+            season_points.race_participation[driver] = class_participation[i]
+
     return season_points_per_class
 
 
@@ -795,6 +862,257 @@ def get_current_cup_points(date) -> Tuple[Dict[rd.Driver, int], Dict[str, Dict[r
     return _calculate_cup_points(raceday)
 
 
+def show_season_projection(num_remaining_racedays: int) -> None:
+    dates = rd.get_all_dates()
+    if not dates:
+        print("Det finns inga deltävlingar än!")
+        return
+
+    # the season of the latest raceday
+    season = dates[0][:4]
+    season_dates = sorted(date for date in dates if date.startswith(season))
+    racedays = [rd.get_raceday_with_date(date) for date in season_dates]
+    rules = rd.get_season_scoring_rules(int(season))
+    season_points_per_class = calculate_season_points(racedays, season_dates, rules)
+    projections = projection.project_season(season_points_per_class, num_remaining_racedays,
+                                            num_drop_races=rules.num_drop_races)
+
+    text_message = textmessages.create_projection_text_message(projections, season, num_remaining_racedays)
+    clipboard.copy(text_message)
+    print(text_message)
+
+    print("^^ Kopierat till urklipp")
+
+
+def _score_raceday(path: str, rules_definitions: List[Dict]) \
+        -> Tuple[List[int], List[Tuple[Dict[int, int], Dict[str, Dict[int, List[int]]]]]]:
+    """
+    Calculates the cup points of a raceday file with each of the scoring rules, by
+    car number so that they can be sent back from a worker process. Returns the
+    participants and the cup points, as _calculate_cup_points does, of each rule set.
+    """
+    raceday = rd.load_and_deserialize_raceday(path)
+    cup_points = []
+    for definition in rules_definitions:
+        raceday.set_scoring_rules(cuppoints.ScoringRules(definition))
+        race_points, points_per_heat = _calculate_cup_points(raceday)
+        cup_points.append(({driver.number: points for driver, points in race_points.items()},
+                           {rcclass: {driver.number: points for driver, points in class_points.items()}
+                            for rcclass, class_points in points_per_heat.items()}))
+    return [driver.number for driver in raceday.all_participants], cup_points
+
+
+def _cup_points_from_numbers(cup_points: Tuple[Dict[int, int], Dict[str, Dict[int, List[int]]]]) \
+        -> Tuple[Dict[rd.Driver, int], Dict[str, Dict[rd.Driver, List[int]]]]:
+    race_points, points_per_heat = cup_points
+    return ({rd.get_driver(number): points for number, points in race_points.items()},
+            {rcclass: {rd.get_driver(number): points for number, points in class_points.items()}
+             for rcclass, class_points in points_per_heat.items()})
+
+
+def rescore_all_racedays(rules_path: str) -> None:
+    """
+    Calculates the cup points of every raceday with the scoring rules in the file,
+    in parallel, and shows how the standings of each season would change compared
+    to the rules the seasons use now.
+    """
+    with open(rules_path) as f:
+        new_rules = cuppoints.ScoringRules(json.load(f))
+
+    dates = sorted(rd.get_all_dates())
+    filenames = [rd.get_raceday_filename_str_no_ext(date) for date in dates]
+    rules_definitions = [[rd.get_season_scoring_rules(rd.get_season_from_filename(filename)).definition,
+                          new_rules.definition]
+                         for filename in filenames]
+    with ProcessPoolExecutor() as executor:
+        scored_racedays = list(executor.map(_score_raceday,
+                                            [str(rd.get_raceday_path(filename)) for filename in filenames],
+                                            rules_definitions))
+
+    raceday_indices_per_season = defaultdict(list)
+    for i, filename in enumerate(filenames):
+        raceday_indices_per_season[rd.get_season_from_filename(filename)].append(i)
+
+    for season, raceday_indices in raceday_indices_per_season.items():
+        participants = {rd.get_driver(number) for i in raceday_indices for number in scored_racedays[i][0]}
+        race_dates = [dates[i] for i in raceday_indices]
+        old_standings, new_standings = (
+            _calculate_season_points_from_cup_points(
+                [_cup_points_from_numbers(scored_racedays[i][1][rules_index]) for i in raceday_indices],
+                participants, race_dates, rules)
+            for rules_index, rules in enumerate((rd.get_season_scoring_rules(season), new_rules))
+        )
+        print(textmessages.create_standings_diff_text_message(season, old_standings, new_standings))
+        print()
+
+
+def _parse_report_file(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Parses an RCM report in a worker process. Returns what the result is made of,
+    by car number and in milliseconds so that it can be sent back, together with
+    a hash of it. Returns None if it can't be parsed.
+    """
+    parser = htmlparsing.RCMReportTokenizer()
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        parser.parse_data(data.decode("utf-16-le"))
+    except (OSError, UnicodeDecodeError, ValueError, IndexError, AttributeError):
+        return None
+
+    total_times = htmlparsing.get_total_times(parser)
+    num_laps_driven = htmlparsing.get_num_laps_driven(parser)
+    return {
+        "path": path,
+        "race_number": filelocation.get_race_number(os.path.basename(path)),
+        "hash": hashlib.sha1(data).hexdigest(),
+        "positions": htmlparsing.get_positions(total_times, num_laps_driven),
+        "num_laps_driven": num_laps_driven,
+        "total_times": {number: duration.milliseconds for number, duration in total_times.items()},
+        "best_laptimes": [(number, duration.milliseconds)
+                          for number, duration in htmlparsing.get_best_laptimes(parser)],
+        "average_laptimes": [(number, duration.milliseconds)
+                             for number, duration in htmlparsing.get_average_laptimes(total_times, num_laps_driven)],
+        "laptimes": htmlparsing.get_laptimes(parser),
+    }
+
+
+def _match_report(raceday: rd.Raceday, race_participants: List[rd.Driver],
+                  imported_races: Set[Tuple[str, str, str]]) -> Tuple[Optional[Tuple[str, str, str]], Optional[str]]:
+    """
+    Matches a report with a race of any heat of a raceday. Of the races the most
+    participants are in, the first one without a result is chosen, in the order
+    the heats are driven. Returns the (heat, class, group) of the race, or None and
+    why the report couldn't be matched.
+    """
+    matches = []
+    for heat_name in rd.RACE_ORDER:
+        if heat_name not in raceday.start_lists:
+            continue
+        match = raceday.match_race(race_participants, heat_name)
+        if match.heat_name is not None:
+            matches.append(match)
+    if not matches:
+        return None, "ingen av förarna finns i någon startlista"
+
+    num_votes = max(match.num_votes for match in matches)
+    for match in matches:
+        if match.num_votes != num_votes:
+            continue
+        for rcclass, group in [(match.rcclass, match.group)] + match.tied_races:
+            race = (match.heat_name, rcclass, group)
+            if race not in imported_races and not raceday.result_exists(*race):
+                return race, None
+    return None, "racet har redan ett resultat"
+
+
+def import_reports(folder: str, date: Optional[str] = None, max_workers: Optional[int] = None) -> None:
+    """
+    Imports every RCM report in a folder and its subfolders into the racedays they
+    were driven on. The reports don't say when they were driven, and the files of
+    an archive get the date they were copied, so the raceday is either the given
+    date (YYYY-MM-DD) or the date of the closest folder above the report named
+    with one, see get_report_folder_date. The reports are parsed by max_workers
+    processes (one per CPU by default, none if 1), matched with the races of their
+    raceday in the order RCM numbered them, and each raceday is saved once. Reports
+    without a date, that are copies of each other, or that don't match a race
+    without a result, are listed but not imported.
+    """
+    paths = sorted(str(path) for path in Path(folder).rglob("*.html")
+                   if filelocation.get_race_number(path.name) is not None)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1 or len(paths) <= 1:
+        reports = [_parse_report_file(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers) as executor:
+            reports = list(executor.map(_parse_report_file, paths,
+                                        chunksize=max(1, len(paths) // (4 * max_workers))))
+
+    unmatched: List[Tuple[str, str]] = []
+    duplicates: List[Tuple[str, str]] = []
+    paths_by_hash: Dict[str, str] = {}
+    reports_per_raceday: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for path, report in zip(paths, reports):
+        if report is None:
+            unmatched.append((path, "kunde inte läsas"))
+        elif report["hash"] in paths_by_hash:
+            duplicates.append((path, paths_by_hash[report["hash"]]))
+        else:
+            paths_by_hash[report["hash"]] = path
+            report_date = get_report_folder_date(Path(path), Path(folder)) if date is None \
+                else datetime.datetime.strptime(date, "%Y-%m-%d").date()
+            if report_date is None:
+                unmatched.append((path, "inget datum i mappnamnen, ange deltävlingens datum med -a/--date"))
+                continue
+            reports_per_raceday[rd.get_raceday_filename_date(report_date)].append(report)
+
+    num_imported = 0
+    for filename, raceday_reports in sorted(reports_per_raceday.items()):
+        raceday_path = rd.get_raceday_path(filename)
+        if not raceday_path.exists():
+            unmatched.extend((report["path"], f"det finns ingen deltävling {filename}") for report in raceday_reports)
+            continue
+
+        raceday = rd.load_and_deserialize_raceday(raceday_path)
+        imported_races = set()
+        # in the order they were driven, so that the heats fill up in order
+        for report in sorted(raceday_reports, key=lambda r: (r["race_number"], r["path"])):
+            race_participants = rd.number_list_to_driver_list(report["positions"])
+            race, reason = _match_report(raceday, race_participants, imported_races)
+            if race is None:
+                unmatched.append((report["path"], reason))
+                continue
+            _add_report_result(raceday, race, report)
+            imported_races.add(race)
+        if imported_races:
+            raceday.save_as_date(filename)
+            num_imported += len(imported_races)
+
+    print(f"Importerade {num_imported} av {len(paths)} resultat.")
+    if unmatched:
+        print(f"{len(unmatched)} resultat kunde inte importeras:")
+        for path, reason in unmatched:
+            print(f"  {path}: {reason}")
+    if duplicates:
+        print(f"{len(duplicates)} resultat är kopior:")
+        for path, original_path in duplicates:
+            print(f"  {path} (samma som {original_path})")
+
+
+def get_report_folder_date(path: Path, folder: Path) -> Optional[datetime.date]:
+    """
+    Returns the date of the closest folder above a report, up to and including the
+    imported folder, which is named with a date (YYYY-MM-DD, or YYMMDD as the racedays).
+    """
+    for parent in path.parents:
+        for date_format in REPORT_FOLDER_DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(parent.name, date_format).date()
+            except ValueError:
+                continue
+        if parent == folder:
+            break
+    return None
+
+
+def _add_report_result(raceday: rd.Raceday, race: Tuple[str, str, str], report: Dict[str, Any]) -> None:
+    heat_name, rcclass, group = race
+    start_list = raceday.get_start_lists_for_heat(heat_name)[rcclass].get_start_list(group)
+    # the drivers who shouldn't have driven are left out, as when a result is added by hand
+    numbers = {driver.number for driver in start_list}
+    raceday.add_result(
+        heat_name, rcclass, group,
+        [number for number in report["positions"] if number in numbers],
+        {number: laps for number, laps in report["num_laps_driven"].items() if number in numbers},
+        {number: Duration(ms) for number, ms in report["total_times"].items() if number in numbers},
+        [(number, Duration(ms)) for number, ms in report["best_laptimes"] if number in numbers],
+        [(number, Duration(ms)) for number, ms in report["average_laptimes"] if number in numbers],
+        False, list(start_list),
+        rd.LapTimes.from_milliseconds({number: laptimes for number, laptimes in report["laptimes"].items()
+                                       if number in numbers}))
+
+
 def show_start_message():
     raceday = rd.get_raceday()
 
@@ -807,7 +1125,7 @@ def show_start_message():
     heat_start_lists = raceday.get_start_lists_for_heat(heat_name)
 
     text_message = textmessages.create_race_start_message(
-        heat_start_lists, rd.CLASS_ORDER[heat_name], heat_name, rcclass, group, class_order_index)
+        heat_start_lists, raceday.get_class_order(heat_name), heat_name, rcclass, group, class_order_index)
 
     clipboard.copy(text_message)
     print(text_message)
@@ -823,6 +1141,11 @@ def main():
                        help="Start a new race day")
     group.add_argument("-r", "--result", action="store_true",
                        help="Add new result")
+    group.add_argument("-w", "--watch", action="store_true",
+                       help="Keep running and add every new result as soon as it is written to the USB drive")
+    group.add_argument("-t", "--live-result", action="store_true",
+                       help="Follow the result of the latest race while it is being written, and show "
+                            "the provisional positions. Use '-v'/'--verbose' to show every lap.")
     group.add_argument("-n", "--next-round", action="store_true",
                        help="Start the next round")
     group.add_argument("-d", "--show-result", action="store_true",
@@ -834,6 +1157,18 @@ def main():
                        help="Show the current points.")
     group.add_argument("-g", "--start-message", action="store_true",
                        help="Show the current race to be started.")
+    group.add_argument("-j", "--projection", type=int, metavar="REMAINING_RACEDAYS",
+                       help="Simulate the rest of the season with this many racedays left, "
+                            "and show each driver's chance to win the cup.")
+    group.add_argument("-c", "--rescore", metavar="RULES_FILE",
+                       help="Calculate the points of all racedays with the scoring rules in this json file, "
+                            "and show how the standings of each season would change.")
+    group.add_argument("-i", "--import-reports", metavar="FOLDER",
+                       help="Import all RCM reports in this folder and its subfolders into the racedays "
+                            "they were driven on, and list the reports that couldn't be imported.")
+    group.add_argument("-b", "--build-database", action="store_true",
+                       help="Import all raceday files into the raceday database, "
+                            "replacing the racedays already in it.")
 
     parser.add_argument("-m", "--manual", action="store_true",
                         help="Add a result manually")
@@ -841,10 +1176,15 @@ def main():
                         help="Select a result manually")
     parser.add_argument("-v", "--verbose", action="store_true",
                         help="Show points from all heats")
+    parser.add_argument("-a", "--date",
+                        help="The date (YYYY-MM-DD) of the raceday to import the reports of '-i'/'--import-reports' "
+                             "into, instead of the dates their folders are named with.")
     parser.add_argument("-e", "--exclude", nargs="+", type=int,
                         help="Exclude these drivers from the result and give them 0 points.")
 
     args = parser.parse_args()
+    # the racedays saved from the command line keep the leaderboard up to date
+    rd.add_save_listener(leaderboard.update_raceday)
 
     if args.new_race_day:
         create_qualifiers()
@@ -852,6 +1192,10 @@ def main():
         add_new_result(args.exclude)
     elif args.result and args.manual:
         add_new_result_manually()
+    elif args.watch:
+        watch_results()
+    elif args.live_result:
+        follow_live_result(args.verbose)
     elif args.next_round:
         start_new_race_round()
     elif args.show_result:
@@ -862,6 +1206,15 @@ def main():
         show_current_points(args.verbose)
     elif args.start_message:
         show_start_message()
+    elif args.projection is not None:
+        show_season_projection(args.projection)
+    elif args.rescore:
+        rescore_all_racedays(args.rescore)
+    elif args.import_reports:
+        import_reports(args.import_reports, args.date)
+    elif args.build_database:
+        imported = rd.import_archive_into_store()
+        print(f"Importerade {len(imported)} deltävlingar till {rd.get_store_path()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+"""
+SQLite store of racedays, with the start lists, results and per-driver result
+rows in normalised, indexed tables, made from the raceday files by
+raceday.import_archive_into_store. The store is an export of the archive for
+queries spanning many racedays, such as the history of a driver. It isn't
+updated when a raceday is saved, so import the archive again to refresh it.
+
+Like compactformat, the store works on the json dictionaries of the racedays,
+use raceday.get_raceday_from_store to get a Raceday from it.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+
+try:
+    from server.racelogic.duration import Duration
+    from server.racelogic import laptimes
+except ImportError:
+    from duration import Duration
+    import laptimes
+
+import sqlite3
+
+DATABASE_FILENAME = "racedays.sqlite"
+
+BEST_LAPTIMES_KIND = "best"
+AVERAGE_LAPTIMES_KIND = "average"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS racedays (
+    filename TEXT PRIMARY KEY,
+    date TEXT,
+    current_heat INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS participants (
+    filename TEXT NOT NULL REFERENCES racedays(filename) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    driver INTEGER NOT NULL,
+    PRIMARY KEY (filename, ordinal)
+);
+CREATE TABLE IF NOT EXISTS start_lists (
+    filename TEXT NOT NULL REFERENCES racedays(filename) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    heat TEXT NOT NULL,
+    rcclass TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    driver INTEGER NOT NULL,
+    PRIMARY KEY (filename, heat, rcclass, grp, slot)
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL REFERENCES racedays(filename) ON DELETE CASCADE,
+    date TEXT,
+    ordinal INTEGER NOT NULL,
+    heat TEXT NOT NULL,
+    rcclass TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    manual INTEGER NOT NULL,
+    UNIQUE (filename, heat, rcclass, grp)
+);
+CREATE TABLE IF NOT EXISTS result_drivers (
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    driver INTEGER NOT NULL,
+    position INTEGER,
+    num_laps INTEGER,
+    num_laps_ordinal INTEGER,
+    total_time_ms INTEGER,
+    total_time_ordinal INTEGER,
+    dns INTEGER NOT NULL,
+    dns_ordinal INTEGER,
+    PRIMARY KEY (result_id, driver)
+);
+CREATE TABLE IF NOT EXISTS result_laptimes (
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    driver INTEGER NOT NULL,
+    milliseconds INTEGER NOT NULL,
+    PRIMARY KEY (result_id, kind, ordinal)
+);
+CREATE TABLE IF NOT EXISTS result_laps (
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    driver INTEGER NOT NULL,
+    laptimes BLOB NOT NULL,
+    PRIMARY KEY (result_id, ordinal)
+);
+CREATE INDEX IF NOT EXISTS racedays_by_date ON racedays(date);
+CREATE INDEX IF NOT EXISTS results_by_race ON results(date, heat, rcclass, grp);
+CREATE INDEX IF NOT EXISTS result_drivers_by_driver ON result_drivers(driver);
+CREATE INDEX IF NOT EXISTS result_laptimes_by_driver ON result_laptimes(driver, kind);
+CREATE INDEX IF NOT EXISTS start_lists_by_driver ON start_lists(driver);
+"""
+
+
+class RacedayStore:
+
+    def __init__(self, path: Path):
+        self.path: Path = Path(path)
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def save_json_raceday(self, filename_no_ext: str, date: Optional[str], json_raceday: Dict) -> None:
+        """
+        Stores the raceday (as the json dictionary, with durations as either Durations
+        or {"milliseconds": ...} dictionaries), replacing any raceday with that filename.
+        """
+        with self._connection:
+            self._connection.execute("DELETE FROM racedays WHERE filename = ?", (filename_no_ext,))
+            self._connection.execute(
+                "INSERT INTO racedays (filename, date, current_heat) VALUES (?, ?, ?)",
+                (filename_no_ext, date, json_raceday["current_heat"]))
+            self._connection.executemany(
+                "INSERT INTO participants (filename, ordinal, driver) VALUES (?, ?, ?)",
+                [(filename_no_ext, i, num) for i, num in enumerate(json_raceday["all_participants"])])
+            self._connection.executemany(
+                "INSERT INTO start_lists (filename, ordinal, heat, rcclass, grp, slot, driver) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(filename_no_ext, ordinal, heat_name, rcclass, group, slot, num)
+                 for ordinal, (heat_name, rcclass, group, start_list)
+                 in enumerate(_iterate_nested(json_raceday["start_lists"]))
+                 for slot, num in enumerate(start_list)])
+            for ordinal, (heat_name, rcclass, group, result) in \
+                    enumerate(_iterate_nested(json_raceday["results"])):
+                cursor = self._connection.execute(
+                    "INSERT INTO results (filename, date, ordinal, heat, rcclass, grp, manual) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (filename_no_ext, date, ordinal, heat_name, rcclass, group, int(result["manual"])))
+                self._connection.executemany(
+                    "INSERT INTO result_drivers (result_id, driver, position, num_laps, num_laps_ordinal, "
+                    "total_time_ms, total_time_ordinal, dns, dns_ordinal) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    _get_result_driver_rows(cursor.lastrowid, result))
+                self._connection.executemany(
+                    "INSERT INTO result_laptimes (result_id, kind, ordinal, driver, milliseconds) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, kind, ordinal, num, _to_milliseconds(time))
+                     for kind, key in ((BEST_LAPTIMES_KIND, "best_laptimes"),
+                                       (AVERAGE_LAPTIMES_KIND, "average_laptimes"))
+                     for ordinal, (num, time) in enumerate(result[key])])
+                # every lap time of a driver is stored delta encoded in a single blob
+                self._connection.executemany(
+                    "INSERT INTO result_laps (result_id, ordinal, driver, laptimes) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, ordinal, int(num), laptimes.to_bytes(encoded))
+                     for ordinal, (num, encoded) in enumerate(result.get("laptimes", {}).items())])
+
+    def delete_raceday(self, filename_no_ext: str) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM racedays WHERE filename = ?", (filename_no_ext,))
+
+    def has_raceday(self, filename_no_ext: str) -> bool:
+        return self._connection.execute(
+            "SELECT 1 FROM racedays WHERE filename = ?", (filename_no_ext,)).fetchone() is not None
+
+    def get_filenames(self) -> List[str]:
+        return [filename for filename, in
+                self._connection.execute("SELECT filename FROM racedays ORDER BY date, filename")]
+
+    def load_json_raceday(self, filename_no_ext: str) -> Dict:
+        """
+        Returns the raceday with the filename as the same dictionary as the json
+        files contain, with the durations as Duration objects.
+        Raises a KeyError if the raceday isn't in the store.
+        """
+        raceday_row = self._connection.execute(
+            "SELECT current_heat FROM racedays WHERE filename = ?", (filename_no_ext,)).fetchone()
+        if raceday_row is None:
+            raise KeyError(filename_no_ext)
+
+        all_participants = [num for num, in self._connection.execute(
+            "SELECT driver FROM participants WHERE filename = ? ORDER BY ordinal", (filename_no_ext,))]
+
+        start_lists = {}
+        for heat_name, rcclass, group, num in self._connection.execute(
+                "SELECT heat, rcclass, grp, driver FROM start_lists WHERE filename = ? ORDER BY ordinal, slot",
+                (filename_no_ext,)):
+            start_lists.setdefault(heat_name, {}).setdefault(rcclass, {}).setdefault(group, []).append(num)
+
+        results = {}
+        result_rows = self._connection.execute(
+            "SELECT id, heat, rcclass, grp, manual FROM results WHERE filename = ? ORDER BY ordinal",
+            (filename_no_ext,)).fetchall()
+        for result_id, heat_name, rcclass, group, manual in result_rows:
+            driver_rows = self._connection.execute(
+                "SELECT driver, position, num_laps, num_laps_ordinal, total_time_ms, total_time_ordinal, "
+                "dns, dns_ordinal FROM result_drivers WHERE result_id = ?", (result_id,)).fetchall()
+            best_and_average_laptimes = {BEST_LAPTIMES_KIND: [], AVERAGE_LAPTIMES_KIND: []}
+            for kind, num, milliseconds in self._connection.execute(
+                    "SELECT kind, driver, milliseconds FROM result_laptimes WHERE result_id = ? "
+                    "ORDER BY kind, ordinal", (result_id,)):
+                best_and_average_laptimes[kind].append([num, Duration(milliseconds)])
+            result = _get_json_result(driver_rows, best_and_average_laptimes, bool(manual))
+            encoded_laptimes = {num: encoded for num, encoded in self._connection.execute(
+                "SELECT driver, laptimes FROM result_laps WHERE result_id = ? ORDER BY ordinal", (result_id,))}
+            if encoded_laptimes:
+                result["laptimes"] = encoded_laptimes
+            results.setdefault(heat_name, {}).setdefault(rcclass, {})[group] = result
+
+        return {
+            "all_participants": all_participants,
+            "start_lists": start_lists,
+            "results": results,
+            "current_heat": raceday_row[0],
+        }
+
+
+def _iterate_nested(heats: Dict[str, Dict[str, Dict[str, Any]]]):
+    for heat_name, classes in heats.items():
+        for rcclass, groups in classes.items():
+            for group, value in groups.items():
+                yield heat_name, rcclass, group, value
+
+
+def _to_milliseconds(duration: Any) -> int:
+    return duration["milliseconds"] if isinstance(duration, dict) else duration.milliseconds
+
+
+def _get_result_driver_rows(result_id: int, result: Dict) -> List[Tuple]:
+    rows: Dict[int, List] = {}
+
+    def row(num: Any) -> List:
+        num = int(num)
+        if num not in rows:
+            # driver, position, laps, laps ordinal, total, total ordinal, dns, dns ordinal
+            rows[num] = [num, None, None, None, None, None, 0, None]
+        return rows[num]
+
+    for position, num in enumerate(result["positions"]):
+        row(num)[1] = position
+    for ordinal, (num, laps) in enumerate(result["num_laps_driven"].items()):
+        row(num)[2:4] = [laps, ordinal]
+    for ordinal, (num, time) in enumerate(result["total_times"].items()):
+        row(num)[4:6] = [_to_milliseconds(time), ordinal]
+    for ordinal, num in enumerate(result.get("dns", [])):
+        row(num)[6:8] = [1, ordinal]
+
+    return [(result_id, *values) for values in rows.values()]
+
+
+def _get_json_result(driver_rows: List[Tuple], laptimes: Dict[str, List], manual: bool) -> Dict:
+    def ordered(value_index: int, ordinal_index: int) -> List[Tuple[int, Any]]:
+        present = [r for r in driver_rows if r[ordinal_index] is not None]
+        return [(r[0], r[value_index]) for r in sorted(present, key=lambda r: r[ordinal_index])]
+
+    result = {
+        "positions": [num for num, _ in ordered(0, 1)],
+        "num_laps_driven": dict(ordered(2, 3)),
+        "total_times": {num: Duration(ms) for num, ms in ordered(4, 5)},
+        "best_laptimes": laptimes[BEST_LAPTIMES_KIND],
+        "average_laptimes": laptimes[AVERAGE_LAPTIMES_KIND],
+        "manual": manual,
+    }
+    dns = [num for num, _ in ordered(0, 7)]
+    if dns:
+        result["dns"] = dns
+    return result
@@ -1,29 +1,50 @@
 from pyfakefs.fake_filesystem_unittest import TestCase
 from pathlib import Path
 import unittest
+import unittest.mock as mock
+import contextlib
+import copy
+import datetime
 import json
+import io
+import pickle
+import threading
+import time
 
 import server.racelogic.constants
 import server.racelogic.raceday as rd
+import server.racelogic.compactformat as compactformat
+import server.racelogic.cuppoints as cuppoints
+import server.racelogic.sqlitestore as sqlitestore
+import server.racelogic.leaderboard as leaderboard
+import server.racelogic.resultcalculation as resultcalculation
+from server.racelogic.duration import Duration
 import os
 
 
 TEST_DATABASE_PATH = Path(__file__).parent / "testdata" / "testdatabases"
+TEST_REPORTS_PATH = Path(__file__).parent / "testdata"
 
 
 class DBTests(TestCase):
 
     test_racedays = None
+    test_raceday_contents = None
+    test_reports = None
 
     @classmethod
     def setUpClass(cls):
         cls.test_racedays = {}
+        cls.test_raceday_contents = {}
+        cls.test_reports = {name: (TEST_REPORTS_PATH / f"{name}.html").read_bytes()
+                            for name in ("normal", "dns", "corrupt")}
         raceday_files = os.listdir(TEST_DATABASE_PATH)
         for raceday_name in raceday_files:
             path = os.path.join(TEST_DATABASE_PATH, raceday_name)
             name = raceday_name.split(".json")[0]
             with open(path) as f:
-                cls.test_racedays[name] = rd._replace_with_durations(json.load(f))
+                cls.test_raceday_contents[name] = f.read()
+            cls.test_racedays[name] = rd._replace_with_durations(json.loads(cls.test_raceday_contents[name]))
 
     def setUp(self):
         self.setUpPyfakefs(modules_to_reload=[rd, server.racelogic.constants])
@@ -42,3 +63,496 @@ class DBTests(TestCase):
 
                 self.assertDictEqual(rd._replace_with_durations(test_raceday_json), saved_raceday,
                                      "Saved raceday differs from loaded!")
+
+    def test_decode_raceday(self):
+        for raceday_name, test_raceday_json in self.test_racedays.items():
+            with self.subTest(raceday_name):
+                raceday = rd.Raceday(rd._replace_with_durations(test_raceday_json))
+                decoded_raceday = rd.decode_raceday(io.StringIO(self.test_raceday_contents[raceday_name]))
+
+                self.assertDictEqual(raceday.get_start_lists_dict(), decoded_raceday.get_start_lists_dict())
+                self.assertDictEqual(raceday.get_results_dict(convert_from_durations=False),
+                                     decoded_raceday.get_results_dict(convert_from_durations=False),
+                                     "Decoded raceday differs from loaded!")
+                self.assertListEqual(raceday.all_participants, decoded_raceday.all_participants)
+                self.assertEqual(raceday.current_heat, decoded_raceday.current_heat)
+
+    def test_decode_raceday_in_object_hook(self):
+        contents = self.test_raceday_contents["test_raceday1"]
+        raceday = json.loads(contents, object_hook=rd._decode_json_object)
+        self.assertIsInstance(raceday, rd.Raceday)
+        for heat_name, heat_start_lists in raceday.start_lists.items():
+            for rcclass, start_lists in heat_start_lists.items():
+                self.assertEqual((heat_name, rcclass), (start_lists.heat_name, start_lists.rcclass))
+        for heat_name, heat_results in raceday.results.items():
+            for rcclass, class_results in heat_results.items():
+                self.assertIsInstance(class_results, rd.LazyGroupResults)
+                for group, result in class_results.items():
+                    self.assertEqual((heat_name, rcclass, group), (result.heat_name, result.rcclass, result.group))
+
+    def test_driver(self):
+        driver = rd.get_driver(90)
+        self.assertIs(driver, rd.Driver(90))
+        self.assertIs(driver, copy.copy(driver))
+        self.assertIs(driver, copy.deepcopy(driver))
+        self.assertIs(driver, copy.deepcopy({"2WD": [driver]})["2WD"][0])
+        self.assertIs(driver, pickle.loads(pickle.dumps(driver)))
+        self.assertIsNot(driver, rd.get_driver(89))
+
+        with self.assertRaises(AttributeError):
+            driver.number = 89
+        with self.assertRaises(AttributeError):
+            del driver.number
+        with self.assertRaises(AttributeError):
+            driver.name = "malcx"
+        with self.assertRaises(AttributeError):
+            driver.points = 40
+        self.assertEqual(90, driver.number)
+
+    def test_compact_format_roundtrip(self):
+        for raceday_name, contents in self.test_raceday_contents.items():
+            with self.subTest(raceday_name):
+                json_path = rd.RESULT_FOLDER_PATH / (raceday_name + ".json")
+                json_path.write_text(contents)
+                expected_raceday = rd.get_raceday_with_filename(raceday_name)
+
+                compact_path = compactformat.convert_json_file_to_compact(json_path)
+                self.assertFalse(json_path.exists())
+                self.assertEqual(rd.get_raceday_path(raceday_name), compact_path)
+
+                raceday = rd.get_raceday_with_filename(raceday_name)
+                self.assertDictEqual(expected_raceday._get_serializeable_raceday(),
+                                     raceday._get_serializeable_raceday(),
+                                     "Compact raceday differs from json!")
+
+                raceday.copy().save_as_date(raceday_name)
+                self.assertFalse(json_path.exists(), "Compact raceday was saved as json!")
+
+                compactformat.convert_compact_file_to_json(compact_path)
+                self.assertDictEqual(json.loads(contents), json.loads(json_path.read_text()),
+                                     "Converting back to json was not lossless!")
+
+    def _add_qualifier_result(self, raceday, rcclass, group):
+        start_list = raceday.get_start_lists_for_heat(rd.QUALIFIERS_NAME)[rcclass].get_start_list(group)
+        numbers = [d.number for d in start_list]
+        raceday.add_result(rd.QUALIFIERS_NAME, rcclass, group,
+                           numbers[:-1],
+                           {num: 10 for num in numbers[:-1]},
+                           {num: Duration(minutes=5, milliseconds=i) for i, num in enumerate(numbers[:-1])},
+                           [(num, Duration(seconds=30, milliseconds=i)) for i, num in enumerate(numbers[:-1])],
+                           [(num, Duration(seconds=30, milliseconds=i)) for i, num in enumerate(numbers[:-1])],
+                           False, start_list)
+
+    def test_journal(self):
+        raceday = rd.create_empty_raceday()
+        raceday.set_all_participants([90, 22, 37, 11, 45, 77])
+        raceday.set_first_qualifiers({"2WD": {"A": [90, 22, 37]}, "4WD": {"A": [11, 45, 77]}})
+        raceday.save_as_date("230101")
+        snapshot_path = rd.get_raceday_path("230101")
+        journal_path = rd.RESULT_FOLDER_PATH / "230101.journal"
+        snapshot = snapshot_path.read_bytes()
+
+        raceday = rd.load_and_deserialize_raceday(snapshot_path)
+        self._add_qualifier_result(raceday, "2WD", "A")
+        raceday.save_as_date("230101")
+        self._add_qualifier_result(raceday, "4WD", "A")
+        raceday.save_as_date("230101")
+        expected = raceday._get_serializeable_raceday()
+
+        self.assertEqual(snapshot, snapshot_path.read_bytes(), "Snapshot was rewritten!")
+        self.assertTrue(journal_path.exists(), "No journal was written!")
+        self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday(),
+                             "Replaying the journal gave a different raceday!")
+
+        with open(journal_path, "a") as f:
+            f.write('{"op": "result", "heat_na')
+        self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday(),
+                             "A cut off journal record was not skipped!")
+
+        raceday = rd.load_and_deserialize_raceday(snapshot_path)
+        raceday.set_all_participants([90, 22, 37, 11, 45, 77, 88])
+        raceday.save_as_date("230101")
+        expected = raceday._get_serializeable_raceday()
+        self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday(),
+                             "A record saved after a cut off record was lost!")
+        self.assertNotIn("heat_na\n", journal_path.read_text(), "The cut off record was left in the journal!")
+
+        journal = journal_path.read_text()
+        journal_lines = journal.splitlines()
+        journal_lines.insert(2, '{"op": "result", "heat_na')
+        journal_path.write_text("\n".join(journal_lines) + "\n")
+        self.assertRaises(ValueError, rd.get_raceday_with_filename, "230101")
+        journal_path.write_text(journal)
+
+        raceday = rd.load_and_deserialize_raceday(snapshot_path)
+        raceday._write_raceday("230101.json")
+        self.assertFalse(journal_path.exists(), "Journal was not removed after a snapshot!")
+        self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday())
+
+    def test_journal_not_matching_snapshot(self):
+        raceday = rd.create_empty_raceday()
+        raceday.set_all_participants([90, 22, 37, 11, 45, 77])
+        raceday.set_first_qualifiers({"2WD": {"A": [90, 22, 37]}, "4WD": {"A": [11, 45, 77]}})
+        raceday.save_as_date("230101")
+        snapshot_path = rd.get_raceday_path("230101")
+        journal_path = rd.RESULT_FOLDER_PATH / "230101.journal"
+
+        raceday = rd.load_and_deserialize_raceday(snapshot_path)
+        self._add_qualifier_result(raceday, "2WD", "A")
+        raceday.save_as_date("230101")
+        # a crash after the new snapshot was written, but before the old journal was removed
+        stale_journal = journal_path.read_bytes()
+        raceday._write_raceday("230101.json")
+        journal_path.write_bytes(stale_journal)
+
+        raceday = rd.load_and_deserialize_raceday(snapshot_path)
+        self._add_qualifier_result(raceday, "4WD", "A")
+        raceday.save_as_date("230101")
+        expected = raceday._get_serializeable_raceday()
+        self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday(),
+                             "A result saved after a crash was lost!")
+
+        # the 4WD result is removed by hand, while an old journal is still around
+        json_raceday = json.loads(snapshot_path.read_text())
+        del json_raceday[rd.RESULTS_KEY][rd.QUALIFIERS_NAME]["4WD"]["A"]
+        snapshot_path.write_text(json.dumps(json_raceday))
+        journal_path.write_bytes(stale_journal)
+        raceday = rd.load_and_deserialize_raceday(snapshot_path)
+        self._add_qualifier_result(raceday, "4WD", "A")
+        raceday.save_as_date("230101")
+        self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday(),
+                             "A result saved after a hand edit was lost!")
+
+    def test_convert_with_journal(self):
+        raceday = rd.create_empty_raceday()
+        raceday.set_all_participants([90, 22, 37, 11, 45, 77])
+        raceday.set_first_qualifiers({"2WD": {"A": [90, 22, 37]}, "4WD": {"A": [11, 45, 77]}})
+        raceday.save_as_date("230101")
+        journal_path = rd.RESULT_FOLDER_PATH / "230101.journal"
+
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+        self._add_qualifier_result(raceday, "2WD", "A")
+        raceday.save_as_date("230101")
+        expected = raceday._get_serializeable_raceday()
+
+        for convert in (compactformat.convert_json_file_to_compact, compactformat.convert_compact_file_to_json):
+            with self.subTest(convert.__name__):
+                convert(rd.get_raceday_path("230101"))
+                self.assertFalse(journal_path.exists(), "The journal was not removed!")
+                self.assertDictEqual(expected, rd.get_raceday_with_filename("230101")._get_serializeable_raceday(),
+                                     "The journaled result was lost!")
+                raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+                self._add_qualifier_result(raceday, "4WD", "A")
+                raceday.save_as_date("230101")
+                expected = raceday._get_serializeable_raceday()
+
+    def test_save_listeners(self):
+        saved = []
+        rd.add_save_listener(lambda filename, raceday: saved.append(filename))
+        raceday = rd.create_empty_raceday()
+        raceday.set_all_participants([90, 22, 37, 11, 45, 77])
+        raceday.set_first_qualifiers({"2WD": {"A": [90, 22, 37]}, "4WD": {"A": [11, 45, 77]}})
+        raceday.save_as_date("230101")
+        self.assertListEqual(["230101"], saved, "The listeners were not called when the snapshot was written!")
+
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+        self._add_qualifier_result(raceday, "2WD", "A")
+        raceday.save_as_date("230101")
+        self.assertListEqual(["230101"], saved, "The listeners were called before the round was completed!")
+        self._add_qualifier_result(raceday, "4WD", "A")
+        raceday.save_as_date("230101")
+        self.assertListEqual(["230101"] * 2, saved, "The listeners were not called when the round was completed!")
+        self._add_qualifier_result(raceday, "4WD", "A")
+        raceday.save_as_date("230101")
+        self.assertListEqual(["230101"] * 3, saved, "The listeners were not called when a completed round changed!")
+
+    def test_convert_failing_write(self):
+        rd.create_empty_raceday().save_as_date("230101")
+        json_path = rd.get_raceday_path("230101")
+        contents = json_path.read_bytes()
+        # such as when the disk is full
+        with mock.patch.object(rd.os, "fsync", side_effect=OSError("No space left on device")):
+            self.assertRaises(OSError, compactformat.convert_json_file_to_compact, json_path)
+        self.assertEqual(contents, json_path.read_bytes(), "The raceday was lost!")
+        self.assertFalse(json_path.with_suffix(compactformat.COMPACT_EXTENSION).exists(),
+                         "A partly written compact file was left!")
+
+        compact_path = compactformat.convert_json_file_to_compact(json_path)
+        contents = compact_path.read_bytes()
+        with mock.patch.object(rd.os, "fsync", side_effect=OSError("No space left on device")):
+            self.assertRaises(OSError, compactformat.convert_compact_file_to_json, compact_path)
+        self.assertEqual(contents, compact_path.read_bytes(), "The raceday was lost!")
+        self.assertFalse(json_path.exists(), "A partly written json file was left!")
+
+    def test_journal_compaction(self):
+        raceday = rd.create_empty_raceday()
+        raceday.save_as_date("230101")
+        journal_path = rd.RESULT_FOLDER_PATH / "230101.journal"
+
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+        for i in range(rd.JOURNAL_COMPACTION_LIMIT):
+            raceday.set_all_participants([i])
+            raceday.save_as_date("230101")
+            self.assertEqual(journal_path.exists(), i < rd.JOURNAL_COMPACTION_LIMIT - 1)
+
+        raceday = rd.get_raceday_with_filename("230101")
+        self.assertListEqual([rd.Driver(rd.JOURNAL_COMPACTION_LIMIT - 1)], raceday.all_participants)
+
+    def test_raceday_cache(self):
+        rd._raceday_cache.clear()
+        raceday = rd.create_empty_raceday()
+        raceday.save_as_date("230101")
+
+        first = rd.get_raceday_with_filename("230101")
+        self.assertIs(first, rd.get_raceday_with_date("2023-01-01"), "Raceday was not cached!")
+        self.assertDictEqual({"hits": 1, "misses": 1, "size": 1}, rd.get_raceday_cache_stats())
+
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+        raceday.set_all_participants([90])
+        raceday.save_as_date("230101")
+
+        second = rd.get_raceday_with_filename("230101")
+        self.assertIsNot(first, second, "Raceday was not reloaded after it was saved!")
+        self.assertListEqual([rd.Driver(90)], second.all_participants)
+        self.assertDictEqual({"hits": 1, "misses": 2, "size": 1}, rd.get_raceday_cache_stats())
+
+        self.assertRaises(AttributeError, second.set_all_participants, [90, 22])
+        self.assertRaises(AttributeError, second.set_scoring_rules, cuppoints.ScoringRules({"num_drop_races": 0}))
+        changed = second.copy()
+        changed.set_all_participants([90, 22])
+        self.assertListEqual([rd.Driver(90)], rd.get_raceday_with_filename("230101").all_participants,
+                             "Changing a copy changed the cached raceday!")
+
+        with open(rd.RESULT_FOLDER_PATH / rd.SCORING_RULES_FILENAME, "w") as f:
+            json.dump({"2023": {"finals_multiplier": 1}}, f)
+        third = rd.get_raceday_with_filename("230101")
+        self.assertIsNot(second, third, "Raceday was not reloaded after the scoring rules changed!")
+        self.assertIs(second.scoring_rules, cuppoints.DEFAULT_RULES, "The cached raceday was changed!")
+        self.assertEqual(1, third.scoring_rules.definition["finals_multiplier"])
+
+    def test_store_roundtrip(self):
+        with sqlitestore.RacedayStore(Path(":memory:")) as store:
+            for name, contents in self.test_raceday_contents.items():
+                store.save_json_raceday(name, None, json.loads(contents))
+            for name, contents in self.test_raceday_contents.items():
+                expected = rd.decode_raceday(io.StringIO(contents))
+                actual = rd.Raceday(store.load_json_raceday(name))
+                self.assertDictEqual(expected._get_serializeable_raceday(), actual._get_serializeable_raceday(),
+                                     f"Store roundtrip failed for {name}!")
+
+            self.assertListEqual(sorted(self.test_raceday_contents), sorted(store.get_filenames()))
+            store.delete_raceday(name)
+            self.assertFalse(store.has_raceday(name))
+            self.assertRaises(KeyError, store.load_json_raceday, name)
+
+    def test_lazy_results(self):
+        for name, contents in self.test_raceday_contents.items():
+            raceday = rd.decode_raceday(io.StringIO(contents))
+            class_results = raceday.results[rd.QUALIFIERS_NAME]["4WD"]
+            self.assertFalse(any(class_results.is_hydrated(group) for group in class_results),
+                             "Results were parsed before they were used!")
+
+            result = raceday.get_result(rd.QUALIFIERS_NAME, "4WD", "A")
+            self.assertIsInstance(result, rd.RaceResult)
+            self.assertEqual("A", result.group)
+            self.assertIs(result, class_results["A"])
+            self.assertFalse(class_results.is_hydrated("B"))
+
+    def test_laptimes(self):
+        laptimes = {90: [15321, 12004, 11873, 11990], 22: [16002, 12510], 37: []}
+        raceday = rd.create_empty_raceday()
+        raceday.set_all_participants([90, 22, 37])
+        raceday.set_first_qualifiers({"2WD": {"A": [90, 22, 37]}})
+        raceday.save_as_date("230101")
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+        raceday.add_result(rd.QUALIFIERS_NAME, "2WD", "A", [90, 22, 37],
+                           {90: 3, 22: 1, 37: 0},
+                           {90: Duration(51188), 22: Duration(28512), 37: Duration(0)},
+                           [(90, Duration(11873)), (22, Duration(12510))],
+                           [(90, Duration(17062)), (22, Duration(28512))],
+                           False, rd.number_list_to_driver_list([90, 22, 37]),
+                           rd.LapTimes.from_milliseconds(laptimes))
+        raceday.save_as_date("230101")
+
+        def assert_laptimes(raceday, source):
+            result = raceday.get_result(rd.QUALIFIERS_NAME, "2WD", "A")
+            self.assertTrue(result.has_laptimes(), f"Lap times were lost in the {source}!")
+            for number, expected in laptimes.items():
+                self.assertListEqual(expected, result.get_laptimes(rd.Driver(number)).tolist(), source)
+            self.assertIsNone(result.get_laptimes(rd.Driver(11)))
+
+        assert_laptimes(rd.get_raceday_with_filename("230101"), "journal")
+        raceday._write_raceday("230101.json")
+        lazy_raceday = rd.get_raceday_with_filename("230101")
+        result = lazy_raceday.get_result(rd.QUALIFIERS_NAME, "2WD", "A")
+        self.assertFalse(result.laptimes.is_decoded(90), "Lap times were decoded before they were used!")
+        assert_laptimes(lazy_raceday, "json")
+        with sqlitestore.RacedayStore(Path(":memory:")) as store:
+            store.save_json_raceday("230101", None, raceday._get_serializeable_raceday())
+            assert_laptimes(rd.Raceday(store.load_json_raceday("230101")), "store")
+        compactformat.convert_json_file_to_compact(rd.get_raceday_path("230101"))
+        assert_laptimes(rd.get_raceday_with_filename("230101"), "compact format")
+
+        self.assertRaises(ValueError, rd.LapTimes.from_milliseconds, {90: [0, 2 ** 31]})
+
+    def test_import_reports(self):
+        raceday = rd.create_empty_raceday()
+        raceday.set_all_participants([37, 88, 22, 41, 27, 71, 11, 21, 45, 77, 82, 90])
+        raceday.set_first_qualifiers({"2WD": {"A": [37, 88, 22, 41, 27, 71]},
+                                      "4WD": {"A": [11, 21, 45, 77, 82, 90]}})
+        raceday.save_as_date("230101")
+
+        # the files get the date they are copied, so the raceday comes from the folder names
+        reports = [
+            ("reports/230101/1.html", self.test_reports["normal"]),
+            ("reports/230101/2.html", self.test_reports["corrupt"]),
+            # 2WD A already has the result of the first report
+            ("reports/230101/3.html", self.test_reports["dns"]),
+            ("reports/230101/copy/1.html", self.test_reports["normal"]),
+            # there is no raceday on this date
+            ("reports/2023-01-02/4.html", self.test_reports["dns"] + "\n".encode("utf-16-le")),
+            ("reports/undated/5.html", self.test_reports["dns"] + "\n\n".encode("utf-16-le")),
+            ("reports/230101/notes.html", self.test_reports["normal"]),
+        ]
+        for path, contents in reports:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_bytes(contents)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            resultcalculation.import_reports("reports", max_workers=1)
+        output = output.getvalue()
+
+        raceday = rd.get_raceday_with_filename("230101")
+        result_2wd = raceday.get_result(rd.QUALIFIERS_NAME, "2WD", "A")
+        result_4wd = raceday.get_result(rd.QUALIFIERS_NAME, "4WD", "A")
+        self.assertListEqual([37, 88, 22, 41, 27, 71], [driver.number for driver in result_2wd.positions])
+        self.assertListEqual([11, 82, 21, 90, 45, 77], [driver.number for driver in result_4wd.positions])
+        self.assertTrue(result_2wd.has_laptimes(), "The lap times weren't imported!")
+        laptimes_37 = result_2wd.get_laptimes(rd.Driver(37))
+        # the time to the first passing comes before the laps
+        self.assertEqual(34, len(laptimes_37))
+        self.assertEqual(result_2wd.best_laptimes_dict()[rd.Driver(37)].milliseconds, min(laptimes_37[1:]))
+
+        self.assertIn("Importerade 2 av 6 resultat.", output)
+        self.assertIn(f"{os.path.join('reports', '230101', '3.html')}: racet har redan ett resultat", output)
+        self.assertIn(f"{os.path.join('reports', '2023-01-02', '4.html')}: det finns ingen deltävling 230102",
+                      output)
+        self.assertIn(f"{os.path.join('reports', 'undated', '5.html')}: inget datum i mappnamnen", output)
+        self.assertIn(f"{os.path.join('reports', '230101', 'copy', '1.html')} "
+                      f"(samma som {os.path.join('reports', '230101', '1.html')})", output)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            resultcalculation.import_reports(os.path.join("reports", "undated"), "2023-01-01", max_workers=1)
+        self.assertIn(f"{os.path.join('reports', 'undated', '5.html')}: racet har redan ett resultat",
+                      output.getvalue(), "The report was not imported into the given raceday!")
+
+    def test_add_result_before_finals_results(self):
+        json_raceday = rd._replace_with_durations(json.loads(self.test_raceday_contents["test_raceday1"]))
+        del json_raceday[rd.RESULTS_KEY][rd.FINALS_NAME]
+        raceday = rd.Raceday(json_raceday)
+        self.assertEqual(rd.FINALS_NAME, raceday.get_current_heat())
+        # such as when the reports of the earlier heats are imported afterwards
+        result = raceday.get_result(rd.SEMI_FINAL_NAME, "4WD", "A")
+        start_list = raceday.get_start_lists_for_heat(rd.SEMI_FINAL_NAME)["4WD"].get_start_list("A")
+        raceday.add_result(rd.SEMI_FINAL_NAME, "4WD", "A", [d.number for d in result.positions],
+                           {d.number: laps for d, laps in result.num_laps_driven.items()},
+                           {d.number: time for d, time in result.total_times.items()},
+                           [(d.number, time) for d, time in result.best_laptimes],
+                           [(d.number, time) for d, time in result.average_laptimes], False, start_list)
+        self.assertIsNone(raceday.get_heat_results(rd.FINALS_NAME))
+
+    def test_leaderboard_built_once(self):
+        with open(rd.RESULT_FOLDER_PATH / "230101.json", "w") as f:
+            f.write(self.test_raceday_contents["test_raceday1"])
+        get_all_dates = rd.get_all_dates
+
+        def slow_get_all_dates():
+            # so that the first requests overlap
+            time.sleep(0.2)
+            return get_all_dates()
+
+        rows = []
+        with mock.patch.object(rd, "get_all_dates", side_effect=slow_get_all_dates) as mocked:
+            threads = [threading.Thread(target=lambda: rows.append(leaderboard.get_leaderboard("4WD")))
+                       for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(1, mocked.call_count, "The leaderboard was built by both requests!")
+        self.assertTrue(rows[0], "The leaderboard is empty!")
+        self.assertListEqual(rows[0], rows[1])
+
+    def test_leaderboard_replace_entry(self):
+        def entry(season, points, best_laptime):
+            stats = dict.fromkeys(leaderboard.SUMMED_STATS, 0)
+            stats.update(points=points, racedays=1, starts=1, best_laptime=best_laptime)
+            return {"season": season, "classes": {"2WD": {"90": stats}}}
+
+        board = leaderboard._Leaderboard(Path("leaderboard"), (0,), {"230101": entry(2023, 40, 30000),
+                                                                     "230102": entry(2023, 38, 31000)})
+        board.replace_entry("230101", entry(2023, 39, 32000))
+        self.assertEqual(77, board.rankings[2023]["2WD"][0]["points"])
+        self.assertEqual(31000, board.rankings[2023]["2WD"][0]["best_laptime"],
+                         "The best lap of the replaced entry was kept!")
+        board.replace_entry("230102", {"season": 2023, "classes": {}})
+        board.replace_entry("230101", {"season": 2023, "classes": {}})
+        self.assertListEqual([], board.rankings[2023]["2WD"])
+        self.assertListEqual([], board.rankings[leaderboard.ALL_TIME]["2WD"])
+
+    def test_date_index(self):
+        self.assertListEqual([], rd.get_all_dates())
+        rd.create_empty_raceday().save_as_date("230101")
+        self.assertTrue(rd.raceday_date_exists("2023-01-01"))
+        self.assertFalse(rd.raceday_date_exists("2023-01-02"))
+
+        with open(rd.RESULT_FOLDER_PATH / "230102.json", "w") as f:
+            f.write(self.test_raceday_contents[next(iter(self.test_raceday_contents))])
+        os.utime(rd.RESULT_FOLDER_PATH, ns=(0, 0))
+        self.assertTrue(rd.raceday_date_exists("2023-01-02"), "Date index was not refreshed!")
+        self.assertListEqual(["2023-01-02", "2023-01-01"], rd.get_all_dates())
+
+    def test_leaderboard(self):
+        for filename, name in (("220101", "test_raceday2"), ("230101", "test_raceday1")):
+            with open(rd.RESULT_FOLDER_PATH / (filename + ".json"), "w") as f:
+                f.write(self.test_raceday_contents[name])
+        rd.add_save_listener(leaderboard.update_raceday)
+
+        expected_points = {}
+        for filename in ("220101", "230101"):
+            points, _ = rd.load_and_deserialize_raceday(rd.get_raceday_path(filename)).get_cup_points()
+            for driver, p in points.items():
+                expected_points[driver.number] = expected_points.get(driver.number, 0) + p
+
+        points = {}
+        for row in leaderboard.get_leaderboard("2WD") + leaderboard.get_leaderboard("4WD"):
+            if row["points"]:
+                points[row["number"]] = points.get(row["number"], 0) + row["points"]
+        self.assertDictEqual({number: p for number, p in expected_points.items() if p}, points)
+        self.assertListEqual([2023, 2022], leaderboard.get_seasons())
+        winners = [row for row in leaderboard.get_leaderboard("4WD", 2023) if row["wins"]]
+        self.assertEqual(1, len(winners), "Expected a single winner of the 4WD final!")
+
+        entry_path = leaderboard.get_leaderboard_folder() / "220101.json"
+        entry_modified = entry_path.stat().st_mtime_ns
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230101"))
+        raceday.save_as_date("230102")
+        # saved with a change to the journal, so that the statistics of the raceday are replaced
+        raceday.set_all_participants([d.number for d in raceday.all_participants])
+        raceday.save_as_date("230102")
+        self.assertEqual(entry_modified, entry_path.stat().st_mtime_ns, "Another raceday's entry was rewritten!")
+        rows = leaderboard.get_leaderboard("4WD")
+        self.assertEqual(winners[0]["number"], rows[0]["number"])
+        self.assertEqual(2 * winners[0]["points"] + sum(r["points"] for r in leaderboard.get_leaderboard("4WD", 2022)
+                                                         if r["number"] == winners[0]["number"]),
+                         rows[0]["points"], "Leaderboard was not updated when the raceday was saved!")
+
+        os.utime(leaderboard.get_leaderboard_folder(), ns=(0, 0))
+        for season in (leaderboard.ALL_TIME, 2023, 2022):
+            for rcclass in ("2WD", "4WD"):
+                self.assertListEqual(rows if (season, rcclass) == (leaderboard.ALL_TIME, "4WD")
+                                     else leaderboard._loaded.rankings[season][rcclass],
+                                     leaderboard.get_leaderboard(rcclass, season),
+                                     "The updated leaderboard differs from the one read from its files!")
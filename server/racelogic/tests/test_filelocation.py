@@ -0,0 +1,102 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import server.racelogic.filelocation as filelocation
+
+
+class FileLocationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def _write(self, filename, contents="x"):
+        with open(os.path.join(self.folder, filename), "w") as f:
+            f.write(contents)
+
+    def test_result_file_index(self):
+        self._write("12.html")
+        self._write("3.html")
+        self._write("notes.txt")
+        index = filelocation.ResultFileIndex(self.folder)
+        self.assertListEqual([os.path.join(self.folder, f) for f in ("3.html", "12.html")], index.update())
+        self.assertListEqual([], index.update())
+
+        self._write("3.html", "longer")
+        self.assertListEqual([], index.update(require_settled=True), "An unsettled file was reported!")
+        self.assertListEqual([os.path.join(self.folder, "3.html")], index.update(require_settled=True))
+        self.assertListEqual([], index.update(["3.html", "4.html", "notes.txt"]))
+
+    def _next_result(self, results, timeout=10):
+        """Returns the next path of the results, failing the test if it doesn't come within the timeout."""
+        paths = []
+        reader = threading.Thread(target=lambda: paths.append(next(results)), daemon=True)
+        reader.start()
+        reader.join(timeout)
+        self.assertTrue(paths, "The new result was not noticed!")
+        return paths[0]
+
+    def test_watch_result_files(self):
+        for use_inotify in (True, False):
+            with self.subTest(use_inotify=use_inotify):
+                self._write("1.html")
+                results = filelocation.watch_result_files(self.folder, poll_interval=0.3, use_inotify=use_inotify)
+
+                def write_result():
+                    # after the folder is being watched
+                    time.sleep(1)
+                    # written in two passes, as RCM does
+                    self._write("2.html", "first")
+                    time.sleep(0.1)
+                    with open(os.path.join(self.folder, "2.html"), "a") as f:
+                        f.write(" second")
+
+                writer = threading.Thread(target=write_result)
+                writer.start()
+                path = self._next_result(results)
+                with open(path) as f:
+                    contents = f.read()
+                writer.join()
+                self.assertEqual(os.path.join(self.folder, "2.html"), path)
+                self.assertEqual("first second", contents, "The result was reported before it was written!")
+                results.close()
+                os.remove(path)
+
+    def test_watch_result_files_drive_inserted(self):
+        folder = os.path.join(self.folder, "drive")
+        for use_inotify in (True, False):
+            with self.subTest(use_inotify=use_inotify):
+                results = filelocation.watch_result_files(folder, poll_interval=0.3, use_inotify=use_inotify)
+
+                def insert_drive():
+                    time.sleep(1)
+                    # the drive already has the reports of an earlier raceday on it
+                    os.mkdir(folder)
+                    old_path = os.path.join(folder, "1.html")
+                    with open(old_path, "w") as f:
+                        f.write("old")
+                    os.utime(old_path, (time.time() - 86400, time.time() - 86400))
+                    time.sleep(1)
+                    with open(os.path.join(folder, "2.html"), "w") as f:
+                        f.write("new")
+
+                writer = threading.Thread(target=insert_drive)
+                writer.start()
+                path = self._next_result(results)
+                writer.join()
+                self.assertEqual(os.path.join(folder, "2.html"), path, "An old report on the drive was reported!")
+                results.close()
+                shutil.rmtree(folder)
+
+    def test_find_latest_html_file(self):
+        self._write("3.html")
+        self._write("12.html")
+        self._write("notes.txt")
+        self.assertEqual(os.path.join(self.folder, "12.html"), filelocation.find_latest_html_file(self.folder))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 import os
+import tempfile
 from pathlib import Path
 
 import server.racelogic.htmlparsing as htmlparsing
+import server.racelogic.benchmarks.reportparsing as reportparsing
 
 from server.racelogic.duration import Duration
 
@@ -125,3 +127,53 @@ class HtmlParsingTests(unittest.TestCase):
                                     "Best laptimes were incorrect!")
                 self.assertSetEqual(set(average_laptimes), set(expected_average_times),
                                     "Average laptimes were incorrect!")
+
+                laptimes = htmlparsing.get_laptimes(parser)
+                for driver, total_time in total_times.items():
+                    self.assertEqual(num_laps_driven[driver], max(0, len(laptimes[driver]) - 1))
+                    self.assertEqual(total_time, Duration(sum(laptimes[driver])),
+                                     f"Lap times of driver {driver} don't add up to the total time!")
+
+    def test_streaming_parser(self):
+        for test_file in EXPECTED_RESULTS:
+            with self.subTest(f"Test file {test_file}"):
+                filepath = Path(__file__).parent / "testdata" / test_file
+                with open(filepath, encoding="utf-16-le") as f:
+                    expected_parser = htmlparsing.RCMHtmlParser()
+                    expected_parser.parse_data(f.read())
+
+                laps = []
+                data = filepath.read_bytes()
+                with tempfile.TemporaryDirectory() as folder:
+                    report_path = os.path.join(folder, "1.html")
+                    tail = htmlparsing.ReportTail(report_path, lambda *lap: laps.append(lap))
+                    # odd chunk sizes, so that characters and tags are split between the reads
+                    for end in list(range(0, len(data), 777)) + [len(data)]:
+                        with open(report_path, "wb") as f:
+                            f.write(data[:end])
+                        tail.read()
+                    parser = tail.finish()
+
+                self.assertListEqual(expected_parser.result_header, parser.result_header)
+                self.assertDictEqual(dict(expected_parser.result), dict(parser.result))
+                for number, name, lap, milliseconds in laps:
+                    self.assertEqual(expected_parser.result[(number, name)][lap], milliseconds)
+                self.assertEqual(sum(map(len, expected_parser.result.values())), len(laps))
+
+    def test_report_tokenizer(self):
+        reports = {}
+        for test_file in EXPECTED_RESULTS:
+            with open(Path(__file__).parent / "testdata" / test_file, encoding="utf-16-le") as f:
+                reports[test_file] = f.read()
+        # more drivers than fit in one lap time table
+        reports["synthetic"] = reportparsing.create_report(num_drivers=23, num_laps=15)
+
+        for name, contents in reports.items():
+            with self.subTest(f"Report {name}"):
+                expected = htmlparsing.RCMHtmlParser()
+                expected.parse_data(contents)
+                tokenizer = htmlparsing.RCMReportTokenizer()
+                tokenizer.parse_data(contents)
+
+                self.assertListEqual(expected.result_header, tokenizer.result_header)
+                self.assertListEqual(list(expected.result.items()), list(tokenizer.result.items()))
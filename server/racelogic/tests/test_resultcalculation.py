@@ -1,10 +1,13 @@
 import unittest
+import copy
 from typing import Dict, List
 
 import server.racelogic.constants
 import server.racelogic.raceday as rd
 import server.racelogic.htmlparsing as htmlparsing
 import server.racelogic.resultcalculation as resultcalculation
+import server.racelogic.cuppoints as cuppoints
+import server.racelogic.projection as projection
 from server.racelogic.duration import Duration
 from server.racelogic.raceday import QUALIFIERS_NAME, START_LISTS_KEY, RESULTS_KEY, \
     ALL_PARTICIPANTS_KEY, QUARTER_FINAL_NAME, FINALS_NAME, CURRENT_HEAT_KEY
@@ -58,13 +61,18 @@ class ResultCalculationTests(TestCase):
     def to_list_of_lists(self, list_of_tuples):
         return [list(t) for t in list_of_tuples]
 
-    def setup_fake_html_parsing(self, total_times, num_laps_driven, best_laptimes):
+    def setup_fake_html_parsing(self, total_times, num_laps_driven, best_laptimes, laptimes):
         resultcalculation.htmlparsing.get_total_times = mock.Mock(return_value=total_times)
         resultcalculation.htmlparsing.get_num_laps_driven = mock.Mock(return_value=num_laps_driven)
         resultcalculation.htmlparsing.get_best_laptimes = mock.Mock(return_value=best_laptimes)
+        resultcalculation.htmlparsing.get_laptimes = mock.Mock(return_value=laptimes)
         resultcalculation.htmlparsing.get_race_participants = mock.Mock(return_value=[num for num in total_times])
         resultcalculation._read_results = mock.Mock(return_value=None)
 
+    def fake_driver_names(self):
+        # not every car number of the tests has a name
+        return mock.patch.object(rd, "get_driver_name", lambda number: NAMES.get(number, str(number)))
+
     def setup_raceday_state(self, start_lists, results, current_heat):
         json_raceday = {START_LISTS_KEY: start_lists}
         all_participants = list(set(num
@@ -217,6 +225,19 @@ class ResultCalculationTests(TestCase):
             ]
         ]
 
+        list_of_laptimes = [
+            { # normal 2WD qualifier
+                89: [5100, 60000, 61000], 90: [5000, 30000, 30500],
+                47: [5300, 31001, 33000], 11: [5200, 19001, 20000],
+            },
+            { # normal 4WD qualifier
+                67: [5100, 30000, 31000], 68: [5000, 31001, 32000], 36: [5200, 19001, 21000],
+            },
+            { # 2WD dns
+                89: [5100, 60000, 61000], 90: [5000, 30000, 30500], 11: [5200, 19001, 20000],
+            },
+        ]
+
         list_of_expected_positions = [
             [11, 90, 89, 47],  # normal 2WD qualifier
             [68, 67, 36],  # normal 4WD qualifier
@@ -251,6 +272,7 @@ class ResultCalculationTests(TestCase):
              total_times,
              num_laps_driven,
              best_laptimes,
+             laptimes,
              expected_positions,
              expected_group,
              expected_class,
@@ -261,6 +283,7 @@ class ResultCalculationTests(TestCase):
                  list_of_total_times,
                  list_of_num_laps_driven,
                  list_of_best_laptimes,
+                 list_of_laptimes,
                  list_of_expected_positions,
                  list_of_expected_groups,
                  list_of_expected_classes,
@@ -268,9 +291,9 @@ class ResultCalculationTests(TestCase):
                  list_of_descriptions,
             ):
 
-            self.setup_fake_input(["y"])
+            self.setup_fake_input(["j"])
             self.setup_raceday_state(initial_start_lists, {}, 0)
-            self.setup_fake_html_parsing(total_times, num_laps_driven, best_laptimes)
+            self.setup_fake_html_parsing(total_times, num_laps_driven, best_laptimes, dict(laptimes))
 
             not_class = {"4WD": "2WD", "2WD": "4WD"}[expected_class]
             expected_average = self.to_list_of_lists(
@@ -282,7 +305,8 @@ class ResultCalculationTests(TestCase):
                 "total_times": total_times,
                 "best_laptimes": self.to_list_of_lists(best_laptimes),
                 "average_laptimes": expected_average,
-                "manual": False
+                "manual": False,
+                "laptimes": rd.LapTimes.from_milliseconds(laptimes).get_serializable(),
             }
 
             if expected_dns is not None:
@@ -297,7 +321,7 @@ class ResultCalculationTests(TestCase):
                 }
             }
 
-            with self.subTest(description):
+            with self.subTest(description), self.fake_driver_names():
 
                 resultcalculation.add_new_result()
                 raceday = rd.get_raceday()
@@ -307,6 +331,68 @@ class ResultCalculationTests(TestCase):
                                      "Start lists were changed!")
                 self.assertEqual(raceday.current_heat, 0, "Current heat was changed!")
 
+    def test_add_new_result_excluded_driver(self):
+        start_lists = {
+            "Kval": {
+                "2WD": {"A": [90, 89, 11, 47], "B": [12, 27, 29]},
+                "4WD": {"A": [35, 49, 51]},
+            }
+        }
+        # 12 drove in the wrong race, and 47 didn't start
+        total_times = {89: Duration(minutes=21), 90: Duration(minutes=20), 11: Duration(minutes=19),
+                       12: Duration(minutes=18)}
+        num_laps_driven = {90: 20, 89: 20, 11: 21, 12: 22}
+        best_laptimes = [(12, Duration(seconds=18)), (11, Duration(seconds=19)),
+                         (90, Duration(seconds=30)), (89, Duration(minutes=1))]
+        laptimes = {89: [5100, 60000], 90: [5000, 30000], 11: [5200, 19000], 12: [5300, 18000]}
+
+        self.setup_fake_input(["j", "j"])
+        self.setup_raceday_state(start_lists, {}, 0)
+        self.setup_fake_html_parsing(total_times, num_laps_driven, best_laptimes, laptimes)
+        with self.fake_driver_names():
+            resultcalculation.add_new_result()
+
+        result = rd.get_raceday().get_result(QUALIFIERS_NAME, "2WD", "A")
+        self.assertListEqual([11, 90, 89, 47], [driver.number for driver in result.positions])
+        self.assertSetEqual({90, 89, 11}, set(result.laptimes.numbers()))
+        for number in (90, 89, 11):
+            self.assertListEqual(laptimes[number], result.get_laptimes(rd.Driver(number)).tolist())
+        self.assertIsNone(result.get_laptimes(rd.Driver(12)), "The excluded driver's lap times were kept!")
+        self.assertIsNone(result.get_laptimes(rd.Driver(47)), "The driver who didn't start has lap times!")
+
+    def test_add_new_result_not_interactive(self):
+        start_lists = {
+            "Kval": {
+                "2WD": {"A": [90, 89, 11, 47], "B": [12, 27, 29]},
+                "4WD": {"A": [35, 49, 51]},
+            }
+        }
+        # 12 drove in the wrong race
+        total_times = {89: Duration(minutes=21), 90: Duration(minutes=20), 11: Duration(minutes=19),
+                       12: Duration(minutes=18)}
+        num_laps_driven = {90: 20, 89: 20, 11: 21, 12: 22}
+        best_laptimes = [(12, Duration(seconds=18)), (11, Duration(seconds=19)),
+                         (90, Duration(seconds=30)), (89, Duration(minutes=1))]
+        laptimes = {89: [5100, 60000], 90: [5000, 30000], 11: [5200, 19000], 12: [5300, 18000]}
+
+        self.setup_fake_input([])
+        self.setup_raceday_state(start_lists, {}, 0)
+        self.setup_fake_html_parsing(total_times, num_laps_driven, best_laptimes, copy.deepcopy(laptimes))
+        with self.fake_driver_names():
+            resultcalculation.add_new_result(interactive=False)
+        result = rd.get_raceday().get_result(QUALIFIERS_NAME, "2WD", "A")
+        self.assertListEqual([11, 90, 89, 47], [driver.number for driver in result.positions])
+
+        # the race already has a result, which is kept
+        self.setup_fake_html_parsing({90: Duration(minutes=20)}, {90: 20}, [(90, Duration(seconds=30))],
+                                     {90: [5000, 30000]})
+        with self.fake_driver_names():
+            resultcalculation.add_new_result(interactive=False)
+        result = rd.get_raceday().get_result(QUALIFIERS_NAME, "2WD", "A")
+        self.assertListEqual([11, 90, 89, 47], [driver.number for driver in result.positions],
+                             "The result was overwritten without asking!")
+        resultcalculation._input.assert_not_called()
+
     def test_start_new_race_round_qualifiers_normal(self):
         raceday = self.test_racedays["test_start_new_race_round_qualifiers_normal"]
         raceday.save()
@@ -379,6 +465,49 @@ class ResultCalculationTests(TestCase):
                              expected_new_start_lists,
                              "Start lists were incorrectly made from qualifiers!")
 
+    def test_start_new_race_round_qualifiers_more_groups(self):
+        raceday = self.test_racedays["test_start_new_race_round_qualifiers_normal"]
+        raceday.save()
+        self.setup_fake_input([
+            "n",  # don't use current groups
+            "E",  # split 2WD into A-E
+            "D",  # split 4WD into A-D
+            "j"   # accept
+        ])
+
+        resultcalculation.start_new_race_round()
+
+        expected_new_start_lists = {
+            "2WD": {
+                "A": [37, 22],
+                "B": [27, 41],
+                "C": [71, 19],
+                "D": [88, 62],
+                "E": [65],
+            },
+            "4WD": {
+                "A": [11, 90, 77, 75],
+                "B": [36, 89, 45, 82],
+                "C": [39, 67, 83],
+                "D": [46, 60, 64],
+            }
+        }
+        new_raceday = rd.get_raceday()
+        self.assertDictEqual(new_raceday.get_start_lists_dict()[rd.EIGHTH_FINAL_NAME],
+                             expected_new_start_lists,
+                             "Start lists were incorrectly made from qualifiers!")
+        self.assertListEqual(
+            [("2WD", "E"), ("2WD", "D"), ("2WD", "C"), ("2WD", "B"), ("2WD", "A"),
+             ("4WD", "D"), ("4WD", "C"), ("4WD", "B"), ("4WD", "A")],
+            new_raceday.get_class_order(rd.EIGHTH_FINAL_NAME))
+
+    def test_create_almost_equal_partitions(self):
+        drivers = rd.number_list_to_driver_list(list(range(1, 11)))
+        partitions = resultcalculation._create_almost_equal_partitions(drivers, 4)
+        self.assertListEqual([3, 3, 2, 2], [len(partition) for partition in partitions])
+        self.assertListEqual(drivers, [driver for partition in partitions for driver in partition])
+        self.assertListEqual([[], []], resultcalculation._create_almost_equal_partitions([], 2))
+
     def test_start_new_race_round_qualifiers_merge_groups_dns(self):
         raceday = self.test_racedays["test_start_new_race_round_qualifiers_dns"]
         raceday.save()
@@ -456,6 +585,25 @@ class ResultCalculationTests(TestCase):
                              expected_new_start_lists,
                              "Start lists were incorrectly made for finals!")
 
+    def test_start_new_race_round_finals_more_groups(self):
+        raceday = self.test_racedays["test_start_new_race_round_finals_normal"]
+
+        # TODO make this a parameter
+        resultcalculation.MAX_NUM_PARTICIPANTS_PER_GROUP = 4
+
+        raceday.save()
+
+        resultcalculation.start_new_race_round()
+
+        new_raceday = rd.get_raceday()
+        new_start_lists = new_raceday.get_start_lists_dict()[FINALS_NAME]
+        self.assertListEqual(["A", "B", "C"], list(new_start_lists["2WD"]))
+        self.assertListEqual(["A", "B", "C", "D", "E"], list(new_start_lists["4WD"]))
+        self.assertListEqual([37, 22, 88], new_start_lists["2WD"]["A"])
+        self.assertListEqual([3, 3, 3, 3, 2], [len(start_list) for start_list in new_start_lists["4WD"].values()])
+        self.assertEqual(("4WD", "E"), new_raceday.get_class_order(FINALS_NAME)[0])
+        self.assertListEqual([("2WD", "A"), ("4WD", "A")], new_raceday.get_class_order(FINALS_NAME)[-2:])
+
     def test_start_new_race_round_intermediate_normal(self):
         raceday = self.test_racedays["test_start_new_race_round_intermediate_normal"]
         raceday.save()
@@ -501,6 +649,67 @@ class ResultCalculationTests(TestCase):
                              "Start lists were incorrectly made for eight finals!")
         self.assertEqual(new_raceday.current_heat, 2, "Heat was not incremented!")
 
+    def test_match_race(self):
+        raceday = self.test_racedays["test_raceday1"]
+
+        match = raceday.match_race(rd.number_list_to_driver_list([75, 46, 11, 11]))
+        self.assertEqual((FINALS_NAME, "4WD", "B"), (match.heat_name, match.rcclass, match.group))
+        self.assertEqual(3, match.num_votes)
+        self.assertFalse(match.is_ambiguous())
+        self.assertListEqual([], match.unknown_drivers)
+
+        match = raceday.match_race(rd.number_list_to_driver_list([22, 88, 38, 77, 1000]))
+        self.assertEqual(("2WD", "A"), (match.rcclass, match.group), "Ties should go to the first group!")
+        self.assertListEqual([("2WD", "B")], match.tied_races)
+        self.assertListEqual([rd.Driver(1000)], match.unknown_drivers)
+
+        self.assertEqual((None, None, None, None), raceday.find_relevant_race([rd.Driver(1000)]))
+
+    def test_verify_cup_points(self):
+        for name, raceday in self.test_racedays.items():
+            with self.subTest(f"Raceday {name}"):
+                self.assertTrue(resultcalculation.verify_cup_points(raceday),
+                                "Cup points differ from the points calculated from scratch!")
+
+    def test_cup_points_after_overwritten_result(self):
+        raceday = copy.deepcopy(self.test_racedays["test_raceday1"])
+        points_before, _ = raceday.get_cup_points()
+        seeding_keys_before = raceday.get_seeding_keys()
+
+        heat_name = rd.SEMI_FINAL_NAME
+        result = raceday.get_result(heat_name, "4WD", "A")
+        positions = list(reversed([d.number for d in result.positions]))
+        raceday.add_result(heat_name, "4WD", "A",
+                           positions,
+                           {d.number: laps for d, laps in result.num_laps_driven.items()},
+                           {d.number: time for d, time in result.total_times.items()},
+                           [(d.number, time) for d, time in result.best_laptimes],
+                           [(d.number, time) for d, time in result.average_laptimes],
+                           True,
+                           raceday.get_start_lists_for_heat(heat_name)["4WD"].get_start_list("A"))
+
+        points_after, _ = raceday.get_cup_points()
+        self.assertNotEqual(points_before, points_after, "Cup points were not updated!")
+        self.assertTrue(resultcalculation.verify_cup_points(raceday),
+                        "Cup points differ from the points calculated from scratch!")
+        self.assertNotEqual(seeding_keys_before, raceday.get_seeding_keys(), "Seeding keys were not updated!")
+
+    def test_seeding_keys(self):
+        raceday = copy.deepcopy(self.test_racedays["test_raceday1"])
+        _, points_per_race = raceday.get_cup_points()
+        seeding_keys = raceday.get_seeding_keys()
+        for rcclass, class_points in points_per_race.items():
+            self.assertListEqual(list(class_points), list(seeding_keys[rcclass]))
+            for driver, points in class_points.items():
+                self.assertEqual((sum(points), tuple(sorted((p for p in points if p), reverse=True))),
+                                 seeding_keys[rcclass][driver])
+
+        self.assertGreater(cuppoints.get_seeding_key([40, 30]), cuppoints.get_seeding_key([31, 39]),
+                           "The driver with the best heat should be seeded first on equal points!")
+        self.assertGreater(cuppoints.get_seeding_key([80, 78, 40]), cuppoints.get_seeding_key([79, 79, 40]))
+        self.assertEqual(cuppoints.get_seeding_key([36, 0]), cuppoints.get_seeding_key([36]),
+                         "Heats without points should not count as good heats!")
+
     @unittest.expectedFailure
     def test_calculate_cup_points(self):
         # TODO this test fails due to rule changes, see issue #28
@@ -570,6 +779,133 @@ class ResultCalculationTests(TestCase):
         self.assertDictEqual(points_per_race, expected_points_per_race,
                              "Points per race was incorrectly calculated! Extra drivers?")
 
+    def test_season_points_are_consistent(self):
+        racedays = [self.test_racedays[name] for name in ("test_raceday1", "test_raceday2", "test_raceday3")]
+        season_points = resultcalculation.calculate_season_points(racedays, ["a", "b", "c"])
+
+        for rcclass, class_points in season_points.items():
+            for driver, points_per_race in class_points.points_per_race.items():
+                with self.subTest(f"{rcclass} driver {driver.number}"):
+                    self.assertTrue(any(class_points.race_participation[driver]))
+                    self.assertEqual(sum(points_per_race), class_points.total_points[driver])
+                    drop_race_indices = class_points.drop_race_indices[driver]
+                    self.assertEqual(1, len(drop_race_indices))
+                    self.assertEqual(min(points_per_race), points_per_race[drop_race_indices[0]])
+                    self.assertEqual(class_points.total_points[driver] - min(points_per_race),
+                                     class_points.total_points_with_drop_race[driver])
+
+    def test_scoring_rules(self):
+        self.assertEqual(tuple(range(40, 0, -1)), cuppoints.DEFAULT_RULES.non_finals_points)
+        self.assertEqual(tuple(range(80, 0, -2)), cuppoints.DEFAULT_RULES.finals_points)
+
+        raceday = copy.deepcopy(self.test_racedays["test_raceday1"])
+        _, default_points_per_race = raceday.get_cup_points()
+        raceday.set_scoring_rules(cuppoints.ScoringRules({"points_per_position": [10, 8, 6, 5, 4, 3, 2, 1],
+                                                          "finals_multiplier": 1}))
+        _, points_per_race = raceday.get_cup_points()
+        self.assertTrue(resultcalculation.verify_cup_points(raceday))
+        for rcclass, class_points in points_per_race.items():
+            self.assertListEqual(list(default_points_per_race[rcclass]), list(class_points))
+            for driver, points in class_points.items():
+                for default_points, new_points in zip(default_points_per_race[rcclass][driver], points):
+                    # the places are the same, only the points of them differ
+                    expected_points = {40: 10, 39: 8, 38: 6, 37: 5, 36: 4, 35: 3, 34: 2, 33: 1,
+                                       80: 10, 78: 8, 76: 6, 74: 5, 72: 4, 70: 3, 68: 2, 66: 1}.get(default_points, 0)
+                    self.assertEqual(expected_points, new_points)
+
+        with self.assertRaises(ValueError):
+            cuppoints.ScoringRules({"dns_policy": "maybe"})
+
+    def test_points_after_table(self):
+        # more drivers than there are points, in two groups of one class
+        results = {"2WD": {"A": mock.Mock(positions=list(range(1, 26)), has_dns=lambda: False),
+                           "B": mock.Mock(positions=list(range(26, 46)), has_dns=lambda: False)},
+                   "4WD": {}}
+        points = cuppoints.calculate_heat_points(results, False)
+        self.assertListEqual(list(range(40, -5, -1)), [points["2WD"][driver][0] for driver in range(1, 46)])
+        points = cuppoints.calculate_heat_points(results, True)
+        self.assertListEqual(list(range(80, -10, -2)), [points["2WD"][driver][0] for driver in range(1, 46)])
+
+        rules = cuppoints.ScoringRules({"points_per_position": [10, 8, 6]})
+        points = cuppoints.calculate_heat_points(results, False, rules)
+        self.assertListEqual([10, 8, 6] + [0] * 42, [points["2WD"][driver][0] for driver in range(1, 46)])
+
+    def test_scoring_rules_dns_policy(self):
+        raceday = self.test_racedays["test_start_new_race_round_qualifiers_dns"]
+        results = raceday.get_heat_results(rd.QUALIFIERS_NAME)
+        dns_drivers = [(rcclass, driver) for rcclass, class_results in results.items()
+                       for result in class_results.values() for driver in result.positions
+                       if not result.did_driver_start(driver)]
+        self.assertTrue(dns_drivers)
+
+        points = cuppoints.calculate_heat_points(results, False)
+        position_points = cuppoints.calculate_heat_points(
+            results, False, cuppoints.ScoringRules({"dns_policy": cuppoints.DNS_POSITION_POINTS}))
+        for rcclass, driver in dns_drivers:
+            self.assertListEqual([0], points[rcclass][driver])
+            self.assertNotEqual([0], position_points[rcclass][driver])
+
+    def test_season_points_drop_races(self):
+        racedays = [self.test_racedays[name] for name in ("test_raceday1", "test_raceday2", "test_raceday3")]
+        no_drop_races = resultcalculation.calculate_season_points(
+            racedays, ["a", "b", "c"], cuppoints.ScoringRules({"num_drop_races": 0}))
+        two_drop_races = resultcalculation.calculate_season_points(
+            racedays, ["a", "b", "c"], cuppoints.ScoringRules({"num_drop_races": 2}))
+        for rcclass, class_points in no_drop_races.items():
+            for driver, points_per_race in class_points.points_per_race.items():
+                self.assertEqual(sum(points_per_race), class_points.total_points_with_drop_race[driver])
+                self.assertListEqual([], class_points.drop_race_indices[driver])
+
+                self.assertEqual(max(points_per_race), two_drop_races[rcclass].total_points_with_drop_race[driver])
+                drop_race_indices = two_drop_races[rcclass].drop_race_indices[driver]
+                self.assertListEqual(sorted(drop_race_indices), drop_race_indices)
+                self.assertEqual(2, len(set(drop_race_indices)))
+                kept_race_index, = set(range(3)) - set(drop_race_indices)
+                self.assertEqual(max(points_per_race), points_per_race[kept_race_index])
+
+    def test_score_raceday(self):
+        self.fs.add_real_directory(TEST_DATABASE_PATH)
+        path = str(TEST_DATABASE_PATH / "test_raceday1.json")
+        participants, (default_cup_points, new_cup_points) = resultcalculation._score_raceday(
+            path, [cuppoints.DEFAULT_RULES.definition, {"num_drop_races": 0, "finals_multiplier": 1}])
+
+        raceday = self.test_racedays["test_raceday1"]
+        self.assertListEqual([driver.number for driver in raceday.all_participants], participants)
+        points, points_per_race = raceday.get_cup_points()
+        self.assertEqual((points, points_per_race), resultcalculation._cup_points_from_numbers(default_cup_points))
+        self.assertNotEqual(default_cup_points, new_cup_points)
+
+    def test_season_projection(self):
+        racedays = [self.test_racedays[name] for name in ("test_raceday1", "test_raceday2", "test_raceday3")]
+        season_points = resultcalculation.calculate_season_points(racedays, ["a", "b", "c"])
+
+        projections = projection.project_season(season_points, 2, num_simulations=1000, max_workers=1, seed=1)
+        for rcclass, class_projection in projections.items():
+            with self.subTest(rcclass):
+                self.assertEqual(1000, class_projection.num_simulations)
+                self.assertAlmostEqual(1., sum(class_projection.title_probabilities.values()))
+                self.assertAlmostEqual(3., sum(class_projection.podium_probabilities.values()))
+                self.assertDictEqual(dict(season_points[rcclass].total_points_with_drop_race),
+                                     class_projection.current_points)
+        self.assertDictEqual(projections["2WD"].title_probabilities,
+                             projection.project_season(season_points, 2, num_simulations=1000, max_workers=1,
+                                                       seed=1)["2WD"].title_probabilities,
+                             "The same seed should give the same projection!")
+
+        # with no racedays left, the leader has already won, however many races are dropped
+        for num_drop_races in (0, 1, 2):
+            with self.subTest(num_drop_races=num_drop_races):
+                season_points = resultcalculation.calculate_season_points(
+                    racedays, ["a", "b", "c"], cuppoints.ScoringRules({"num_drop_races": num_drop_races}))
+                projections = projection.project_season(season_points, 0, num_simulations=100, max_workers=1,
+                                                        num_drop_races=num_drop_races)
+                for rcclass, class_projection in projections.items():
+                    totals = season_points[rcclass].total_points_with_drop_race
+                    # drivers on equal points share the title
+                    leaders = [driver for driver in totals if totals[driver] == max(totals.values())]
+                    self.assertAlmostEqual(1., sum(class_projection.title_probabilities[driver]
+                                                   for driver in leaders))
+
     @unittest.expectedFailure
     def test_calculate_season_points(self):
         # TODO this test fails due to rule changes, see issue #28
@@ -608,13 +944,13 @@ class ResultCalculationTests(TestCase):
             rd.Driver(77): 155,
         }
         expected_2wd.drop_race_indices = {
-            rd.Driver(22): 1,
-            rd.Driver(88): 0,
-            rd.Driver(41): 0,
+            rd.Driver(22): [1],
+            rd.Driver(88): [0],
+            rd.Driver(41): [0],
 
-            rd.Driver(19): 0,
-            rd.Driver(38): 0,
-            rd.Driver(77): 2,
+            rd.Driver(19): [0],
+            rd.Driver(38): [0],
+            rd.Driver(77): [2],
         }
         expected_2wd.race_locations = locations
         expected_2wd.race_participation = {
@@ -658,14 +994,14 @@ class ResultCalculationTests(TestCase):
             rd.Driver(77): 56,
         }
         expected_4wd.drop_race_indices = {
-            rd.Driver(90): 0,
-            rd.Driver(45): 0,
-            rd.Driver(36): 0,
-
-            rd.Driver(75): 0,
-            rd.Driver(46): 0,
-            rd.Driver(11): 0,
-            rd.Driver(77): 0,
+            rd.Driver(90): [0],
+            rd.Driver(45): [0],
+            rd.Driver(36): [0],
+
+            rd.Driver(75): [0],
+            rd.Driver(46): [0],
+            rd.Driver(11): [0],
+            rd.Driver(77): [0],
         }
         expected_4wd.race_participation = {
             rd.Driver(90): [True, True, True],
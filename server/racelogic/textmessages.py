@@ -67,6 +67,18 @@ POINTS_LIST_TEXT_TEMPLATE = \
 {points_list}"""
 
 
+PROJECTION_TEXT_TEMPLATE = \
+"""Prognos för cupen {season} med {num_remaining_racedays} deltävlingar kvar ({num_simulations} simuleringar)
+
+{projection_list}"""
+
+
+STANDINGS_DIFF_TEXT_TEMPLATE = \
+"""Cupställningen {season} med de nya reglerna (plats och poäng före → efter)
+
+{diff_list}"""
+
+
 START_MESSAGE_TEMPLATE = \
 """Nu ska {rcclass} {group}-{race} köras:
 
@@ -209,6 +221,52 @@ def create_points_list_text_message(all_points, points_per_race, race, verbose):
     )
 
 
+# noinspection StrFormat
+def create_projection_text_message(projections, season, num_remaining_racedays):
+    projection_lists = []
+    num_simulations = 0
+    for rcclass, projection in projections.items():
+        num_simulations = max(num_simulations, projection.num_simulations)
+        projection_texts = [
+            f"{driver.number} - {driver.name} ({projection.current_points[driver]} p): "
+            f"{projection.title_probabilities[driver]:.0%} seger, {projection.podium_probabilities[driver]:.0%} pall"
+            for driver in projection.drivers_ranked_by_title_probability()
+        ]
+        list_text = "\n".join(projection_texts)
+        projection_lists.append(f"{rcclass}:\n{list_text}")
+
+    return PROJECTION_TEXT_TEMPLATE.format(
+        season=season,
+        num_remaining_racedays=num_remaining_racedays,
+        num_simulations=num_simulations,
+        projection_list="\n\n".join(projection_lists)
+    )
+
+
+# noinspection StrFormat
+def create_standings_diff_text_message(season, old_season_points_per_class, new_season_points_per_class):
+    diff_lists = []
+    for rcclass, new_season_points in new_season_points_per_class.items():
+        old_season_points = old_season_points_per_class[rcclass]
+        old_places = {driver: place
+                      for place, driver in enumerate(old_season_points.drivers_ranked_by_points_with_drop_race(), 1)}
+        diff_texts = []
+        for place, driver in enumerate(new_season_points.drivers_ranked_by_points_with_drop_race(), 1):
+            old_place = old_places.get(driver)
+            old_points = old_season_points.total_points_with_drop_race.get(driver)
+            new_points = new_season_points.total_points_with_drop_race[driver]
+            if old_place != place or old_points != new_points:
+                diff_texts.append(f"{old_place}. → {place}. {driver.number} - {driver.name}: "
+                                  f"{old_points} → {new_points} p")
+        list_text = "\n".join(diff_texts) if diff_texts else "Inga förändringar."
+        diff_lists.append(f"{rcclass}:\n{list_text}")
+
+    return STANDINGS_DIFF_TEXT_TEMPLATE.format(
+        season=season,
+        diff_list="\n\n".join(diff_lists)
+    )
+
+
 # noinspection StrFormat
 def create_race_start_message(heat_start_lists: Dict[str, HeatStartLists],
                               race_order: List[Tuple[str, str]],
@@ -0,0 +1,169 @@
+"""
+Season standings, kept on disk as one json file per season. A season's standings
+are only recalculated when the races of the season or one of their raceday
+files have changed, which is tracked with a hash of both. The same goes for the
+projections of how the seasons will end.
+"""
+from typing import Dict, List, Tuple
+
+import server.racelogic.resultcalculation as rc
+import server.racelogic.raceday as rd
+import server.racelogic.projection as projection
+import server.racelogic.cuppoints as cuppoints
+from server import models
+
+from pathlib import Path
+
+import hashlib
+import json
+import os
+import threading
+
+STANDINGS_FOLDER_NAME = "standings"
+# change this when the standings are calculated differently, so that all saved standings are recalculated
+STANDINGS_VERSION = 4
+
+_lock = threading.Lock()
+
+
+def get_season_points(season: int) -> Dict[str, rc.SeasonPoints]:
+    """
+    Returns the season points of a season, as rc.calculate_season_points does,
+    recalculating them only if the season has changed since they were saved.
+    """
+    races = models.get_season_races(season)
+    rules = rd.get_season_scoring_rules(season)
+    key = _get_season_key(races, rules)
+    path = get_standings_path(season)
+    with _lock:
+        season_json = _read_standings(path)
+        if season_json is None or season_json["key"] != key:
+            racedays = [rd.get_raceday_with_filename(filename) for _, filename, _ in races]
+            season_points_per_class = rc.calculate_season_points(racedays, [location for _, _, location in races],
+                                                                 rules)
+            season_json = {"key": key, "classes": season_points_to_json(season_points_per_class)}
+            _write_standings(path, season_json)
+    return season_points_from_json(season_json["classes"])
+
+
+def get_season_projection(season: int, num_remaining_racedays: int) -> Dict[str, projection.ClassProjection]:
+    """
+    Returns the projection of how a season ends with num_remaining_racedays racedays
+    left, simulating it only if the season has changed since it was saved.
+    """
+    season_points_per_class = get_season_points(season)
+    rules = rd.get_season_scoring_rules(season)
+    key = _get_season_key(models.get_season_races(season), rules)
+    path = get_projection_path(season, num_remaining_racedays)
+    with _lock:
+        projection_json = _read_standings(path)
+        if projection_json is None or projection_json["key"] != key:
+            # seeded from the key, so that the same season always gives the same projection
+            projections = projection.project_season(season_points_per_class, num_remaining_racedays,
+                                                    seed=int(key[:16], 16), num_drop_races=rules.num_drop_races)
+            projection_json = {"key": key, "classes": projections_to_json(projections)}
+            _write_standings(path, projection_json)
+    return projections_from_json(projection_json["classes"])
+
+
+def get_standings_path(season: int) -> Path:
+    return rd.RESULT_FOLDER_PATH / STANDINGS_FOLDER_NAME / f"{season}.json"
+
+
+def get_projection_path(season: int, num_remaining_racedays: int) -> Path:
+    return rd.RESULT_FOLDER_PATH / STANDINGS_FOLDER_NAME / f"{season}-projection-{num_remaining_racedays}.json"
+
+
+def season_points_to_json(season_points_per_class: Dict[str, rc.SeasonPoints]) -> Dict:
+    return {
+        rcclass: {
+            "race_locations": list(season_points.race_locations),
+            "drivers": [
+                {
+                    "number": driver.number,
+                    "total_points": season_points.total_points[driver],
+                    "total_points_with_drop_race": season_points.total_points_with_drop_race[driver],
+                    "drop_race_indices": season_points.drop_race_indices[driver],
+                    "points_per_race": season_points.points_per_race[driver],
+                    "race_participation": season_points.race_participation[driver],
+                }
+                for driver in season_points.points_per_race
+            ],
+        }
+        for rcclass, season_points in season_points_per_class.items()
+    }
+
+
+def season_points_from_json(json_classes: Dict) -> Dict[str, rc.SeasonPoints]:
+    season_points_per_class = {}
+    for rcclass, json_season_points in json_classes.items():
+        season_points = rc.SeasonPoints()
+        season_points.race_locations = json_season_points["race_locations"]
+        for json_driver in json_season_points["drivers"]:
+            driver = rd.get_driver(json_driver["number"])
+            season_points.total_points[driver] = json_driver["total_points"]
+            season_points.total_points_with_drop_race[driver] = json_driver["total_points_with_drop_race"]
+            season_points.drop_race_indices[driver] = json_driver["drop_race_indices"]
+            season_points.points_per_race[driver] = json_driver["points_per_race"]
+            season_points.race_participation[driver] = json_driver["race_participation"]
+        season_points_per_class[rcclass] = season_points
+    return season_points_per_class
+
+
+def projections_to_json(projections: Dict[str, projection.ClassProjection]) -> Dict:
+    return {
+        rcclass: {
+            "num_simulations": class_projection.num_simulations,
+            "num_remaining_racedays": class_projection.num_remaining_racedays,
+            "drivers": [
+                {
+                    "number": driver.number,
+                    "current_points": class_projection.current_points[driver],
+                    "title_probability": class_projection.title_probabilities[driver],
+                    "podium_probability": class_projection.podium_probabilities[driver],
+                }
+                for driver in class_projection.current_points
+            ],
+        }
+        for rcclass, class_projection in projections.items()
+    }
+
+
+def projections_from_json(json_classes: Dict) -> Dict[str, projection.ClassProjection]:
+    projections = {}
+    for rcclass, json_projection in json_classes.items():
+        class_projection = projection.ClassProjection()
+        class_projection.num_simulations = json_projection["num_simulations"]
+        class_projection.num_remaining_racedays = json_projection["num_remaining_racedays"]
+        for json_driver in json_projection["drivers"]:
+            driver = rd.get_driver(json_driver["number"])
+            class_projection.current_points[driver] = json_driver["current_points"]
+            class_projection.title_probabilities[driver] = json_driver["title_probability"]
+            class_projection.podium_probabilities[driver] = json_driver["podium_probability"]
+        projections[rcclass] = class_projection
+    return projections
+
+
+def _get_season_key(races: List[Tuple[str, str, str]],
+                    rules: cuppoints.ScoringRules = cuppoints.DEFAULT_RULES) -> str:
+    key = hashlib.sha1(str(STANDINGS_VERSION).encode("utf-8"))
+    key.update(json.dumps(rules.definition, sort_keys=True).encode("utf-8"))
+    for date, filename, location in races:
+        key.update(json.dumps([date, filename, location, rd.get_raceday_content_hash(filename)]).encode("utf-8"))
+    return key.hexdigest()
+
+
+def _read_standings(path: Path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_standings(path: Path, season_json: Dict) -> None:
+    path.parent.mkdir(exist_ok=True)
+    temporary_path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, "w") as f:
+        json.dump(season_json, f)
+    os.replace(temporary_path, path)
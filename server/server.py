@@ -8,12 +8,14 @@ import flask_wtf.csrf
 
 import server.racelogic.resultcalculation as rc
 import server.racelogic.raceday as rd
+import server.racelogic.leaderboard as leaderboard
+from server.racelogic.duration import Duration
 
 from flask import Flask, request, Blueprint
 from flask_login import login_required, logout_user, current_user, login_user
 from pathlib import Path
 
-from server import models
+from server import models, seasonstandings
 from server.racedayoperations import create_raceday_from_json, RaceDayException
 
 main_bp = Blueprint(
@@ -32,6 +34,11 @@ POINTS_TAB = "points"
 NEW_RACE_DAY_TAB = "newraceday"
 
 SEASON_POINTS_TAB = "seasonpoints"
+ALL_TIME_TAB = "alltime"
+PROJECTION_TAB = "projection"
+
+DEFAULT_NUM_REMAINING_RACEDAYS = 1
+MAX_NUM_REMAINING_RACEDAYS = 10
 
 LOGOUT_URL = "logout"
 
@@ -53,6 +60,8 @@ ADMIN_TABS = {
 
 SEASON_TABS = {
     SEASON_POINTS_TAB: ("Cupställning", "bar-chart-2"),
+    ALL_TIME_TAB: ("Maratontabell", "trending-up"),
+    PROJECTION_TAB: ("Prognos", "percent"),
 }
 
 SHORTER_FINAL_NAMES = {
@@ -77,12 +86,13 @@ def _render_page(active_tab: str, selected_date: str, selected_season: int) -> s
     raceday = rd.get_raceday_with_date(selected_date)
     if active_tab in (START_LISTS_TAB, RESULTS_TAB):
         start_lists, marshals = rc.get_all_start_lists(raceday)
+    if active_tab == RESULTS_TAB:
         results = raceday.get_all_results()
     elif active_tab == POINTS_TAB:
         all_points, points_per_race = rc.get_current_cup_points(selected_date)
         points = {
             rcclass: _sort_points(all_points, points_per_race, rcclass)
-            for rcclass in ("2WD", "4WD")
+            for rcclass in points_per_race
         }
 
     race_order = [SHORTER_FINAL_NAMES[name] for name in rd.NON_QUALIFIER_RACE_ORDER]
@@ -119,19 +129,33 @@ def _render_individual_result_page(selected_date: str, result: rd.RaceResult, se
 def _render_season_wide_page(selected_date: str, selected_season: int, active_tab: str) -> str:
 
     season_points_per_class = None
+    leaderboard_per_class = None
+    projection_per_class = None
+    num_remaining_racedays = None
     num_races = 0
 
     if active_tab == SEASON_POINTS_TAB:
-        dates, _, locations = models.get_race_dates_filenames_and_locations(selected_season)
-        racedays = [rd.get_raceday_with_date(date) for date in reversed(dates)]
-        season_points_per_class = rc.calculate_season_points(racedays, list(reversed(locations)))
+        season_points_per_class = seasonstandings.get_season_points(int(selected_season))
+    elif active_tab == ALL_TIME_TAB:
+        leaderboard_per_class = {
+            rcclass: _get_leaderboard_rows(rcclass, leaderboard.ALL_TIME)
+            for rcclass in ("2WD", "4WD")
+        }
+    elif active_tab == PROJECTION_TAB:
+        num_remaining_racedays = request.args.get("remaining", DEFAULT_NUM_REMAINING_RACEDAYS, type=int)
+        num_remaining_racedays = min(max(num_remaining_racedays, 0), MAX_NUM_REMAINING_RACEDAYS)
+        projection_per_class = seasonstandings.get_season_projection(int(selected_season), num_remaining_racedays)
 
     return _render_general_page(active_tab,
                                 selected_date,
                                 selected_season,
                                 SEASON_TABS,
-                                template_name="totalpoints.html",
+                                template_name="totalpoints.html" if active_tab == SEASON_POINTS_TAB else None,
                                 season_points_per_class=season_points_per_class,
+                                leaderboard_per_class=leaderboard_per_class,
+                                projection_per_class=projection_per_class,
+                                num_remaining_racedays=num_remaining_racedays,
+                                max_num_remaining_racedays=MAX_NUM_REMAINING_RACEDAYS,
                                 )
 
 
@@ -196,8 +220,15 @@ def _create_laptimes_json(result):
     return json.dumps(laptimes)
 
 
+def _get_leaderboard_rows(rcclass, season):
+    return [dict(row,
+                 name=rd.get_driver(row["number"]).name,
+                 best_laptime_text=str(Duration(row["best_laptime"])) if row["best_laptime"] is not None else "")
+            for row in leaderboard.get_leaderboard(rcclass, season)]
+
+
 def _is_valid_db_date(date):
-    return date in rd.get_all_dates()
+    return rd.raceday_date_exists(date)
 
 
 def _sort_points(all_points, points_per_race, rcclass):
@@ -256,6 +287,20 @@ def season_points_default():
     return flask.redirect(flask.url_for("main_bp.season_points_page", year=latest_season, date=latest))
 
 
+@main_bp.get(f"/{ALL_TIME_TAB}")
+def all_time_default():
+    latest_season = models.get_latest_season()
+    latest = models.get_latest_date(latest_season)
+    return flask.redirect(flask.url_for("main_bp.all_time_page", year=latest_season, date=latest))
+
+
+@main_bp.get(f"/{PROJECTION_TAB}")
+def projection_default():
+    latest_season = models.get_latest_season()
+    latest = models.get_latest_date(latest_season)
+    return flask.redirect(flask.url_for("main_bp.projection_page", year=latest_season, date=latest))
+
+
 @main_bp.get(f"/{NEW_RACE_DAY_TAB}")
 def new_race_day_default():
     latest_season = models.get_latest_season()
@@ -292,9 +337,7 @@ def results_details_page(year, date):
     # TODO make 404 page
     if heat not in rd.RACE_ORDER:
         return flask.redirect(f"/{RESULTS_TAB}")
-    if rcclass not in ("2WD", "4WD"):
-        return flask.redirect(f"/{RESULTS_TAB}")
-    if group not in ("A", "B", "C"):
+    if not raceday.result_exists(heat, rcclass, group):
         return flask.redirect(f"/{RESULTS_TAB}")
 
     result = raceday.get_result(heat, rcclass, group)
@@ -319,6 +362,20 @@ def season_points_page(year, date):
     return _render_season_wide_page(selected_date=date, selected_season=year, active_tab=SEASON_POINTS_TAB)
 
 
+@main_bp.get(f"/{ALL_TIME_TAB}/<year>/<date>")
+def all_time_page(year, date):
+    if not _is_valid_db_date(date):
+        return flask.redirect(f"/{ALL_TIME_TAB}")
+    return _render_season_wide_page(selected_date=date, selected_season=year, active_tab=ALL_TIME_TAB)
+
+
+@main_bp.get(f"/{PROJECTION_TAB}/<year>/<date>")
+def projection_page(year, date):
+    if not _is_valid_db_date(date):
+        return flask.redirect(f"/{PROJECTION_TAB}")
+    return _render_season_wide_page(selected_date=date, selected_season=year, active_tab=PROJECTION_TAB)
+
+
 @main_bp.get(f"/{NEW_RACE_DAY_TAB}/<year>/<date>")
 def new_race_day_page(year, date):
     if not _is_valid_db_date(date):
@@ -348,6 +405,20 @@ def create_new_race_day():
     return json.dumps({"success": True, "newUrl": new_url}), 200, {"ContentType": "application/json"}
 
 
+@main_bp.get("/api/leaderboard")
+def get_leaderboard():
+    season = request.args.get("season", leaderboard.ALL_TIME)
+    if season != leaderboard.ALL_TIME:
+        try:
+            season = int(season)
+        except ValueError:
+            return flask.Response(f"'season' argument value {season} is not a year", 400, {})
+    rcclasses = [request.args["rcclass"]] if "rcclass" in request.args else ["2WD", "4WD"]
+    return json.dumps({"season": season,
+                       "classes": {rcclass: _get_leaderboard_rows(rcclass, season) for rcclass in rcclasses}}), \
+        200, {'ContentType': 'application/json'}
+
+
 @main_bp.get("/api/checkracedaydate")
 def check_raceday_date():
     is_admin, _ = check_authentication()
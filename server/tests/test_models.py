@@ -0,0 +1,102 @@
+import datetime
+import shutil
+import tempfile
+import unittest
+import unittest.mock as mock
+from pathlib import Path
+
+import flask
+import sqlalchemy
+
+import server.racelogic.raceday as rd
+from server import db, models
+
+
+class ModelsTests(unittest.TestCase):
+
+    def setUp(self):
+        app = flask.Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(app)
+        context = app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        db.create_all()
+        models.invalidate_driver_registry()
+
+    def _add_driver(self, number, name):
+        db.session.add(models.DBDriver(number=number, name=name))
+        db.session.commit()
+
+    def _get_driver(self, number):
+        return db.session.query(models.DBDriver).filter_by(number=number).one()
+
+    def test_driver_registry(self):
+        self._add_driver(90, "malcx95")
+        self.assertEqual("malcx95", models.get_driver_name(90))
+
+        self._add_driver(89, "hej")
+        self.assertEqual("hej", models.get_driver_name(89), "An added driver was not found!")
+
+        self._get_driver(90).name = "malcx"
+        db.session.commit()
+        self.assertEqual("malcx", models.get_driver_name(90), "The driver was not renamed!")
+
+        db.session.delete(self._get_driver(90))
+        db.session.commit()
+        self.assertRaises(TypeError, models.get_driver_name, 90)
+        self.assertRaises(TypeError, models.get_driver_name, 1000)
+        self.assertDictEqual({89: "hej"}, models.get_driver_names())
+
+    def test_driver_registry_rollback(self):
+        self._add_driver(90, "malcx95")
+        self._get_driver(90).name = "malcx"
+        db.session.flush()
+        # the registry is loaded with the flushed change
+        self.assertEqual("malcx", models.get_driver_name(90))
+        db.session.rollback()
+        self.assertEqual("malcx95", models.get_driver_name(90), "The rolled back name was kept!")
+
+    def test_driver_registry_reloads_unknown_number(self):
+        self._add_driver(90, "malcx95")
+        self.assertEqual("malcx95", models.get_driver_name(90))
+        # as when the driver is added by another process
+        db.session.execute(sqlalchemy.text("INSERT INTO drivers (number, name) VALUES (89, 'hej')"))
+        db.session.commit()
+        self.assertEqual("hej", models.get_driver_name(89), "The registry was not reloaded!")
+
+    def test_driver_name_renamed(self):
+        patcher = mock.patch.object(rd, "get_driver_name", models.get_driver_name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._add_driver(90, "malcx95")
+        driver = rd.get_driver(90)
+        self.assertEqual("malcx95", driver.name)
+
+        self._get_driver(90).name = "malcx"
+        db.session.commit()
+        self.assertEqual("malcx", driver.name, "The name of the driver was not renamed!")
+        self.assertIs(driver, rd.get_driver(90))
+
+    def test_race_dates_filenames_and_locations(self):
+        folder = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        patcher = mock.patch.object(rd, "RESULT_FOLDER_PATH", folder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db.session.add(models.Race(year=2023, location="Linkeboda", date=datetime.date(2023, 1, 1),
+                                   filename="230101"))
+        db.session.add(models.Race(year=2023, location="Mantorp", date=datetime.date(2023, 2, 1),
+                                   filename="230201"))
+        db.session.commit()
+        # converted to the compact format
+        (folder / "230201.rcb").write_bytes(b"")
+
+        dates, paths, locations = models.get_race_dates_filenames_and_locations(2023)
+        self.assertTupleEqual(("2023-02-01", "2023-01-01"), dates)
+        self.assertTupleEqual((folder / "230201.rcb", folder / "230101.json"), paths)
+        self.assertTupleEqual(("Mantorp", "Linkeboda"), locations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import unittest
+import unittest.mock as mock
+from pathlib import Path
+
+from pyfakefs.fake_filesystem_unittest import TestCase
+
+import server.racelogic.constants
+import server.racelogic.raceday as rd
+import server.racelogic.resultcalculation as rc
+from server import seasonstandings
+
+TEST_DATABASE_PATH = Path(__file__).parent.parent / "racelogic" / "tests" / "testdata" / "testdatabases"
+TEST_RACEDAYS = ["test_raceday1", "test_raceday2", "test_raceday3"]
+RACES = [("2023-05-01", "230501", "Linköping"),
+         ("2023-06-01", "230601", "Sandhem"),
+         ("2023-07-01", "230701", "Slottsbron")]
+
+
+class SeasonStandingsTests(TestCase):
+
+    test_raceday_contents = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_raceday_contents = {}
+        for name in TEST_RACEDAYS:
+            with open(os.path.join(TEST_DATABASE_PATH, name + ".json")) as f:
+                cls.test_raceday_contents[name] = f.read()
+
+    def setUp(self):
+        self.setUpPyfakefs(modules_to_reload=[rd, server.racelogic.constants])
+        rd.RESULT_FOLDER_PATH = Path("test_rcbash_results")
+        rd.RESULT_FOLDER_PATH.mkdir(exist_ok=True)
+        for name, (_, filename, _) in zip(TEST_RACEDAYS, RACES):
+            with open(rd.RESULT_FOLDER_PATH / (filename + ".json"), "w") as f:
+                f.write(self.test_raceday_contents[name])
+        patcher = mock.patch.object(seasonstandings.models, "get_season_races", return_value=RACES, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_season_points_equal(self, expected, actual):
+        self.assertListEqual(list(expected), list(actual))
+        for rcclass in expected:
+            self.assertListEqual(expected[rcclass].race_locations, actual[rcclass].race_locations)
+            for attribute in ("total_points", "total_points_with_drop_race", "drop_race_indices",
+                              "points_per_race", "race_participation"):
+                self.assertListEqual(list(getattr(expected[rcclass], attribute).items()),
+                                     list(getattr(actual[rcclass], attribute).items()),
+                                     f"{rcclass} {attribute} differ!")
+
+    def test_season_points_are_saved(self):
+        racedays = [rd.load_and_deserialize_raceday(rd.get_raceday_path(filename)) for _, filename, _ in RACES]
+        expected = rc.calculate_season_points(racedays, [location for _, _, location in RACES])
+
+        self.assert_season_points_equal(expected, seasonstandings.get_season_points(2023))
+        self.assertTrue(seasonstandings.get_standings_path(2023).exists(), "Standings were not saved!")
+
+        with mock.patch.object(seasonstandings.rc, "calculate_season_points",
+                               side_effect=AssertionError("Standings were recalculated!")):
+            self.assert_season_points_equal(expected, seasonstandings.get_season_points(2023))
+
+    def test_season_points_are_recalculated_on_change(self):
+        seasonstandings.get_season_points(2023)
+
+        raceday = rd.load_and_deserialize_raceday(rd.get_raceday_path("230701"))
+        raceday.set_all_participants([])
+        raceday.save_as_date("230701")
+        os.utime(rd.get_raceday_path("230701"), ns=(0, 0))
+
+        with mock.patch.object(seasonstandings.rc, "calculate_season_points",
+                               wraps=seasonstandings.rc.calculate_season_points) as calculate:
+            seasonstandings.get_season_points(2023)
+            calculate.assert_called_once()
+
+        with open(seasonstandings.get_standings_path(2023)) as f:
+            self.assertEqual(seasonstandings._get_season_key(RACES), json.load(f)["key"])
+
+    def test_projection_is_saved(self):
+        projections = seasonstandings.get_season_projection(2023, 1)
+        self.assertTrue(seasonstandings.get_projection_path(2023, 1).exists(), "Projection was not saved!")
+        for class_projection in projections.values():
+            self.assertEqual(seasonstandings.projection.NUM_SIMULATIONS, class_projection.num_simulations)
+            self.assertAlmostEqual(1., sum(class_projection.title_probabilities.values()))
+
+        with mock.patch.object(seasonstandings.projection, "project_season",
+                               side_effect=AssertionError("The season was simulated again!")):
+            saved_projections = seasonstandings.get_season_projection(2023, 1)
+        for rcclass, class_projection in projections.items():
+            self.assertDictEqual(class_projection.title_probabilities,
+                                 saved_projections[rcclass].title_probabilities)
+            self.assertDictEqual(class_projection.podium_probabilities,
+                                 saved_projections[rcclass].podium_probabilities)
+
+
+if __name__ == '__main__':
+    unittest.main()